@@ -0,0 +1,15 @@
+# pytest configuration shared by tb/ and example/*/tb/
+
+import os
+import sys
+
+# make tb/tbsupport importable for the plugins below
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'tb'))
+
+pytest_plugins = [
+    "tbsupport.cdc_sweep_report",
+    "tbsupport.sim_cache",
+    "tbsupport.sim_select",
+    "tbsupport.speed_plan_report",
+    "tbsupport.throughput_report",
+]
@@ -22,6 +22,8 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 
 skip_asserts = False
@@ -83,94 +85,89 @@ class AXIStreamFrame(object):
         if self.data is None:
             return
 
-        f = list(self.data)
-        tdata = []
-        tkeep = []
-        tid = []
-        tdest = []
-        tuser = []
-        i = 0
-
-        while len(f) > 0:
-            if self.B == 0:
-                data = 0
-                keep = 0
-                for j in range(self.M):
-                    data = data | (f.pop(0) << (j*self.WL))
-                    keep = keep | (1 << j)
-                    if len(f) == 0: break
-                tdata.append(data)
-
-                if self.keep is None:
-                    tkeep.append(keep)
-                else:
-                    tkeep.append(self.keep[i])
-            else:
-                # multiple tdata signals
-                data = 0
-                tdata.append(f.pop(0))
-                tkeep.append(0)
-
-            if self.id is None:
-                tid.append(0)
-            elif type(self.id) is int:
-                tid.append(self.id)
-            else:
-                tid.append(self.id[i])
+        if self.B == 0:
+            n = (len(self.data)+self.M-1) // self.M
+        else:
+            n = len(self.data)
 
-            if self.dest is None:
-                tdest.append(0)
-            elif type(self.dest) is int:
-                tdest.append(self.dest)
+        if self.B == 0:
+            # pack M words per cycle
+            if self.WL == 8 and type(self.data) is bytearray:
+                mv = memoryview(self.data)
+                tdata = [int.from_bytes(mv[k:k+self.M], 'little') for k in range(0, len(mv), self.M)]
             else:
-                tdest.append(self.dest[i])
-
-            if self.user is None:
-                tuser.append(0)
-            elif type(self.user) is int:
-                tuser.append(self.user)
+                f = list(self.data)
+                tdata = []
+                for k in range(0, len(f), self.M):
+                    data = 0
+                    for j, w in enumerate(f[k:k+self.M]):
+                        data = data | (w << (j*self.WL))
+                    tdata.append(data)
+
+            if self.keep is None:
+                tkeep = [2**self.M-1]*n
+                if len(self.data) % self.M:
+                    tkeep[-1] = 2**(len(self.data) % self.M)-1
             else:
-                tuser.append(self.user[i])
-            i += 1
+                tkeep = [self.keep[i] for i in range(n)]
+        else:
+            # multiple tdata signals
+            tdata = list(self.data)
+            tkeep = [0]*n
+
+        tid = self._build_field(self.id, n)
+        tdest = self._build_field(self.dest, n)
+        tuser = self._build_field(self.user, n)
 
         if self.last_cycle_user:
             tuser[-1] = self.last_cycle_user
 
         return tdata, tkeep, tid, tdest, tuser
 
+    @staticmethod
+    def _build_field(val, n):
+        if val is None:
+            return [0]*n
+        elif type(val) is int:
+            return [val]*n
+        else:
+            return [val[i] for i in range(n)]
+
     def parse(self, tdata, tkeep, tid, tdest, tuser):
         if tdata is None or tkeep is None or tuser is None:
             return
         if len(tdata) != len(tkeep) or len(tdata) != len(tid) or len(tdata) != len(tdest) or len(tdata) != len(tuser):
             raise Exception("Invalid data")
 
-        self.data = []
-        self.keep = []
-        self.id = []
-        self.dest = []
-        self.user = []
+        self.keep = list(tkeep)
+        self.id = list(tid)
+        self.dest = list(tdest)
+        self.user = list(tuser)
 
         if self.B == 0:
             mask = 2**self.WL-1
+            full = 2**self.M-1
 
-            for i in range(len(tdata)):
-                for j in range(self.M):
-                    if tkeep[i] & (1 << j):
-                        self.data.append((tdata[i] >> (j*self.WL)) & mask)
-                self.keep.append(tkeep[i])
-                self.id.append(tid[i])
-                self.dest.append(tdest[i])
-                self.user.append(tuser[i])
-        else:
-            for i in range(len(tdata)):
-                self.data.append(tdata[i])
-                self.keep.append(tkeep[i])
-                self.id.append(tid[i])
-                self.dest.append(tdest[i])
-                self.user.append(tuser[i])
+            if self.WL == 8:
+                # unpack whole cycles as bytes, partial cycles lane by lane
+                self.data = bytearray()
+                word_mask = 2**(self.M*8)-1
+
+                for d, k in zip(tdata, tkeep):
+                    b = (d & word_mask).to_bytes(self.M, 'little')
+                    if k & full == full:
+                        self.data.extend(b)
+                    else:
+                        self.data.extend(b[j] for j in range(self.M) if k & (1 << j))
+            else:
+                self.data = []
 
-        if self.WL == 8:
-            self.data = bytearray(self.data)
+                for d, k in zip(tdata, tkeep):
+                    for j in range(self.M):
+                        if k & (1 << j):
+                            self.data.append((d >> (j*self.WL)) & mask)
+        else:
+            self.data = list(tdata)
 
         self.last_cycle_user = self.user[-1]
 
@@ -246,11 +243,19 @@ class AXIStreamFrame(object):
         return self.data.__iter__()
 
 
+def wrap_frame(data):
+    # AXIStreamFrame over data (a bytearray), without the copy made by the
+    # constructor; the frame takes ownership of data
+    frame = AXIStreamFrame()
+    frame.data = data
+    return frame
+
+
 class AXIStreamSource(object):
     def __init__(self):
         self.active = False
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
 
     def send(self, frame):
         self.queue.append(AXIStreamFrame(frame))
@@ -297,6 +302,7 @@ class AXIStreamSource(object):
             id = []
             dest = []
             user = []
+            ptr = 0
             self.active = False
             B = 0
             N = len(tdata)
@@ -319,6 +325,7 @@ class AXIStreamSource(object):
                     id = []
                     dest = []
                     user = []
+                    ptr = 0
                     self.active = False
                     if B > 0:
                         for s in tdata:
@@ -334,25 +341,26 @@ class AXIStreamSource(object):
                 else:
                     tvalid.next = self.active and (tvalid or not pause)
                     if tready and tvalid:
-                        if len(data) > 0:
+                        if ptr < len(data):
                             if B > 0:
-                                l = data.pop(0)
+                                l = data[ptr]
                                 for i in range(B):
                                     tdata[i].next = l[i]
                             else:
-                                tdata.next = data.pop(0)
-                            tkeep.next = keep.pop(0)
-                            tid.next = id.pop(0)
-                            tdest.next = dest.pop(0)
-                            tuser.next = user.pop(0)
+                                tdata.next = data[ptr]
+                            tkeep.next = keep[ptr]
+                            tid.next = id[ptr]
+                            tdest.next = dest[ptr]
+                            tuser.next = user[ptr]
+                            ptr += 1
                             tvalid.next = not pause
-                            tlast.next = len(data) == 0
+                            tlast.next = ptr == len(data)
                         else:
                             tvalid.next = False
                             tlast.next = False
                             self.active = False
                     if not self.active and self.queue:
-                        frame = self.queue.pop(0)
+                        frame = self.queue.popleft()
                         frame.B = B
                         frame.N = N
                         frame.M = M
@@ -361,17 +369,18 @@ class AXIStreamSource(object):
                         if name is not None:
                             print("[%s] Sending frame %s" % (name, repr(frame)))
                         if B > 0:
-                            l = data.pop(0)
+                            l = data[0]
                             for i in range(B):
                                 tdata[i].next = l[i]
                         else:
-                            tdata.next = data.pop(0)
-                        tkeep.next = keep.pop(0)
-                        tid.next = id.pop(0)
-                        tdest.next = dest.pop(0)
-                        tuser.next = user.pop(0)
+                            tdata.next = data[0]
+                        tkeep.next = keep[0]
+                        tid.next = id[0]
+                        tdest.next = dest[0]
+                        tuser.next = user[0]
+                        ptr = 1
                         tvalid.next = not pause
-                        tlast.next = len(data) == 0
+                        tlast.next = ptr == len(data)
                         self.active = True
 
         return instances()
@@ -381,18 +390,18 @@ class AXIStreamSink(object):
     def __init__(self):
         self.active = False
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.read_queue = []
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def read(self, count=-1):
         while self.queue:
-            self.read_queue.extend(self.queue.pop(0).data)
+            self.read_queue.extend(self.queue.popleft().data)
         if count < 0:
             count = len(self.read_queue)
         data = self.read_queue[:count]
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Generates a PTP time distribution leaf wrapper with the specified number of leaves
+"""
+
+import argparse
+from jinja2 import Template
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-p', '--ports',  type=int, default=4, help="number of leaves")
+    parser.add_argument('-n', '--name',   type=str, help="module name")
+    parser.add_argument('-o', '--output', type=str, help="output file name")
+
+    args = parser.parse_args()
+
+    try:
+        generate(**args.__dict__)
+    except IOError as ex:
+        print(ex)
+        exit(1)
+
+
+def generate(ports=4, name=None, output=None):
+    n = ports
+
+    if name is None:
+        name = "ptp_td_leaf_wrap_{0}".format(n)
+
+    if output is None:
+        output = name + ".v"
+
+    print("Generating {0} leaf PTP time distribution leaf wrapper {1}...".format(n, name))
+
+    t = Template(u"""/*
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+*/
+
+// Language: Verilog 2001
+
+`resetall
+`timescale 1ns / 1fs
+`default_nettype none
+
+/*
+ * PTP time distribution {{n}} leaf fan-out (wrapper)
+ */
+module {{name}} #
+(
+    parameter TS_REL_EN = 1,
+    parameter TS_TOD_EN = 1,
+    parameter TS_FNS_W = 16,
+    parameter TS_REL_NS_W = 48,
+    parameter TS_TOD_S_W = 48,
+    parameter TS_REL_W = TS_REL_NS_W + TS_FNS_W,
+    parameter TS_TOD_W = TS_TOD_S_W + 32 + TS_FNS_W,
+    parameter TD_SDI_PIPELINE = 2
+)
+(
+    input  wire                 sample_clk,
+
+    /*
+     * PTP clock interface
+     */
+    input  wire                 ptp_clk,
+    input  wire                 ptp_rst,
+    input  wire                 ptp_td_sdi,
+
+    /*
+     * Leaves
+     */
+{%- for p in range(n) %}
+    input  wire                 l{{'%02d'%p}}_clk,
+    input  wire                 l{{'%02d'%p}}_rst,
+    output wire [TS_REL_W-1:0]  l{{'%02d'%p}}_output_ts_rel,
+    output wire                 l{{'%02d'%p}}_output_ts_rel_step,
+    output wire [TS_TOD_W-1:0]  l{{'%02d'%p}}_output_ts_tod,
+    output wire                 l{{'%02d'%p}}_output_ts_tod_step,
+    output wire                 l{{'%02d'%p}}_output_pps,
+    output wire                 l{{'%02d'%p}}_output_pps_str,
+    output wire                 l{{'%02d'%p}}_locked{% if not loop.last %},{% endif %}
+{% endfor -%}
+);
+{% for p in range(n) %}
+ptp_td_leaf #(
+    .TS_REL_EN(TS_REL_EN),
+    .TS_TOD_EN(TS_TOD_EN),
+    .TS_FNS_W(TS_FNS_W),
+    .TS_REL_NS_W(TS_REL_NS_W),
+    .TS_TOD_S_W(TS_TOD_S_W),
+    .TS_REL_W(TS_REL_W),
+    .TS_TOD_W(TS_TOD_W),
+    .TD_SDI_PIPELINE(TD_SDI_PIPELINE)
+)
+ptp_td_leaf_{{'%02d'%p}}_inst (
+    .clk(l{{'%02d'%p}}_clk),
+    .rst(l{{'%02d'%p}}_rst),
+    .sample_clk(sample_clk),
+    // PTP clock interface
+    .ptp_clk(ptp_clk),
+    .ptp_rst(ptp_rst),
+    .ptp_td_sdi(ptp_td_sdi),
+    // Timestamp output
+    .output_ts_rel(l{{'%02d'%p}}_output_ts_rel),
+    .output_ts_rel_step(l{{'%02d'%p}}_output_ts_rel_step),
+    .output_ts_tod(l{{'%02d'%p}}_output_ts_tod),
+    .output_ts_tod_step(l{{'%02d'%p}}_output_ts_tod_step),
+    // PPS output
+    .output_pps(l{{'%02d'%p}}_output_pps),
+    .output_pps_str(l{{'%02d'%p}}_output_pps_str),
+    // Status
+    .locked(l{{'%02d'%p}}_locked)
+);
+{% endfor %}
+endmodule
+
+`resetall
+
+""")
+
+    print(f"Writing file '{output}'...")
+
+    with open(output, 'w') as f:
+        f.write(t.render(
+            n=n,
+            name=name
+        ))
+        f.flush()
+
+    print("Done")
+
+
+if __name__ == "__main__":
+    main()
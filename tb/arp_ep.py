@@ -22,11 +22,19 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 import axis_ep
 import eth_ep
 import struct
 
+# ARP packet: hardware type, protocol type, hardware and protocol address
+# lengths, operation, sender MAC (split into 16 and 32 bits), sender IP,
+# target MAC (split into 16 and 32 bits), target IP
+arp_header = struct.Struct('>HHBBHHLLHLL')
+
+
 class ARPFrame(object):
     def __init__(self,
                 eth_dest_mac=0,
@@ -83,43 +91,51 @@ class ARPFrame(object):
             self.arp_tha = eth_dest_mac.arp_tha
             self.arp_tpa = eth_dest_mac.arp_tpa
 
+    def build_buffer(self, headroom=0):
+        # ARP packet in a new buffer, after headroom bytes for the headers of
+        # outer layers
+        buf = bytearray(headroom + arp_header.size)
+        arp_header.pack_into(buf, headroom,
+            self.arp_htype,
+            self.arp_ptype,
+            self.arp_hlen,
+            self.arp_plen,
+            self.arp_oper,
+            (self.arp_sha >> 32) & 0xffff, self.arp_sha & 0xffffffff,
+            self.arp_spa,
+            (self.arp_tha >> 32) & 0xffff, self.arp_tha & 0xffffffff,
+            self.arp_tpa)
+        return buf
+
     def build_axis(self):
-        return self.build_eth().build_axis()
+        buf = self.build_buffer(eth_ep.eth_header.size)
+        eth_ep.pack_eth_header(buf, 0, self)
+        return axis_ep.wrap_frame(buf)
 
     def build_eth(self):
-        data = b''
-
-        data += struct.pack('>H', self.arp_htype)
-        data += struct.pack('>H', self.arp_ptype)
-        data += struct.pack('B', self.arp_hlen)
-        data += struct.pack('B', self.arp_plen)
-        data += struct.pack('>H', self.arp_oper)
-        data += struct.pack('>Q', self.arp_sha)[2:]
-        data += struct.pack('>L', self.arp_spa)
-        data += struct.pack('>Q', self.arp_tha)[2:]
-        data += struct.pack('>L', self.arp_tpa)
-
-        return eth_ep.EthFrame(data, self.eth_dest_mac, self.eth_src_mac, self.eth_type)
+        frame = eth_ep.EthFrame(b'', self.eth_dest_mac, self.eth_src_mac, self.eth_type)
+        frame._payload = axis_ep.wrap_frame(self.build_buffer())
+        return frame
 
     def parse_axis(self, data):
-        frame = eth_ep.EthFrame()
-        frame.parse_axis(data)
-        self.parse_eth(frame)
+        data = eth_ep.frame_bytes(data)
+        self.eth_dest_mac, self.eth_src_mac, self.eth_type = eth_ep.unpack_eth_header(data)
+        self.parse_payload(data, eth_ep.eth_header.size)
 
     def parse_eth(self, data):
         self.eth_src_mac = data.eth_src_mac
         self.eth_dest_mac = data.eth_dest_mac
         self.eth_type = data.eth_type
 
-        self.arp_htype = struct.unpack('>H', data.payload.data[0:2])[0]
-        self.arp_ptype = struct.unpack('>H', data.payload.data[2:4])[0]
-        self.arp_hlen = struct.unpack('B', data.payload.data[4:5])[0]
-        self.arp_plen = struct.unpack('B', data.payload.data[5:6])[0]
-        self.arp_oper = struct.unpack('>H', data.payload.data[6:8])[0]
-        self.arp_sha = struct.unpack('>Q', b'\x00\x00'+data.payload.data[8:14])[0]
-        self.arp_spa = struct.unpack('>L', data.payload.data[14:18])[0]
-        self.arp_tha = struct.unpack('>Q', b'\x00\x00'+data.payload.data[18:24])[0]
-        self.arp_tpa = struct.unpack('>L', data.payload.data[24:28])[0]
+        self.parse_payload(data.payload.data)
+
+    def parse_payload(self, data, offset=0):
+        # ARP packet at offset in data; any padding after it is ignored
+        data = eth_ep.frame_bytes(data)
+        self.arp_htype, self.arp_ptype, self.arp_hlen, self.arp_plen, self.arp_oper, \
+            sha_h, sha_l, self.arp_spa, tha_h, tha_l, self.arp_tpa = arp_header.unpack_from(data, offset)
+        self.arp_sha = sha_h << 32 | sha_l
+        self.arp_tha = tha_h << 32 | tha_l
 
     def __eq__(self, other):
         if type(other) is ARPFrame:
@@ -160,7 +176,7 @@ class ARPFrameSource():
     def __init__(self):
         self.active = False
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.clk = Signal(bool(0))
 
     def send(self, frame):
@@ -222,7 +238,7 @@ class ARPFrameSource():
                         frame_valid.next = False
                         self.active = False
                     if not self.active and self.queue:
-                        frame = self.queue.pop(0)
+                        frame = self.queue.popleft()
                         eth_dest_mac.next = frame.eth_dest_mac
                         eth_src_mac.next = frame.eth_src_mac
                         eth_type.next = frame.eth_type
@@ -248,12 +264,12 @@ class ARPFrameSource():
 class ARPFrameSink():
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def count(self):
@@ -40,12 +40,12 @@ from cocotbext.eth import XgmiiFrame, PtpClockSimTime
 from cocotbext.axi import AxiStreamBus, AxiStreamSink
 
 try:
-    from baser import BaseRSerdesSource
+    from tbsupport import BaseRSerdesSource
 except ImportError:
-    # attempt import from current directory
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     try:
-        from baser import BaseRSerdesSource
+        from tbsupport import BaseRSerdesSource
     finally:
         del sys.path[0]
 
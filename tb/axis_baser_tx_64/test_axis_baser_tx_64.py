@@ -42,12 +42,12 @@ from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamFrame
 from cocotbext.axi.stream import define_stream
 
 try:
-    from baser import BaseRSerdesSink
+    from tbsupport import BaseRSerdesSink
 except ImportError:
-    # attempt import from current directory
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     try:
-        from baser import BaseRSerdesSink
+        from tbsupport import BaseRSerdesSink
     finally:
         del sys.path[0]
 
@@ -22,6 +22,8 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 
 import xgmii_ep
@@ -98,7 +100,7 @@ def block_type_term_lane(bt):
 class BaseRSerdesSource(object):
     def __init__(self, ifg=12, enable_dic=True):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.ifg = ifg
         self.enable_dic = enable_dic
         self.force_offset_start = False
@@ -135,6 +137,7 @@ class BaseRSerdesSource(object):
         def logic():
             frame = None
             ccl = []
+            ptr = 0
             ifg_cnt = 0
             deficit_idle_cnt = 0
             scrambler_state = 0
@@ -148,16 +151,17 @@ class BaseRSerdesSource(object):
 
                     if ifg_cnt > bw-1 or (not self.enable_dic and ifg_cnt > 0):
                         ifg_cnt = max(ifg_cnt - bw, 0)
-                    elif ccl:
-                        header, data = ccl.pop(0)
-                        if not ccl:
+                    elif ptr < len(ccl):
+                        header, data = ccl[ptr]
+                        ptr += 1
+                        if ptr == len(ccl):
                             l = block_type_term_lane(data & 0xff)
                             if l is not None:
                                 ifg_cnt = self.ifg - (bw-l) + deficit_idle_cnt
                             else:
                                 ifg_cnt = self.ifg + deficit_idle_cnt
                     elif self.queue:
-                        frame = self.queue.pop(0)
+                        frame = self.queue.popleft()
                         dl, cl = frame.build()
                         if name is not None:
                             print("[%s] Sending frame %s" % (name, repr(frame)))
@@ -184,6 +188,7 @@ class BaseRSerdesSource(object):
                                 cl.append(1)
 
                         # 10GBASE-R encoding
+                        ccl = []
                         for k in range(0, len(dl), 8):
                             di = dl[k:k+8]
                             ci = cl[k:k+8]
@@ -324,8 +329,9 @@ class BaseRSerdesSource(object):
 
                             ccl.append((h, d))
 
-                        header, data = ccl.pop(0)
-                        if not ccl:
+                        header, data = ccl[0]
+                        ptr = 1
+                        if ptr == len(ccl):
                             l = block_type_term_lane(data & 0xff)
                             if l is not None:
                                 ifg_cnt = self.ifg - (bw-l) + deficit_idle_cnt
@@ -360,12 +366,12 @@ class BaseRSerdesSource(object):
 class BaseRSerdesSink(object):
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def count(self):
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+BASE-R serdes model micro-benchmarks
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cocotbext.eth.constants import XgmiiCtrl, BaseRSync
+
+from tbsupport.baser import BaseRScrambler, BaseRDescrambler, baser_encode_block, baser_decode_ctrl_block
+from tbsupport.baser import _bit_reverse_table
+
+
+def ref_scramble(state, data):
+    b = 0
+    for i in range(64):
+        if bool(state & (1 << 38)) ^ bool(state & (1 << 57)) ^ bool(data & (1 << i)):
+            state = ((state & 0x1ffffffffffffff) << 1) | 1
+            b = b | (1 << i)
+        else:
+            state = (state & 0x1ffffffffffffff) << 1
+    return state, b
+
+
+def ref_descramble(state, data):
+    b = 0
+    for i in range(64):
+        if bool(state & (1 << 38)) ^ bool(state & (1 << 57)) ^ bool(data & (1 << i)):
+            b = b | (1 << i)
+        state = (state & 0x1ffffffffffffff) << 1 | bool(data & (1 << i))
+    return state, b
+
+
+def check_scrambler(blocks):
+    scrambler = BaseRScrambler()
+    descrambler = BaseRDescrambler()
+    ref_scr_state = 0
+    ref_descr_state = 0
+
+    for data in blocks:
+        ref_scr_state, ref_s = ref_scramble(ref_scr_state, data)
+        s = scrambler.scramble(data)
+        assert s == ref_s, f"scrambler mismatch: 0x{s:016x} != 0x{ref_s:016x}"
+
+        ref_descr_state, ref_d = ref_descramble(ref_descr_state, s)
+        d = descrambler.descramble(s)
+        assert d == ref_d, f"descrambler mismatch: 0x{d:016x} != 0x{ref_d:016x}"
+        assert d == data
+
+
+def gen_xgmii_blocks(rng, count):
+    ctrl_chars = [XgmiiCtrl.IDLE, XgmiiCtrl.LPI, XgmiiCtrl.ERROR, XgmiiCtrl.RES_0, XgmiiCtrl.RES_5]
+    os_chars = [XgmiiCtrl.SEQ_OS, XgmiiCtrl.SIG_OS]
+    blocks = []
+
+    for k in range(count):
+        dl = bytearray(rng.randrange(256) for k in range(8))
+        cl = [0]*8
+        kind = rng.randrange(6)
+
+        if kind == 0:
+            # start
+            lane = rng.choice([0, 4])
+            for i in range(lane):
+                dl[i] = rng.choice(ctrl_chars)
+                cl[i] = 1
+            if lane == 4 and rng.randrange(2):
+                dl[0] = rng.choice(os_chars)
+                dl[1:4] = bytearray(rng.randrange(256) for k in range(3))
+                cl[0:4] = [1, 0, 0, 0]
+            dl[lane] = XgmiiCtrl.START
+            cl[lane] = 1
+        elif kind == 1:
+            # terminate
+            lane = rng.randrange(8)
+            dl[lane] = XgmiiCtrl.TERM
+            cl[lane] = 1
+            for i in range(lane+1, 8):
+                dl[i] = rng.choice(ctrl_chars)
+                cl[i] = 1
+        elif kind == 2:
+            # ordered sets
+            dl[0] = rng.choice(os_chars)
+            cl[0] = 1
+            if rng.randrange(2):
+                dl[4] = rng.choice(os_chars)
+                cl[4] = 1
+            else:
+                for i in range(4, 8):
+                    dl[i] = rng.choice(ctrl_chars)
+                    cl[i] = 1
+        elif kind == 3:
+            # all control
+            for i in range(8):
+                dl[i] = rng.choice(ctrl_chars)
+                cl[i] = 1
+
+        blocks.append((bytes(dl), cl))
+
+    return blocks
+
+
+def check_codec(blocks):
+    for dl, cl in blocks:
+        data, header = baser_encode_block(dl, cl)
+        if header == BaseRSync.DATA:
+            rx_dl, rx_cl = data.to_bytes(8, 'little'), 0
+        else:
+            rx_dl, rx_cl = baser_decode_ctrl_block(data)
+        assert rx_dl == dl, f"codec mismatch: {rx_dl.hex()} != {dl.hex()}"
+        assert [(rx_cl >> k) & 1 for k in range(8)] == cl
+
+
+def ref_bit_reverse(data):
+    return sum(1 << (63-i) for i in range(64) if (data >> i) & 1)
+
+
+def bit_reverse(data):
+    return int.from_bytes(data.to_bytes(8, 'little').translate(_bit_reverse_table), 'big')
+
+
+def bench(name, func, blocks):
+    start = time.perf_counter()
+    func(blocks)
+    elapsed = time.perf_counter() - start
+    print(f"{name:24s} {len(blocks)/elapsed:14.0f} blocks/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', help="Number of blocks", type=int, default=100000)
+    parser.add_argument('--seed', help="Random seed", type=int, default=1)
+
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    blocks = [rng.getrandbits(64) for k in range(args.n)]
+
+    print(f"Checking scrambler against bit-serial reference ({min(args.n, 10000)} blocks)...")
+    check_scrambler(blocks[:10000])
+    check_scrambler([0]*1000 + [0xffffffffffffffff]*1000)
+    print("OK")
+
+    def run_ref_scramble(blocks):
+        state = 0
+        for data in blocks:
+            state, data = ref_scramble(state, data)
+
+    def run_ref_descramble(blocks):
+        state = 0
+        for data in blocks:
+            state, data = ref_descramble(state, data)
+
+    def run_scramble(blocks):
+        scrambler = BaseRScrambler()
+        for data in blocks:
+            scrambler.scramble(data)
+
+    def run_descramble(blocks):
+        descrambler = BaseRDescrambler()
+        for data in blocks:
+            descrambler.descramble(data)
+
+    print("Checking bit reversal...")
+    for data in blocks[:10000]:
+        assert bit_reverse(data) == ref_bit_reverse(data)
+    print("OK")
+
+    xgmii_blocks = gen_xgmii_blocks(rng, args.n)
+
+    print("Checking block encoder/decoder round trip...")
+    check_codec(xgmii_blocks)
+    print("OK")
+
+    baser_blocks = [baser_encode_block(dl, cl) for dl, cl in xgmii_blocks]
+
+    def run_encode(blocks):
+        for dl, cl in blocks:
+            baser_encode_block(dl, cl)
+
+    def run_decode(blocks):
+        for data, header in blocks:
+            if header == BaseRSync.CTRL:
+                baser_decode_ctrl_block(data)
+            else:
+                data.to_bytes(8, 'little')
+
+    bench("bit-serial scrambler", run_ref_scramble, blocks[:max(args.n//100, 1000)])
+    bench("bit-serial descrambler", run_ref_descramble, blocks[:max(args.n//100, 1000)])
+    bench("scrambler", run_scramble, blocks)
+    bench("descrambler", run_descramble, blocks)
+    bench("bit-serial reverse", lambda blocks: [ref_bit_reverse(d) for d in blocks], blocks[:max(args.n//10, 1000)])
+    bench("bit reverse", lambda blocks: [bit_reverse(d) for d in blocks], blocks)
+    bench("block encoder", run_encode, xgmii_blocks)
+    bench("block decoder", run_decode, baser_blocks)
+
+
+if __name__ == '__main__':
+    main()
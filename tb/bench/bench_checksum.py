@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+"""
+One's complement checksum benchmark
+
+Checks the shared checksum engine (checksum.py) against the per-byte and
+field by field sums that ip_ep and udp_ep used before, for random frames
+of every length up to the maximum (odd lengths and the all-zero and
+all-ones corner cases included), checks RFC 1624 incremental updates
+against full recomputation, and reports the checksum throughput of both
+in MB/s.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import checksum
+import ip_ep
+import udp_ep
+
+
+def ref_ip_checksum(f):
+    cksum = f.ip_version << 12 | f.ip_ihl << 8 | f.ip_dscp << 2 | f.ip_ecn
+    cksum += f.ip_length
+    cksum += f.ip_identification
+    cksum += f.ip_flags << 13 | f.ip_fragment_offset
+    cksum += f.ip_ttl << 8 | f.ip_protocol
+    cksum += f.ip_source_ip & 0xffff
+    cksum += (f.ip_source_ip >> 16) & 0xffff
+    cksum += f.ip_dest_ip & 0xffff
+    cksum += (f.ip_dest_ip >> 16) & 0xffff
+    cksum = (cksum & 0xffff) + (cksum >> 16)
+    cksum = (cksum & 0xffff) + (cksum >> 16)
+    return ~cksum & 0xffff
+
+
+def ref_udp_checksum(f):
+    cksum = f.ip_source_ip & 0xffff
+    cksum += (f.ip_source_ip >> 16) & 0xffff
+    cksum += f.ip_dest_ip & 0xffff
+    cksum += (f.ip_dest_ip >> 16) & 0xffff
+    cksum += f.ip_protocol
+    cksum += f.udp_length
+    cksum = (cksum & 0xffff) + (cksum >> 16)
+    cksum = (cksum & 0xffff) + (cksum >> 16)
+    cksum += f.udp_source_port
+    cksum += f.udp_dest_port
+    cksum += f.udp_length
+    odd = False
+    for d in f.payload.data:
+        if odd:
+            cksum += d
+        else:
+            cksum += d << 8
+        odd = not odd
+    cksum = (cksum & 0xffff) + (cksum >> 16)
+    cksum = (cksum & 0xffff) + (cksum >> 16)
+    return ~cksum & 0xffff
+
+
+def ref_sum(data):
+    cksum = 0
+    odd = False
+    for d in data:
+        if odd:
+            cksum += d
+        else:
+            cksum += d << 8
+        odd = not odd
+    cksum = (cksum & 0xffff) + (cksum >> 16)
+    cksum = (cksum & 0xffff) + (cksum >> 16)
+    return ~cksum & 0xffff
+
+
+def random_udp_frame(rng, payload):
+    f = udp_ep.UDPFrame(
+        payload=payload,
+        ip_identification=rng.randrange(2**16),
+        ip_ttl=rng.randrange(256),
+        ip_source_ip=rng.randrange(2**32),
+        ip_dest_ip=rng.randrange(2**32),
+        udp_source_port=rng.randrange(2**16),
+        udp_dest_port=rng.randrange(2**16)
+    )
+    f.build()
+    return f
+
+
+def check(rng, max_len):
+    count = 0
+
+    payloads = [bytearray(rng.randrange(256) for k in range(n)) for n in range(max_len+1)]
+    payloads += [bytearray(n) for n in range(16)]
+    payloads += [bytearray(b'\xff'*n) for n in range(16)]
+
+    for payload in payloads:
+        f = random_udp_frame(rng, payload)
+        assert f.calc_udp_checksum() == ref_udp_checksum(f), payload
+        assert f.calc_ip_checksum() == ref_ip_checksum(f)
+        assert checksum.checksum(payload) == ref_sum(payload)
+
+        ipf = ip_ep.IPFrame(f.build_ip())
+        assert ipf.calc_checksum() == ref_ip_checksum(ipf)
+        count += 1
+
+    # RFC 1624 incremental update, single fields and header regions
+    for k in range(10000):
+        f = random_udp_frame(rng, b'')
+        cksum = f.calc_ip_checksum()
+
+        old = f.ip_ttl << 8 | f.ip_protocol
+        f.ip_ttl = rng.randrange(256)
+        new = f.ip_ttl << 8 | f.ip_protocol
+        cksum = checksum.update(cksum, old, new)
+        assert cksum == f.calc_ip_checksum()
+
+        old = f.ip_source_ip.to_bytes(4, 'big')
+        f.ip_source_ip = rng.randrange(2**32)
+        cksum = checksum.update(cksum, old, f.ip_source_ip.to_bytes(4, 'big'))
+        assert cksum == f.calc_ip_checksum()
+        count += 1
+
+    # update_checksum after changing header fields, the payload, or the
+    # checksum fields themselves
+    fields = {'ip_dscp': 6, 'ip_ecn': 2, 'ip_identification': 16, 'ip_ttl': 8, 'ip_source_ip': 32,
+        'ip_dest_ip': 32, 'udp_source_port': 16, 'udp_dest_port': 16}
+    for k in range(2000):
+        f = random_udp_frame(rng, bytearray(rng.randrange(256) for k in range(rng.randrange(64))))
+        ipf = ip_ep.IPFrame(f.build_ip())
+        for i in range(8):
+            name, width = rng.choice(list(fields.items()))
+            setattr(f, name, getattr(f, name) & rng.choice([0, (1 << width)-1]) ^ rng.randrange(1 << width))
+            if name.startswith('ip_'):
+                setattr(ipf, name, getattr(f, name))
+            r = rng.randrange(8)
+            if r == 0:
+                f.payload.data[0:1] = bytes([rng.randrange(256)])
+                ipf.ip_header_checksum = rng.randrange(2**16)
+            elif r == 1:
+                f.udp_checksum = rng.randrange(2**16)
+                f.ip_header_checksum = rng.randrange(2**16)
+            f.update_checksum()
+            ipf.update_checksum()
+            assert f.udp_checksum == ref_udp_checksum(f)
+            assert f.ip_header_checksum == ref_ip_checksum(f)
+            assert ipf.ip_header_checksum == ref_ip_checksum(ipf)
+        count += 1
+
+    return count
+
+
+def update_rate(n, full=False, min_time=0.2):
+    # update_checksum calls per second after changing a port; full recomputes
+    # both checksums as update_checksum did before the incremental update
+    f = udp_ep.UDPFrame(payload=bytearray(n))
+    f.build()
+    f.update_checksum()
+    k = 0
+    start = time.perf_counter()
+    while True:
+        f.udp_source_port = k & 0xffff
+        if full:
+            f.ip_header_checksum = f.calc_ip_checksum()
+            f.udp_checksum = f.calc_udp_checksum()
+        else:
+            f.update_checksum()
+        k += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    return k/elapsed
+
+
+def throughput(func, data, min_time=0.2):
+    n = 0
+    start = time.perf_counter()
+    while True:
+        func(data)
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    return n*len(data)/elapsed/1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-l', '--length', help="Payload lengths", type=int, nargs='+', default=[64, 1472, 9000])
+    parser.add_argument('--max-len', help="Maximum payload length for the bit-exact check", type=int, default=1500)
+    parser.add_argument('--seed', help="Random seed", type=int, default=1)
+
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    print(f"Checking against reference... ", end="", flush=True)
+    count = check(rng, args.max_len)
+    print(f"OK ({count} frames)")
+
+    for n in args.length:
+        data = bytearray(rng.randrange(256) for k in range(n))
+        ref = throughput(ref_sum, data)
+        new = throughput(checksum.checksum, data)
+        print(f"{n:6d} bytes  reference {ref:10.2f} MB/s  checksum {new:10.2f} MB/s  {new/ref:8.1f}x")
+
+    for n in args.length:
+        ref = update_rate(n, full=True)
+        new = update_rate(n)
+        print(f"{n:6d} bytes  update_checksum: full {ref:10.0f}/s  incremental {new:10.0f}/s")
+
+
+if __name__ == '__main__':
+    main()
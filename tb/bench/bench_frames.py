@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+"""
+Ethernet/IP/UDP/ARP frame model benchmark
+
+Builds frames to the AXI stream byte level (build_axis, build_axis_fcs) and
+to the intermediate layers (build_eth, build_ip), and parses them back
+(parse_axis, parse_eth, parse_ip), for several payload sizes, also reading
+one header field or comparing the parsed frame against the built one as a
+testbench check does.  Reports the time per frame and the peak memory
+traced while handling one frame as a multiple of the payload size, which is
+the number of copies of the payload alive at once.  With --ref, the same
+runs are done with reference copies of the endpoint modules, e.g. from
+
+    mkdir /tmp/ref && git archive <rev> tb | tar -x -C /tmp/ref
+
+(the directory holding axis_ep.py, eth_ep.py, ip_ep.py, udp_ep.py and
+arp_ep.py), and every built frame, parsed field and comparison result is
+checked against it.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+module_names = ['axis_ep', 'checksum', 'eth_ep', 'ip_ep', 'udp_ep', 'arp_ep']
+
+
+def load_modules(path=None):
+    # import a separate copy of the endpoint modules from path
+    saved = {name: sys.modules.pop(name) for name in module_names if name in sys.modules}
+    if path:
+        sys.path.insert(0, path)
+    try:
+        return {name: __import__(name) for name in module_names}
+    finally:
+        if path:
+            sys.path.remove(path)
+        for name in module_names:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+
+def udp_frame(mods, payload, rng):
+    f = mods['udp_ep'].UDPFrame()
+    f.eth_dest_mac = rng.getrandbits(48)
+    f.eth_src_mac = rng.getrandbits(48)
+    f.eth_type = 0x0800
+    f.ip_dscp = rng.getrandbits(6)
+    f.ip_ecn = rng.getrandbits(2)
+    f.ip_identification = rng.getrandbits(16)
+    f.ip_ttl = rng.getrandbits(8)
+    f.ip_source_ip = rng.getrandbits(32)
+    f.ip_dest_ip = rng.getrandbits(32)
+    f.udp_source_port = rng.getrandbits(16)
+    f.udp_dest_port = rng.getrandbits(16)
+    f.payload = payload
+    return f
+
+
+def arp_frame(mods, rng):
+    f = mods['arp_ep'].ARPFrame()
+    f.eth_dest_mac = rng.getrandbits(48)
+    f.eth_src_mac = rng.getrandbits(48)
+    f.eth_type = 0x0806
+    f.arp_oper = rng.choice([1, 2])
+    f.arp_sha = rng.getrandbits(48)
+    f.arp_spa = rng.getrandbits(32)
+    f.arp_tha = rng.getrandbits(48)
+    f.arp_tpa = rng.getrandbits(32)
+    return f
+
+
+udp_fields = ['eth_dest_mac', 'eth_src_mac', 'eth_type', 'ip_version', 'ip_ihl', 'ip_dscp', 'ip_ecn',
+    'ip_length', 'ip_identification', 'ip_flags', 'ip_fragment_offset', 'ip_ttl', 'ip_protocol',
+    'ip_header_checksum', 'ip_source_ip', 'ip_dest_ip', 'udp_source_port', 'udp_dest_port',
+    'udp_length', 'udp_checksum']
+
+arp_fields = ['eth_dest_mac', 'eth_src_mac', 'eth_type', 'arp_htype', 'arp_ptype', 'arp_hlen',
+    'arp_plen', 'arp_oper', 'arp_sha', 'arp_spa', 'arp_tha', 'arp_tpa']
+
+
+def udp_state(f):
+    return [getattr(f, k) for k in udp_fields] + [bytes(f.payload.data)]
+
+
+def check(mods, ref, count, seed):
+    rng = random.Random(seed)
+    n = 0
+
+    for k in range(count):
+        payload = bytearray(rng.getrandbits(8) for i in range(rng.randrange(0, 1473)))
+        s = rng.getrandbits(32)
+
+        a = udp_frame(mods, payload, random.Random(s))
+        b = udp_frame(ref, payload, random.Random(s))
+
+        wire = a.build_axis().data
+        assert wire == b.build_axis().data, "build_axis mismatch"
+        assert a.build_eth().payload.data == b.build_eth().payload.data, "build_eth mismatch"
+        assert a.build_ip().payload.data == b.build_ip().payload.data, "build_ip mismatch"
+
+        e = mods['eth_ep'].EthFrame()
+        e.parse_axis(wire)
+        e_ref = ref['eth_ep'].EthFrame()
+        e_ref.parse_axis(wire)
+        fcs = e.build_axis_fcs().data
+        assert fcs == e_ref.build_axis_fcs().data, "build_axis_fcs mismatch"
+        assert e.eth_fcs == e_ref.eth_fcs, "eth_fcs mismatch"
+
+        # trailing padding, as from a MAC
+        wire = wire + bytearray(rng.randrange(0, 32))
+
+        for method in ['parse_axis', 'parse_eth', 'parse_ip']:
+            p = mods['udp_ep'].UDPFrame()
+            p_ref = ref['udp_ep'].UDPFrame()
+            if method == 'parse_axis':
+                p.parse_axis(wire)
+                p_ref.parse_axis(wire)
+            elif method == 'parse_eth':
+                p.parse_eth(e)
+                p_ref.parse_eth(e_ref)
+            else:
+                p.parse_ip(a.build_ip())
+                p_ref.parse_ip(b.build_ip())
+            assert udp_state(p) == udp_state(p_ref), f"{method} mismatch"
+            assert p == a, f"{method} round trip mismatch"
+
+        # corrupt one byte of the headers or the payload, or modify a field
+        # after parsing; comparisons must still agree with the reference
+        pos = rng.randrange(len(wire))
+        bad = bytearray(wire)
+        bad[pos] ^= 1 << rng.randrange(8)
+        p = mods['udp_ep'].UDPFrame()
+        p_ref = ref['udp_ep'].UDPFrame()
+        try:
+            p.parse_axis(bad)
+            res = p == a
+        except Exception as ex:
+            res = type(ex)
+        try:
+            p_ref.parse_axis(bad)
+            res_ref = p_ref == b
+        except Exception as ex:
+            res_ref = type(ex)
+        assert res == res_ref, f"comparison mismatch after corrupting byte {pos}"
+
+        field = rng.choice(udp_fields)
+        for f in [p, p_ref]:
+            f.parse_axis(wire)
+            setattr(f, field, getattr(f, field) ^ 1)
+        assert (p == a) == (p_ref == b) == False, f"comparison mismatch after modifying {field}"
+
+        e = mods['eth_ep'].EthFrame()
+        e.parse_axis_fcs(fcs)
+        e_ref = ref['eth_ep'].EthFrame()
+        e_ref.parse_axis_fcs(fcs)
+        assert (e.eth_fcs, bytes(e.payload.data)) == (e_ref.eth_fcs, bytes(e_ref.payload.data)), "parse_axis_fcs mismatch"
+
+        s = rng.getrandbits(32)
+        a = arp_frame(mods, random.Random(s))
+        b = arp_frame(ref, random.Random(s))
+        wire = a.build_axis().data
+        assert wire == b.build_axis().data, "ARP build_axis mismatch"
+        wire = wire + bytearray(18)
+        p = mods['arp_ep'].ARPFrame()
+        p.parse_axis(wire)
+        p_ref = ref['arp_ep'].ARPFrame()
+        p_ref.parse_axis(wire)
+        assert [getattr(p, f) for f in arp_fields] == [getattr(p_ref, f) for f in arp_fields], "ARP parse mismatch"
+        assert p == a, "ARP round trip mismatch"
+
+        n += 1
+
+    return n
+
+
+def measure(fn, count):
+    fn()
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for k in range(count):
+        fn()
+    elapsed = time.perf_counter() - start
+
+    return elapsed/count, peak
+
+
+def benches(mods, size):
+    rng = random.Random(size)
+    frame = udp_frame(mods, bytearray(rng.getrandbits(8) for i in range(size)), rng)
+    frame.build()
+    wire = frame.build_axis()
+    eth = frame.build_eth()
+    ip = frame.build_ip()
+
+    def parse(method, data):
+        def fn():
+            getattr(mods['udp_ep'].UDPFrame(), method)(data)
+        return fn
+
+    def parse_field():
+        f = mods['udp_ep'].UDPFrame()
+        f.parse_axis(wire)
+        return f.udp_dest_port
+
+    def parse_eq():
+        f = mods['udp_ep'].UDPFrame()
+        f.parse_axis(wire)
+        assert f == frame
+
+    return [
+        ("UDP build_axis", frame.build_axis),
+        ("UDP build_eth", frame.build_eth),
+        ("UDP build_ip", frame.build_ip),
+        ("Eth build_axis_fcs", eth.build_axis_fcs),
+        ("UDP parse_axis", parse('parse_axis', wire)),
+        ("UDP parse_eth", parse('parse_eth', eth)),
+        ("UDP parse_ip", parse('parse_ip', ip)),
+        ("UDP parse_axis+field", parse_field),
+        ("UDP parse_axis+eq", parse_eq),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip(), formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', help="Frames per measurement", type=int, default=2000)
+    parser.add_argument('--sizes', help="Payload sizes (bytes)", type=int, nargs='+', default=[64, 1472, 9000, 60000])
+    parser.add_argument('--check', help="Random frames to check against the reference", type=int, default=2000)
+    parser.add_argument('--seed', help="Random seed", type=int, default=1)
+    parser.add_argument('--ref', help="Directory with reference endpoint modules", default=None)
+
+    args = parser.parse_args()
+
+    mods = [("current", load_modules())]
+    if args.ref:
+        mods.append(("reference", load_modules(os.path.abspath(args.ref))))
+
+        print("Checking against reference...", end=" ", flush=True)
+        n = check(mods[0][1], mods[1][1], args.check, args.seed)
+        print(f"OK ({n} frames)")
+
+    print(f"{'':20s} {'payload':>8s} " + " ".join(f"{name:>10s} {'copies':>7s}" for name, m in mods))
+
+    for size in args.sizes:
+        count = max(10, args.n*64//max(size, 64))
+        rows = [benches(m, size) for name, m in mods]
+        for k, (bench_name, fn) in enumerate(rows[0]):
+            cols = []
+            for row in rows:
+                t, peak = measure(row[k][1], count)
+                cols.append(f"{t*1e6:8.1f}us {peak/size:7.2f}")
+            print(f"{bench_name:20s} {size:8d} " + " ".join(cols))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Import-time profile of the shared testbench models
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+tb_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+cases = [
+    ("cocotb + cocotbext-eth", "import cocotb, cocotbext.eth"),
+    ("tbsupport", "import tbsupport"),
+    ("BASE-R models", "from tbsupport import BaseRSerdesSource, BaseRSerdesSink"),
+    ("PTP TD models", "from tbsupport import PtpTdSource, PtpTdSink"),
+]
+
+
+def profile(stmt):
+    # returns {module: (self us, cumulative us)} as reported by -X importtime
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([tb_dir, env.get('PYTHONPATH', '')])
+
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', stmt],
+        env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True, check=True)
+
+    times = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', help="Number of runs per case", type=int, default=5)
+
+    args = parser.parse_args()
+
+    for desc, stmt in cases:
+        total = []
+        local = []
+
+        for k in range(args.n):
+            times = profile(stmt)
+            total.append(sum(s for s, c in times.values()))
+            local.append(sum(s for name, (s, c) in times.items() if name.startswith('tbsupport')))
+
+        print(f"{desc:24s} total {min(total)/1000:8.2f} ms, tbsupport {min(local)/1000:8.2f} ms   ({stmt})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+MyHDL endpoint model stress benchmark
+
+Preloads a source with a large number of frames and streams them back to
+back into the matching sink (AXI stream, XGMII, GMII), reporting the
+simulator wall time per beat.  With constant-time queues the per-beat cost
+should not depend on the number of queued frames.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from myhdl import Signal, intbv, always, delay, instance, Simulation, StopSimulation
+
+import axis_ep
+import gmii_ep
+import xgmii_ep
+
+
+def run_sim(create, frame_count):
+    clk = Signal(bool(0))
+    rst = Signal(bool(0))
+
+    insts, sink, beats = create(clk, rst)
+    stats = {}
+
+    @always(delay(4))
+    def clkgen():
+        clk.next = not clk
+
+    @instance
+    def check():
+        rst.next = 1
+        yield clk.posedge
+        rst.next = 0
+        start = time.perf_counter()
+        count = 0
+        while count < frame_count:
+            yield clk.posedge
+            while sink.queue:
+                sink.recv()
+                count += 1
+        stats['elapsed'] = time.perf_counter() - start
+        raise StopSimulation
+
+    Simulation(insts, clkgen, check).run(quiet=1)
+
+    return stats['elapsed'], beats
+
+
+def axis_bench(frames, width=64):
+    def create(clk, rst):
+        source = axis_ep.AXIStreamSource()
+        sink = axis_ep.AXIStreamSink()
+
+        tdata = Signal(intbv(0)[width:])
+        tkeep = Signal(intbv(0)[width//8:])
+        tvalid = Signal(bool(0))
+        tready = Signal(bool(0))
+        tlast = Signal(bool(0))
+
+        source_logic = source.create_logic(clk, rst, tdata=tdata, tkeep=tkeep, tvalid=tvalid, tready=tready, tlast=tlast)
+        sink_logic = sink.create_logic(clk, rst, tdata=tdata, tkeep=tkeep, tvalid=tvalid, tready=tready, tlast=tlast)
+
+        for f in frames:
+            source.send(f)
+
+        beats = sum((len(f)+width//8-1)//(width//8) for f in frames)
+
+        return [source_logic, sink_logic], sink, beats
+
+    return create
+
+
+def xgmii_bench(frames, width=64):
+    def create(clk, rst):
+        source = xgmii_ep.XGMIISource()
+        sink = xgmii_ep.XGMIISink()
+
+        txd = Signal(intbv(0x0707070707070707)[width:])
+        txc = Signal(intbv(0xff)[width//8:])
+
+        source_logic = source.create_logic(clk, rst, txd=txd, txc=txc)
+        sink_logic = sink.create_logic(clk, rst, rxd=txd, rxc=txc)
+
+        for f in frames:
+            source.send(b'\x55\x55\x55\x55\x55\x55\x55\xd5'+f)
+
+        beats = sum((len(f)+8+12+width//8-1)//(width//8) for f in frames)
+
+        return [source_logic, sink_logic], sink, beats
+
+    return create
+
+
+def gmii_bench(frames):
+    def create(clk, rst):
+        source = gmii_ep.GMIISource()
+        sink = gmii_ep.GMIISink()
+
+        txd = Signal(intbv(0)[8:])
+        tx_en = Signal(bool(0))
+        tx_er = Signal(bool(0))
+
+        source_logic = source.create_logic(clk, rst, txd=txd, tx_en=tx_en, tx_er=tx_er)
+        sink_logic = sink.create_logic(clk, rst, rxd=txd, rx_dv=tx_en, rx_er=tx_er)
+
+        for f in frames:
+            source.send(b'\x55\x55\x55\x55\x55\x55\x55\xd5'+f)
+
+        beats = sum(len(f)+8+12 for f in frames)
+
+        return [source_logic, sink_logic], sink, beats
+
+    return create
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', help="Numbers of queued frames", type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('-l', '--length', help="Frame length", type=int, default=64)
+    parser.add_argument('--seed', help="Random seed", type=int, default=1)
+
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    benches = [
+        ("axis 64", axis_bench),
+        ("xgmii 64", xgmii_bench),
+        ("gmii", gmii_bench),
+    ]
+
+    for name, bench in benches:
+        for n in args.n:
+            frames = [bytearray(rng.randrange(256) for k in range(args.length)) for k in range(n)]
+            elapsed, beats = run_sim(bench(frames), n)
+            print(f"{name:10s} {n:8d} frames {beats:10d} beats {elapsed:8.2f} s {elapsed/beats*1e6:8.2f} us/beat")
+
+
+if __name__ == '__main__':
+    main()
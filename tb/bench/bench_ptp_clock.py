@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+MyHDL PtpClock model benchmark
+
+Runs the PtpClock model from tb/ptp.py on its own clock for a number of
+cycles and reports the simulator wall time per cycle, with both timestamp
+outputs connected and with only the 96-bit output connected.  With --ref,
+the same runs are done with a reference copy of ptp.py (e.g. from git show)
+and the ts_96, ts_64 and ts_step outputs are checked against it cycle by
+cycle, including timestamp loads, drift and reset, and the ts_96_ahead and
+ts_64_ahead predictions of the current model are checked against its
+outputs.
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from myhdl import Signal, intbv, always, delay, instance, Simulation, StopSimulation
+
+import ptp
+
+
+def load_module(path):
+    spec = importlib.util.spec_from_file_location("ptp_ref", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def run_sim(mods, cycles, connect_64=True, stim=None):
+    clk = Signal(bool(0))
+    rst = Signal(bool(0))
+
+    insts = []
+    clocks = []
+    outputs = []
+
+    for mod in mods:
+        ts_96 = Signal(intbv(0)[96:])
+        ts_64 = Signal(intbv(0)[64:])
+        ts_step = Signal(bool(0))
+        clock = mod.PtpClock()
+        kwargs = {'ts_96': ts_96, 'ts_step': ts_step}
+        if connect_64:
+            kwargs['ts_64'] = ts_64
+        insts.append(clock.create_logic(clk, rst, **kwargs))
+        clocks.append(clock)
+        outputs.append((ts_96, ts_64, ts_step))
+
+    trace = []
+
+    @always(delay(4))
+    def clkgen():
+        clk.next = not clk
+
+    @instance
+    def check():
+        if not stim:
+            yield delay(cycles*8)
+            raise StopSimulation
+        for k in range(cycles):
+            yield clk.posedge
+            yield delay(1)
+            trace.append([tuple(int(s) for s in o) for o in outputs])
+            stim(k, clocks, rst)
+        raise StopSimulation
+
+    start = time.perf_counter()
+    sim = Simulation(insts, clkgen, check)
+    sim.run(quiet=1)
+    sim.quit()
+    elapsed = time.perf_counter() - start
+
+    return elapsed, trace
+
+
+def random_stim(seed, predictions=None):
+    rng = random.Random(seed)
+
+    # cycles with stimulus, which ends the lookahead window of earlier predictions
+    changes = []
+
+    def stim(k, clocks, rst):
+        r = rng.random()
+        if r < 0.01:
+            ts = (rng.randrange(1 << 32) << 48) | (rng.randrange(1 << 30) << 16) | rng.randrange(1 << 16)
+            for c in clocks:
+                c.set_96(ts)
+        elif r < 0.02:
+            ts = rng.randrange(1 << 48)
+            for c in clocks:
+                c.set_64(ts)
+        elif r < 0.025:
+            rate = rng.choice([0, 1, 2, 5, 7])
+            for c in clocks:
+                c.drift_rate = rate
+        elif r < 0.027:
+            rst.next = 1
+            changes.append(k)
+            return
+        elif rst:
+            rst.next = 0
+            changes.append(k)
+            return
+        else:
+            if predictions is not None and rng.random() < 0.3:
+                # predict the outputs of the first clock, including the loads
+                # queued so far
+                n = rng.randrange(1, 200)
+                predictions.append((k, k+n, clocks[0].ts_96_ahead(n), clocks[0].ts_64_ahead(n), changes))
+            return
+
+        changes.append(k)
+
+    return stim
+
+
+def check_predictions(predictions, trace):
+    checked = 0
+    for k, t, ts_96, ts_64, changes in predictions:
+        if t >= len(trace) or any(k < c < t for c in changes):
+            continue
+        out = trace[t][0]
+        assert (ts_96, ts_64) == out[:2], f"lookahead from cycle {k} to {t}: {(ts_96, ts_64)} != {out[:2]}"
+        checked += 1
+    return checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', help="Number of clock cycles", type=int, default=100000)
+    parser.add_argument('--ref', help="Reference ptp.py to compare against", default=None)
+
+    args = parser.parse_args()
+
+    mods = [("current", ptp)]
+    if args.ref:
+        mods.append(("reference", load_module(args.ref)))
+
+    if args.ref:
+        print("Checking against reference (20000 cycles)...")
+        predictions = []
+        trace = run_sim([mod for name, mod in mods], 20000, stim=random_stim(1, predictions))[1]
+        for k, t in enumerate(trace):
+            assert t[0] == t[1], f"mismatch at cycle {k}: {t[0]} != {t[1]}"
+        print(f"OK ({check_predictions(predictions, trace)} lookahead predictions)")
+
+    for connect_64 in [True, False]:
+        for name, mod in mods:
+            elapsed = run_sim([mod], args.n, connect_64=connect_64)[0]
+            print(f"{'ts_96 + ts_64' if connect_64 else 'ts_96 only':14s} {name:10s} "
+                f"{args.n/elapsed:10.0f} cycles/s {elapsed/args.n*1e6:8.2f} us/cycle")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+PTP time distribution model micro-benchmarks
+
+Runs the PtpTdSource (as in the ptp_td_leaf testbench) and a PtpTdSource
+to PtpTdSink loopback (the sink side of the ptp_td_phc testbench) against
+plain Python signal objects, and reports how much simulated time the models
+advance per second of wall time.  With --ref, the same runs are done with a
+reference copy of ptp_td.py (e.g. from git show) and the serialized bit
+stream and delayed timestamps are checked against it.  The source bit stream
+is also run through the PtpTdDecoder bus monitor, which must decode it
+without violations or discontinuities.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tbsupport import ptp_td, ptp_td_monitor
+
+
+class BenchValue(int):
+    @property
+    def integer(self):
+        return int(self)
+
+
+class BenchSignal:
+    def __init__(self, path):
+        self._path = path
+        self._value = BenchValue(1)
+        self.writes = 0
+
+    def setimmediatevalue(self, value):
+        self._value = BenchValue(value)
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = BenchValue(value)
+        self.writes += 1
+
+
+def load_module(path):
+    spec = importlib.util.spec_from_file_location("ptp_td_ref", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def create(cls, name, **kwargs):
+    # coroutines are stepped by hand, so keep the model from starting itself
+    cls = type(cls.__name__, (cls,), {'_handle_reset': lambda self, state: None})
+    obj = cls(data=BenchSignal(f"{name}.data"), clock=BenchSignal(f"{name}.clk"), **kwargs)
+    run = obj._run()
+    run.send(None)
+    return obj, run
+
+
+def run_source(mod, name, cycles, period_ns, td_delay):
+    source, source_run = create(mod.PtpTdSource, name, period_ns=period_ns, td_delay=td_delay)
+
+    start = time.perf_counter()
+    for k in range(cycles):
+        source_run.send(None)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, source.data.writes
+
+
+def run_loopback(mod, name, cycles, period_ns, td_delay, trace=False):
+    source, source_run = create(mod.PtpTdSource, f"{name}.source", period_ns=period_ns, td_delay=td_delay)
+    sink, sink_run = create(mod.PtpTdSink, f"{name}.sink", period_ns=period_ns, td_delay=td_delay)
+    sink.data = source.data
+
+    t = []
+    start = time.perf_counter()
+    for k in range(cycles):
+        # sink samples the value driven on the previous cycle
+        sink_run.send(None)
+        source_run.send(None)
+        if trace:
+            t.append((int(source.data.value), source.get_ts_tod(), source.get_ts_rel(), sink.get_ts_tod()))
+    elapsed = time.perf_counter() - start
+
+    return elapsed, source.data.writes, t
+
+
+def run_decode(cycles, period_ns, td_delay):
+    source, source_run = create(ptp_td.PtpTdSource, "decode.source", period_ns=period_ns, td_delay=td_delay)
+
+    # level changes as (first sample cycle, level)
+    edges = []
+    data = None
+    for k in range(cycles):
+        source_run.send(None)
+        bit = int(source.data.value)
+        if bit != data:
+            edges.append((k+1, bit))
+            data = bit
+
+    decoder = ptp_td_monitor.PtpTdDecoder()
+
+    start = time.perf_counter()
+    decoder.restart(*edges[0])
+    for cycle, bit in edges[1:]:
+        decoder.edge(cycle, bit)
+    decoder.flush(cycles+1)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, decoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', help="Number of clock cycles", type=int, default=200000)
+    parser.add_argument('--period', help="Clock period (ns)", type=float, default=6.4)
+    parser.add_argument('--td-delay', help="Time distribution delay (cycles)", type=int, default=32)
+    parser.add_argument('--ref', help="Reference ptp_td.py to compare against", default=None)
+
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    mods = [("current", ptp_td)]
+    if args.ref:
+        mods.append(("reference", load_module(args.ref)))
+
+    if args.ref:
+        print("Checking loopback against reference (20000 cycles)...")
+        traces = [run_loopback(mod, name, 20000, args.period, args.td_delay, trace=True)[2] for name, mod in mods]
+        for k, (a, b) in enumerate(zip(*traces)):
+            assert a == b, f"mismatch at cycle {k}: {a} != {b}"
+        print("OK")
+
+    sim_us = args.n*args.period/1000
+
+    for bench_name, bench in [("leaf (source)", run_source), ("phc (loopback)", run_loopback)]:
+        for name, mod in mods:
+            elapsed, writes = bench(mod, name, args.n, args.period, args.td_delay)[:2]
+            print(f"{bench_name:16s} {name:10s} {args.n/elapsed:12.0f} cycles/s "
+                f"{sim_us/elapsed:10.1f} sim us/s {writes:10d} signal writes")
+
+    elapsed, decoder = run_decode(args.n, args.period, args.td_delay)
+    print(f"{'monitor (decode)':16s} {'current':10s} {args.n/elapsed:12.0f} cycles/s "
+        f"{sim_us/elapsed:10.1f} sim us/s {decoder.messages:10d} messages")
+    decoder.check(args.n//256-2, strict=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# 16-bit one's complement checksum (RFC 1071) for the IP and UDP models
+#
+# As 2**16 is 1 modulo 0xffff, the one's complement sum of the big-endian
+# 16-bit words of the data is the value of the data as one big-endian
+# integer, modulo 0xffff (0xffff rather than 0 unless every byte is zero).
+# int.from_bytes() reads the buffer directly, so the sum runs in C without
+# copying or iterating over the words in Python; an odd trailing byte is
+# padded with zero by shifting the integer by one byte.  Sums are folded,
+# not inverted; checksum() returns the inverted 16-bit checksum.  Both are
+# bit-exact with the field by field and per-byte sums previously in ip_ep
+# and udp_ep.
+
+
+def fold(s):
+    while s >> 16:
+        s = (s & 0xffff) + (s >> 16)
+    return s
+
+
+def ones_sum(data, initial=0):
+    try:
+        n = int.from_bytes(data, 'big')
+    except TypeError:
+        # list of byte values
+        n = int.from_bytes(bytes(data), 'big')
+
+    if len(data) & 1:
+        n <<= 8
+
+    s = n % 0xffff
+    if not s and n:
+        s = 0xffff
+
+    return fold(s + initial)
+
+
+def checksum(data, initial=0):
+    return ~ones_sum(data, initial) & 0xffff
+
+
+def update(cksum, old, new):
+    # RFC 1624 incremental update (eqn. 3) of checksum cksum for a change
+    # of a 16-bit field from old to new; old and new may also be equal
+    # length byte strings (e.g. a whole header region)
+    if isinstance(old, int):
+        m = old
+        m1 = new
+    else:
+        if len(old) != len(new):
+            raise ValueError("old and new data must have the same length")
+        m = ones_sum(old)
+        m1 = ones_sum(new)
+    return ~fold((~cksum & 0xffff) + (~m & 0xffff) + m1) & 0xffff
+
+
+def update_words(cksum, old, new):
+    # incremental update of checksum cksum for each 16-bit word that differs
+    # between the sequences old and new
+    for m, m1 in zip(old, new):
+        if m != m1:
+            cksum = update(cksum, m, m1)
+    return cksum
+
+
+def ip_header_words(frame):
+    # 16-bit words of the IPv4 header of frame, excluding the checksum field
+    return (
+        frame.ip_version << 12 | frame.ip_ihl << 8 | frame.ip_dscp << 2 | frame.ip_ecn,
+        frame.ip_length,
+        frame.ip_identification,
+        frame.ip_flags << 13 | frame.ip_fragment_offset,
+        frame.ip_ttl << 8 | frame.ip_protocol,
+        (frame.ip_source_ip >> 16) & 0xffff,
+        frame.ip_source_ip & 0xffff,
+        (frame.ip_dest_ip >> 16) & 0xffff,
+        frame.ip_dest_ip & 0xffff,
+    )
+
+
+def ip_header_sum(frame):
+    # sum of the IPv4 header fields of frame, excluding the checksum field
+    return fold(sum(ip_header_words(frame)))
+
+
+def ip_header_checksum(frame):
+    return ~ip_header_sum(frame) & 0xffff
+
+
+def udp_pseudo_header_sum(frame):
+    s = frame.ip_source_ip & 0xffff
+    s += (frame.ip_source_ip >> 16) & 0xffff
+    s += frame.ip_dest_ip & 0xffff
+    s += (frame.ip_dest_ip >> 16) & 0xffff
+    s += frame.ip_protocol
+    s += frame.udp_length
+    return fold(s)
+
+
+def udp_header_words(frame):
+    # 16-bit words of the UDP pseudo header and header of frame, excluding
+    # the checksum field
+    return (
+        (frame.ip_source_ip >> 16) & 0xffff,
+        frame.ip_source_ip & 0xffff,
+        (frame.ip_dest_ip >> 16) & 0xffff,
+        frame.ip_dest_ip & 0xffff,
+        frame.ip_protocol,
+        frame.udp_length,
+        frame.udp_source_port,
+        frame.udp_dest_port,
+        frame.udp_length,
+    )
+
+
+def udp_checksum(frame, payload):
+    s = udp_pseudo_header_sum(frame)
+    s += frame.udp_source_port
+    s += frame.udp_dest_port
+    s += frame.udp_length
+    return checksum(payload, s)
@@ -22,11 +22,39 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 import axis_ep
 import struct
 import zlib
 
+# Ethernet header: destination MAC, source MAC (each split into 16 and 32
+# bits), ethertype
+eth_header = struct.Struct('>HLHLH')
+
+
+def pack_eth_header(buf, offset, frame):
+    eth_header.pack_into(buf, offset,
+        (frame.eth_dest_mac >> 32) & 0xffff, frame.eth_dest_mac & 0xffffffff,
+        (frame.eth_src_mac >> 32) & 0xffff, frame.eth_src_mac & 0xffffffff,
+        frame.eth_type)
+
+
+def unpack_eth_header(buf, offset=0):
+    dh, dl, sh, sl, t = eth_header.unpack_from(buf, offset)
+    return dh << 32 | dl, sh << 32 | sl, t
+
+
+def frame_bytes(data):
+    # raw bytes of a frame (AXIStreamFrame, bytes-like or list of byte values)
+    if isinstance(data, axis_ep.AXIStreamFrame):
+        data = data.data
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytearray(data)
+    return data
+
+
 class EthFrame(object):
     def __init__(self, payload=b'', eth_dest_mac=0, eth_src_mac=0, eth_type=0, eth_fcs=None):
         self._payload = axis_ep.AXIStreamFrame()
@@ -41,9 +69,7 @@ class EthFrame(object):
             self.eth_src_mac = payload['eth_src_mac']
             self.eth_type = payload['eth_type']
             self.eth_fcs = payload['eth_fcs']
-        if type(payload) is bytes:
-            payload = bytearray(payload)
-        if type(payload) is bytearray or type(payload) is axis_ep.AXIStreamFrame:
+        if type(payload) in (bytes, bytearray, axis_ep.AXIStreamFrame):
             self.payload = axis_ep.AXIStreamFrame(payload)
         if type(payload) is EthFrame:
             self.payload = axis_ep.AXIStreamFrame(payload.payload)
@@ -61,47 +87,45 @@ class EthFrame(object):
         self._payload = axis_ep.AXIStreamFrame(value)
 
     def calc_fcs(self):
-        frame = self.build_axis().data
-
-        return zlib.crc32(bytes(frame)) & 0xffffffff
+        return zlib.crc32(self.build_buffer()) & 0xffffffff
 
     def update_fcs(self):
         self.eth_fcs = self.calc_fcs()
 
-    def build_axis(self):
-        data = b''
-
-        data += struct.pack('>Q', self.eth_dest_mac)[2:]
-        data += struct.pack('>Q', self.eth_src_mac)[2:]
-        data += struct.pack('>H', self.eth_type)
-
-        data += self.payload.data
+    def build_buffer(self, headroom=0, tailroom=0):
+        # header and payload in a new buffer, after headroom bytes for the
+        # headers of outer layers; the payload is the only data copied
+        data = self.payload.data
+        offset = headroom + eth_header.size
+        buf = bytearray(offset + len(data) + tailroom)
+        pack_eth_header(buf, headroom, self)
+        buf[offset:offset+len(data)] = data
+        return buf
 
-        return axis_ep.AXIStreamFrame(data)
+    def build_axis(self):
+        return axis_ep.wrap_frame(self.build_buffer())
 
     def build_axis_fcs(self):
-        if self.eth_fcs is None:
-            self.update_fcs()
+        buf = self.build_buffer(tailroom=4)
 
-        data = self.build_axis().data
+        if self.eth_fcs is None:
+            with memoryview(buf) as mv:
+                self.eth_fcs = zlib.crc32(mv[:-4]) & 0xffffffff
 
-        data += struct.pack('<L', self.eth_fcs)
+        struct.pack_into('<L', buf, len(buf)-4, self.eth_fcs)
 
-        return axis_ep.AXIStreamFrame(data)
+        return axis_ep.wrap_frame(buf)
 
-    def parse_axis(self, data):
-        data = axis_ep.AXIStreamFrame(data).data
-        self.eth_dest_mac = struct.unpack('>Q', b'\x00\x00'+data[0:6])[0]
-        self.eth_src_mac = struct.unpack('>Q', b'\x00\x00'+data[6:12])[0]
-        self.eth_type = struct.unpack('>H', data[12:14])[0]
-        data = data[14:]
-        self.payload = axis_ep.AXIStreamFrame(data)
+    def parse_axis(self, data, tailroom=0):
+        data = frame_bytes(data)
+        self.eth_dest_mac, self.eth_src_mac, self.eth_type = unpack_eth_header(data)
+        with memoryview(data) as mv:
+            self._payload = axis_ep.wrap_frame(bytearray(mv[eth_header.size:len(mv)-tailroom]))
 
     def parse_axis_fcs(self, data):
-        self.parse_axis(data)
-        data = self.payload.data
-        self.payload = axis_ep.AXIStreamFrame(data[:-4])
-        self.eth_fcs = struct.unpack('<L', data[-4:])[0]
+        data = frame_bytes(data)
+        self.parse_axis(data, tailroom=4)
+        self.eth_fcs = struct.unpack_from('<L', data, len(data)-4)[0]
 
     def __eq__(self, other):
         if type(other) is EthFrame:
@@ -124,9 +148,9 @@ class EthFrameSource():
     def __init__(self):
         self.active = False
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.payload_source = axis_ep.AXIStreamSource()
-        self.header_queue = []
+        self.header_queue = deque()
         self.clk = Signal(bool(0))
 
     def send(self, frame):
@@ -202,7 +226,7 @@ class EthFrameSource():
                         eth_hdr_valid.next = False
                         self.active = False
                     if not self.active and self.header_queue:
-                        frame = self.header_queue.pop(0)
+                        frame = self.header_queue.popleft()
                         eth_dest_mac.next = frame.eth_dest_mac
                         eth_src_mac.next = frame.eth_src_mac
                         eth_type.next = frame.eth_type
@@ -214,7 +238,7 @@ class EthFrameSource():
                         self.active = True
 
                     if self.queue and not self.header_queue:
-                        frame = self.queue.pop(0)
+                        frame = self.queue.popleft()
                         self.header_queue.append(frame)
                         self.payload_source.send(frame.payload)
 
@@ -224,14 +248,14 @@ class EthFrameSource():
 class EthFrameSink():
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.payload_sink = axis_ep.AXIStreamSink()
-        self.header_queue = []
+        self.header_queue = deque()
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def count(self):
@@ -311,7 +335,7 @@ class EthFrameSink():
                         self.header_queue.append(frame)
 
                     if not self.payload_sink.empty() and self.header_queue:
-                        frame = self.header_queue.pop(0)
+                        frame = self.header_queue.popleft()
                         frame.payload = self.payload_sink.recv()
                         self.queue.append(frame)
                         self.sync.next = not self.sync
@@ -26,6 +26,7 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
+import sys
 
 import pytest
 import cocotb_test.simulator
@@ -33,13 +34,22 @@ import cocotb_test.simulator
 import cocotb
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
-from cocotb.utils import get_time_from_sim_steps
 from cocotb.regression import TestFactory
 
 from cocotbext.eth import XgmiiFrame, XgmiiSource, XgmiiSink, PtpClockSimTime
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink, AxiStreamFrame
 from cocotbext.axi.stream import define_stream
 
+try:
+    from tbsupport import IfgAnalyzer, PtpTsAuditor, ThroughputMeter
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import IfgAnalyzer, PtpTsAuditor, ThroughputMeter
+    finally:
+        del sys.path[0]
+
 
 PtpTsBus, PtpTsTransaction, PtpTsSource, PtpTsSink, PtpTsMonitor = define_stream("PtpTs",
     signals=["ts_96", "ts_valid"],
@@ -120,30 +130,25 @@ async def run_test_rx(dut, payload_lengths=None, payload_data=None, ifg=12):
         test_frame = XgmiiFrame.from_payload(test_data, tx_complete=tx_frames.append)
         await tb.xgmii_source.send(test_frame)
 
-    for test_data in test_frames:
+    auditor = PtpTsAuditor(tb.clk_period, tb.clk_period, tb.clk_period*2, direction='rx', log=tb.log)
+
+    for k, test_data in enumerate(test_frames):
         rx_frame = await tb.axis_sink.recv()
         tx_frame = tx_frames.pop(0)
 
         frame_error = rx_frame.tuser & 1
-        ptp_ts = rx_frame.tuser >> 1
-        ptp_ts_ns = ptp_ts / 2**16
 
-        tx_frame_sfd_ns = get_time_from_sim_steps(tx_frame.sim_time_sfd, "ns")
-
-        if tx_frame.start_lane == 4:
-            # start in lane 4 reports 1 full cycle delay, so subtract half clock period
-            tx_frame_sfd_ns -= tb.clk_period/2
-
-        tb.log.info("RX frame PTP TS: %f ns", ptp_ts_ns)
-        tb.log.info("TX frame SFD sim time: %f ns", tx_frame_sfd_ns)
-        tb.log.info("Difference: %f ns", abs(ptp_ts_ns - tx_frame_sfd_ns))
+        auditor.add_frame(k, tx_frame)
+        auditor.add_ts(k, rx_frame.tuser >> 1)
 
         assert rx_frame.tdata == test_data
         assert frame_error == 0
-        assert abs(ptp_ts_ns - tx_frame_sfd_ns - tb.clk_period) < tb.clk_period*2
 
     assert tb.axis_sink.empty()
 
+    auditor.log_summary()
+    auditor.check(len(test_frames))
+
     await RisingEdge(dut.logic_clk)
     await RisingEdge(dut.logic_clk)
 
@@ -166,32 +171,28 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None, ifg=12):
 
     test_frames = [payload_data(x) for x in payload_lengths()]
 
-    for test_data in test_frames:
-        await tb.axis_source.send(AxiStreamFrame(test_data, tuser=2))
+    auditor = PtpTsAuditor(tb.clk_period, tb.clk_period, tb.clk_period*2, direction='tx', log=tb.log)
 
-    for test_data in test_frames:
+    for k, test_data in enumerate(test_frames):
+        # request a timestamp (tuser bit 1), tagged with the frame index
+        await tb.axis_source.send(AxiStreamFrame(test_data, tuser=(k << 2) | 2))
+
+    for k, test_data in enumerate(test_frames):
         rx_frame = await tb.xgmii_sink.recv()
         ptp_ts = await tb.tx_ptp_ts_sink.recv()
 
-        ptp_ts_ns = int(ptp_ts.ts_96) / 2**16
-
-        rx_frame_sfd_ns = get_time_from_sim_steps(rx_frame.sim_time_sfd, "ns")
-
-        if rx_frame.start_lane == 4:
-            # start in lane 4 reports 1 full cycle delay, so subtract half clock period
-            rx_frame_sfd_ns -= tb.clk_period/2
-
-        tb.log.info("TX frame PTP TS: %f ns", ptp_ts_ns)
-        tb.log.info("RX frame SFD sim time: %f ns", rx_frame_sfd_ns)
-        tb.log.info("Difference: %f ns", abs(rx_frame_sfd_ns - ptp_ts_ns))
+        auditor.add_frame(k, rx_frame)
+        auditor.add_ts(ptp_ts.ts_tag, ptp_ts.ts_96)
 
         assert rx_frame.get_payload() == test_data
         assert rx_frame.check_fcs()
         assert rx_frame.ctrl is None
-        assert abs(rx_frame_sfd_ns - ptp_ts_ns - tb.clk_period) < tb.clk_period*2
 
     assert tb.xgmii_sink.empty()
 
+    auditor.log_summary()
+    auditor.check(len(test_frames))
+
     await RisingEdge(dut.logic_clk)
     await RisingEdge(dut.logic_clk)
 
@@ -202,8 +203,6 @@ async def run_test_tx_alignment(dut, payload_data=None, ifg=12):
 
     tb = TB(dut)
 
-    byte_width = tb.axis_source.width // 8
-
     tb.xgmii_source.ifg = ifg
     tb.dut.cfg_ifg.value = ifg
     tb.dut.cfg_tx_enable.value = 1
@@ -216,6 +215,10 @@ async def run_test_tx_alignment(dut, payload_data=None, ifg=12):
     for k in range(1000):
         await RisingEdge(dut.tx_clk)
 
+    ifg_analyzer = IfgAnalyzer(tb.xgmii_sink, tb.clk_period, 'ns', ifg=ifg, enable_dic=enable_dic, log=tb.log)
+
+    auditor = PtpTsAuditor(tb.clk_period, tb.clk_period, tb.clk_period*2, direction='tx', log=tb.log)
+
     for length in range(60, 92):
 
         for k in range(10):
@@ -224,68 +227,125 @@ async def run_test_tx_alignment(dut, payload_data=None, ifg=12):
         test_frames = [payload_data(length) for k in range(10)]
         start_lane = []
 
-        for test_data in test_frames:
-            await tb.axis_source.send(AxiStreamFrame(test_data, tuser=2))
+        ifg_analyzer.restart()
+
+        for k, test_data in enumerate(test_frames):
+            # request a timestamp (tuser bit 1), tagged with the frame index
+            await tb.axis_source.send(AxiStreamFrame(test_data, tuser=(k << 2) | 2))
 
-        for test_data in test_frames:
+        for k, test_data in enumerate(test_frames):
             rx_frame = await tb.xgmii_sink.recv()
             ptp_ts = await tb.tx_ptp_ts_sink.recv()
 
-            ptp_ts_ns = int(ptp_ts.ts_96) / 2**16
-
-            rx_frame_sfd_ns = get_time_from_sim_steps(rx_frame.sim_time_sfd, "ns")
-
-            if rx_frame.start_lane == 4:
-                # start in lane 4 reports 1 full cycle delay, so subtract half clock period
-                rx_frame_sfd_ns -= 3.2
-
-            tb.log.info("TX frame PTP TS: %f ns", ptp_ts_ns)
-            tb.log.info("RX frame SFD sim time: %f ns", rx_frame_sfd_ns)
-            tb.log.info("Difference: %f ns", abs(rx_frame_sfd_ns - ptp_ts_ns))
+            auditor.add_frame(k, rx_frame)
+            auditor.add_ts(ptp_ts.ts_tag, ptp_ts.ts_96)
 
             assert rx_frame.get_payload() == test_data
             assert rx_frame.check_fcs()
             assert rx_frame.ctrl is None
-            assert abs(rx_frame_sfd_ns - ptp_ts_ns - tb.clk_period) < tb.clk_period*2
 
             start_lane.append(rx_frame.start_lane)
+            ifg_analyzer.add_frame(rx_frame)
 
         tb.log.info("length: %d", length)
         tb.log.info("start_lane: %s", start_lane)
 
-        start_lane_ref = []
+        ifg_analyzer.check(strict=True)
+
+        await RisingEdge(dut.logic_clk)
+
+    ifg_analyzer.log_summary()
+    auditor.log_summary()
+
+    assert tb.xgmii_sink.empty()
+
+    auditor.check((92-60)*10)
 
-        # compute expected starting lanes
-        lane = 0
-        deficit_idle_count = 0
+    await RisingEdge(dut.logic_clk)
+    await RisingEdge(dut.logic_clk)
 
-        for test_data in test_frames:
-            if ifg == 0:
-                lane = 0
 
-            start_lane_ref.append(lane)
-            lane = (lane + len(test_data)+4+ifg) % byte_width
+async def run_test_rx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12):
 
-            if enable_dic:
-                offset = lane % 4
-                if deficit_idle_count+offset >= 4:
-                    offset += 4
-                lane = (lane - offset) % byte_width
-                deficit_idle_count = (deficit_idle_count + offset) % 4
-            else:
-                offset = lane % 4
-                if offset > 0:
-                    offset += 4
-                lane = (lane - offset) % byte_width
+    tb = TB(dut)
 
-        tb.log.info("start_lane_ref: %s", start_lane_ref)
+    tb.xgmii_source.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_rx_enable.value = 1
 
-        assert start_lane_ref == start_lane
+    await tb.reset()
 
-        await RisingEdge(dut.logic_clk)
+    tb.log.info("Wait for PTP CDC lock")
+    while not dut.rx_ptp.rx_ptp_cdc.locked.value.integer:
+        await RisingEdge(dut.rx_clk)
+    for k in range(1000):
+        await RisingEdge(dut.rx_clk)
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"rx {payload_lengths.__name__}", 10e9, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        test_frame = XgmiiFrame.from_payload(test_data)
+        await tb.xgmii_source.send(test_frame)
+
+    for test_data in test_frames:
+        rx_frame = await tb.axis_sink.recv()
+
+        frame_error = rx_frame.tuser & 1
+
+        assert rx_frame.tdata == test_data
+        assert frame_error == 0
+
+        meter.add_axis_frame(rx_frame)
+
+    assert tb.axis_sink.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.logic_clk)
+    await RisingEdge(dut.logic_clk)
+
+
+async def run_test_tx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12):
+
+    tb = TB(dut)
+
+    tb.xgmii_source.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_tx_enable.value = 1
+
+    await tb.reset()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"tx {payload_lengths.__name__}", 10e9, ifg=ifg, log=tb.log)
+    meter.start()
+
+    ifg_analyzer = IfgAnalyzer(tb.xgmii_sink, tb.clk_period, 'ns', ifg=ifg,
+        enable_dic=int(os.getenv("PARAM_ENABLE_DIC")), log=tb.log)
+
+    for test_data in test_frames:
+        await tb.axis_source.send(test_data)
+
+    for test_data in test_frames:
+        rx_frame = await tb.xgmii_sink.recv()
+
+        assert rx_frame.get_payload() == test_data
+        assert rx_frame.check_fcs()
+        assert rx_frame.ctrl is None
+
+        meter.add_frame(rx_frame)
+        ifg_analyzer.add_frame(rx_frame)
 
     assert tb.xgmii_sink.empty()
 
+    ifg_analyzer.log_summary()
+    ifg_analyzer.check()
+
+    meter.finish(ifg_stats=ifg_analyzer.summary())
+
     await RisingEdge(dut.logic_clk)
     await RisingEdge(dut.logic_clk)
 
@@ -294,6 +354,14 @@ def size_list():
     return list(range(60, 128)) + [512, 1514, 9214] + [60]*10
 
 
+def min_size_list():
+    return [60]*256
+
+
+def jumbo_size_list():
+    return [9214]*16
+
+
 def incrementing_payload(length):
     return bytearray(itertools.islice(itertools.cycle(range(256)), length))
 
@@ -302,7 +370,17 @@ def cycle_en():
     return itertools.cycle([0, 0, 0, 1])
 
 
-if cocotb.SIM_NAME:
+if cocotb.SIM_NAME and ThroughputMeter.enabled():
+
+    for test in [run_test_rx_throughput, run_test_tx_throughput]:
+
+        factory = TestFactory(test)
+        factory.add_option("payload_lengths", [min_size_list, jumbo_size_list])
+        factory.add_option("payload_data", [incrementing_payload])
+        factory.add_option("ifg", [12])
+        factory.generate_tests()
+
+elif cocotb.SIM_NAME:
 
     for test in [run_test_rx, run_test_tx]:
 
@@ -326,6 +404,7 @@ lib_dir = os.path.abspath(os.path.join(rtl_dir, '..', 'lib'))
 axis_rtl_dir = os.path.abspath(os.path.join(lib_dir, 'axis', 'rtl'))
 
 
+@pytest.mark.throughput
 @pytest.mark.parametrize("enable_dic", [1, 0])
 @pytest.mark.parametrize("data_width", [32, 64])
 def test_eth_mac_10g_fifo(request, data_width, enable_dic):
@@ -27,6 +27,7 @@ import itertools
 import logging
 import struct
 import os
+import sys
 
 from scapy.layers.l2 import Ether
 
@@ -36,13 +37,22 @@ import cocotb_test.simulator
 import cocotb
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
-from cocotb.utils import get_time_from_sim_steps
 from cocotb.regression import TestFactory
 
 from cocotbext.eth import GmiiFrame, GmiiSource, GmiiSink, PtpClockSimTime
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink, AxiStreamFrame
 from cocotbext.axi.stream import define_stream
 
+try:
+    from tbsupport import PtpTsAuditor, ThroughputMeter
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import PtpTsAuditor, ThroughputMeter
+    finally:
+        del sys.path[0]
+
 
 PtpTsBus, PtpTsTransaction, PtpTsSource, PtpTsSink, PtpTsMonitor = define_stream("PtpTs",
     signals=["ts", "ts_valid"],
@@ -204,26 +214,25 @@ async def run_test_rx(dut, payload_lengths=None, payload_data=None, ifg=12, enab
         test_frame = GmiiFrame.from_payload(test_data, tx_complete=tx_frames.append)
         await tb.gmii_source.send(test_frame)
 
-    for test_data in test_frames:
+    auditor = PtpTsAuditor(8, 32 if enable_gen else 8, direction='rx', log=tb.log)
+
+    for k, test_data in enumerate(test_frames):
         rx_frame = await tb.axis_sink.recv()
         tx_frame = tx_frames.pop(0)
 
         frame_error = rx_frame.tuser & 1
-        ptp_ts = rx_frame.tuser >> 1
-        ptp_ts_ns = ptp_ts / 2**16
 
-        tx_frame_sfd_ns = get_time_from_sim_steps(tx_frame.sim_time_sfd, "ns")
-
-        tb.log.info("RX frame PTP TS: %f ns", ptp_ts_ns)
-        tb.log.info("TX frame SFD sim time: %f ns", tx_frame_sfd_ns)
-        tb.log.info("Difference: %f ns", abs(ptp_ts_ns - tx_frame_sfd_ns))
+        auditor.add_frame(k, tx_frame)
+        auditor.add_ts(k, rx_frame.tuser >> 1)
 
         assert rx_frame.tdata == test_data
         assert frame_error == 0
-        assert abs(ptp_ts_ns - tx_frame_sfd_ns - (32 if enable_gen else 8)) < 0.01
 
     assert tb.axis_sink.empty()
 
+    auditor.log_summary()
+    auditor.check(len(test_frames))
+
     await RisingEdge(dut.rx_clk)
     await RisingEdge(dut.rx_clk)
 
@@ -246,28 +255,28 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None, ifg=12, enab
 
     test_frames = [payload_data(x) for x in payload_lengths()]
 
-    for test_data in test_frames:
-        await tb.axis_source.send(AxiStreamFrame(test_data, tuser=2))
+    auditor = PtpTsAuditor(8, 32 if enable_gen else 8, direction='tx', log=tb.log)
 
-    for test_data in test_frames:
+    for k, test_data in enumerate(test_frames):
+        # request a timestamp (tuser bit 1), tagged with the frame index
+        await tb.axis_source.send(AxiStreamFrame(test_data, tuser=(k << 2) | 2))
+
+    for k, test_data in enumerate(test_frames):
         rx_frame = await tb.gmii_sink.recv()
         ptp_ts = await tb.tx_ptp_ts_sink.recv()
 
-        ptp_ts_ns = int(ptp_ts.ts) / 2**16
-
-        rx_frame_sfd_ns = get_time_from_sim_steps(rx_frame.sim_time_sfd, "ns")
-
-        tb.log.info("TX frame PTP TS: %f ns", ptp_ts_ns)
-        tb.log.info("RX frame SFD sim time: %f ns", rx_frame_sfd_ns)
-        tb.log.info("Difference: %f ns", abs(rx_frame_sfd_ns - ptp_ts_ns))
+        auditor.add_frame(k, rx_frame)
+        auditor.add_ts(ptp_ts.ts_tag, ptp_ts.ts)
 
         assert rx_frame.get_payload() == test_data
         assert rx_frame.check_fcs()
         assert rx_frame.error is None
-        assert abs(rx_frame_sfd_ns - ptp_ts_ns - (32 if enable_gen else 8)) < 0.01
 
     assert tb.gmii_sink.empty()
 
+    auditor.log_summary()
+    auditor.check(len(test_frames))
+
     await RisingEdge(dut.tx_clk)
     await RisingEdge(dut.tx_clk)
 
@@ -656,10 +665,94 @@ async def run_test_pfc(dut, ifg=12, enable_gen=None, mii_sel=True):
     await RisingEdge(dut.tx_clk)
 
 
+async def run_test_rx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12):
+
+    tb = TB(dut)
+
+    tb.gmii_source.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_rx_enable.value = 1
+    tb.dut.rx_mii_select.value = 0
+    tb.dut.tx_mii_select.value = 0
+
+    await tb.reset()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"rx {payload_lengths.__name__}", 1000e6, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        test_frame = GmiiFrame.from_payload(test_data)
+        await tb.gmii_source.send(test_frame)
+
+    for test_data in test_frames:
+        rx_frame = await tb.axis_sink.recv()
+
+        frame_error = rx_frame.tuser & 1
+
+        assert rx_frame.tdata == test_data
+        assert frame_error == 0
+
+        meter.add_axis_frame(rx_frame)
+
+    assert tb.axis_sink.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.rx_clk)
+    await RisingEdge(dut.rx_clk)
+
+
+async def run_test_tx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12):
+
+    tb = TB(dut)
+
+    tb.gmii_source.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_tx_enable.value = 1
+    tb.dut.rx_mii_select.value = 0
+    tb.dut.tx_mii_select.value = 0
+
+    await tb.reset()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"tx {payload_lengths.__name__}", 1000e6, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        await tb.axis_source.send(test_data)
+
+    for test_data in test_frames:
+        rx_frame = await tb.gmii_sink.recv()
+
+        assert rx_frame.get_payload() == test_data
+        assert rx_frame.check_fcs()
+        assert rx_frame.error is None
+
+        meter.add_frame(rx_frame)
+
+    assert tb.gmii_sink.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.tx_clk)
+    await RisingEdge(dut.tx_clk)
+
+
 def size_list():
     return list(range(60, 128)) + [512, 1514] + [60]*10
 
 
+def min_size_list():
+    return [60]*256
+
+
+def jumbo_size_list():
+    return [9214]*16
+
+
 def incrementing_payload(length):
     return bytearray(itertools.islice(itertools.cycle(range(256)), length))
 
@@ -668,7 +761,17 @@ def cycle_en():
     return itertools.cycle([0, 0, 0, 1])
 
 
-if cocotb.SIM_NAME:
+if cocotb.SIM_NAME and ThroughputMeter.enabled():
+
+    for test in [run_test_rx_throughput, run_test_tx_throughput]:
+
+        factory = TestFactory(test)
+        factory.add_option("payload_lengths", [min_size_list, jumbo_size_list])
+        factory.add_option("payload_data", [incrementing_payload])
+        factory.add_option("ifg", [12])
+        factory.generate_tests()
+
+elif cocotb.SIM_NAME:
 
     for test in [run_test_rx, run_test_tx]:
 
@@ -705,7 +808,8 @@ lib_dir = os.path.abspath(os.path.join(rtl_dir, '..', 'lib'))
 axis_rtl_dir = os.path.abspath(os.path.join(lib_dir, 'axis', 'rtl'))
 
 
-@pytest.mark.parametrize("pfc_en", [1, 0])
+# benchmarks only for the settings that affect throughput
+@pytest.mark.parametrize("pfc_en", [1, pytest.param(0, marks=pytest.mark.throughput)])
 def test_eth_mac_1g(request, pfc_en):
     dut = "eth_mac_1g"
     module = os.path.splitext(os.path.basename(__file__))[0]
@@ -26,7 +26,9 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
+import sys
 
+import pytest
 import cocotb_test.simulator
 
 import cocotb
@@ -37,6 +39,16 @@ from cocotb.regression import TestFactory
 from cocotbext.eth import GmiiFrame, GmiiSource, GmiiSink
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink
 
+try:
+    from tbsupport import ThroughputMeter
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import ThroughputMeter
+    finally:
+        del sys.path[0]
+
 
 class TB:
     def __init__(self, dut):
@@ -192,10 +204,92 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None, ifg=12, enab
     await RisingEdge(dut.logic_clk)
 
 
+async def run_test_rx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12):
+
+    tb = TB(dut)
+
+    tb.gmii_source.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_rx_enable.value = 1
+    tb.dut.rx_mii_select.value = 0
+    tb.dut.tx_mii_select.value = 0
+
+    await tb.reset()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"rx {payload_lengths.__name__}", 1000e6, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        test_frame = GmiiFrame.from_payload(test_data)
+        await tb.gmii_source.send(test_frame)
+
+    for test_data in test_frames:
+        rx_frame = await tb.axis_sink.recv()
+
+        assert rx_frame.tdata == test_data
+        assert rx_frame.tuser == 0
+
+        meter.add_axis_frame(rx_frame)
+
+    assert tb.axis_sink.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.logic_clk)
+    await RisingEdge(dut.logic_clk)
+
+
+async def run_test_tx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12):
+
+    tb = TB(dut)
+
+    tb.gmii_source.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_tx_enable.value = 1
+    tb.dut.rx_mii_select.value = 0
+    tb.dut.tx_mii_select.value = 0
+
+    await tb.reset()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"tx {payload_lengths.__name__}", 1000e6, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        await tb.axis_source.send(test_data)
+
+    for test_data in test_frames:
+        rx_frame = await tb.gmii_sink.recv()
+
+        assert rx_frame.get_payload() == test_data
+        assert rx_frame.check_fcs()
+        assert rx_frame.error is None
+
+        meter.add_frame(rx_frame)
+
+    assert tb.gmii_sink.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.logic_clk)
+    await RisingEdge(dut.logic_clk)
+
+
 def size_list():
     return list(range(60, 128)) + [512, 1514] + [60]*10
 
 
+def min_size_list():
+    return [60]*256
+
+
+def jumbo_size_list():
+    return [9214]*16
+
+
 def incrementing_payload(length):
     return bytearray(itertools.islice(itertools.cycle(range(256)), length))
 
@@ -204,7 +298,17 @@ def cycle_en():
     return itertools.cycle([0, 0, 0, 1])
 
 
-if cocotb.SIM_NAME:
+if cocotb.SIM_NAME and ThroughputMeter.enabled():
+
+    for test in [run_test_rx_throughput, run_test_tx_throughput]:
+
+        factory = TestFactory(test)
+        factory.add_option("payload_lengths", [min_size_list, jumbo_size_list])
+        factory.add_option("payload_data", [incrementing_payload])
+        factory.add_option("ifg", [12])
+        factory.generate_tests()
+
+elif cocotb.SIM_NAME:
 
     for test in [run_test_rx, run_test_tx]:
 
@@ -225,6 +329,7 @@ lib_dir = os.path.abspath(os.path.join(rtl_dir, '..', 'lib'))
 axis_rtl_dir = os.path.abspath(os.path.join(lib_dir, 'axis', 'rtl'))
 
 
+@pytest.mark.throughput
 def test_eth_mac_1g_fifo(request):
     dut = "eth_mac_1g_fifo"
     module = os.path.splitext(os.path.basename(__file__))[0]
@@ -26,16 +26,28 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
+import sys
 
+import pytest
 import cocotb_test.simulator
 
 import cocotb
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.eth import GmiiFrame, RgmiiPhy
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink, AxiStreamFrame
 
+try:
+    from tbsupport import QuadClock, SpeedPlan, ThroughputMeter, quad_clock_verilog
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import QuadClock, SpeedPlan, ThroughputMeter, quad_clock_verilog
+    finally:
+        del sys.path[0]
+
 
 class TB:
     def __init__(self, dut, speed=1000e6):
@@ -54,10 +66,8 @@ class TB:
         dut.cfg_tx_enable.setimmediatevalue(0)
         dut.cfg_rx_enable.setimmediatevalue(0)
 
-        dut.gtx_clk.setimmediatevalue(0)
-        dut.gtx_clk90.setimmediatevalue(0)
-
-        cocotb.start_soon(self._run_gtx_clk())
+        self.gtx_clk = QuadClock(dut.gtx_clk, dut.gtx_clk90, 8, name="gtx_clk_gen")
+        self.gtx_clk.start()
 
     async def reset(self):
         self.dut.gtx_rst.setimmediatevalue(0)
@@ -70,18 +80,6 @@ class TB:
         await RisingEdge(self.dut.gtx_clk)
         await RisingEdge(self.dut.gtx_clk)
 
-    async def _run_gtx_clk(self):
-        t = Timer(2, 'ns')
-        while True:
-            self.dut.gtx_clk.value = 1
-            await t
-            self.dut.gtx_clk90.value = 1
-            await t
-            self.dut.gtx_clk.value = 0
-            await t
-            self.dut.gtx_clk90.value = 0
-            await t
-
 
 async def run_test_rx(dut, payload_lengths=None, payload_data=None, ifg=12, speed=1000e6):
 
@@ -103,7 +101,10 @@ async def run_test_rx(dut, payload_lengths=None, payload_data=None, ifg=12, spee
     else:
         assert dut.speed == 2
 
-    test_frames = [payload_data(x) for x in payload_lengths()]
+    plan = SpeedPlan(f"rx {payload_lengths.__name__}", speed, log=tb.log)
+    test_frames = [payload_data(x) for x in plan.lengths(payload_lengths())]
+
+    plan.start()
 
     for test_data in test_frames:
         test_frame = GmiiFrame.from_payload(test_data)
@@ -117,6 +118,8 @@ async def run_test_rx(dut, payload_lengths=None, payload_data=None, ifg=12, spee
 
     assert tb.axis_sink.empty()
 
+    plan.finish()
+
     await RisingEdge(dut.rx_clk)
     await RisingEdge(dut.rx_clk)
 
@@ -141,7 +144,10 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None, ifg=12, spee
     else:
         assert dut.speed == 2
 
-    test_frames = [payload_data(x) for x in payload_lengths()]
+    plan = SpeedPlan(f"tx {payload_lengths.__name__}", speed, log=tb.log)
+    test_frames = [payload_data(x) for x in plan.lengths(payload_lengths())]
+
+    plan.start()
 
     for test_data in test_frames:
         await tb.axis_source.send(test_data)
@@ -155,6 +161,8 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None, ifg=12, spee
 
     assert tb.rgmii_phy.tx.empty()
 
+    plan.finish()
+
     await RisingEdge(dut.tx_clk)
     await RisingEdge(dut.tx_clk)
 
@@ -247,10 +255,101 @@ async def run_test_tx_error(dut, ifg=12, speed=1000e6):
     await RisingEdge(dut.tx_clk)
 
 
+async def run_test_rx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12, speed=1000e6):
+
+    tb = TB(dut, speed)
+
+    tb.rgmii_phy.rx.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_rx_enable.value = 1
+
+    await tb.reset()
+
+    for k in range(100):
+        await RisingEdge(dut.rx_clk)
+
+    if speed == 10e6:
+        assert dut.speed == 0
+    elif speed == 100e6:
+        assert dut.speed == 1
+    else:
+        assert dut.speed == 2
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"rx {payload_lengths.__name__}", speed, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        test_frame = GmiiFrame.from_payload(test_data)
+        await tb.rgmii_phy.rx.send(test_frame)
+
+    for test_data in test_frames:
+        rx_frame = await tb.axis_sink.recv()
+
+        assert rx_frame.tdata == test_data
+        assert rx_frame.tuser == 0
+
+        meter.add_axis_frame(rx_frame)
+
+    assert tb.axis_sink.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.rx_clk)
+    await RisingEdge(dut.rx_clk)
+
+
+async def run_test_tx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12, speed=1000e6):
+
+    tb = TB(dut, speed)
+
+    tb.rgmii_phy.rx.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_tx_enable.value = 1
+
+    await tb.reset()
+
+    for k in range(100):
+        await RisingEdge(dut.rx_clk)
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"tx {payload_lengths.__name__}", speed, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        await tb.axis_source.send(test_data)
+
+    for test_data in test_frames:
+        rx_frame = await tb.rgmii_phy.tx.recv()
+
+        assert rx_frame.get_payload() == test_data
+        assert rx_frame.check_fcs()
+        assert rx_frame.error is None
+
+        meter.add_frame(rx_frame)
+
+    assert tb.rgmii_phy.tx.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.tx_clk)
+    await RisingEdge(dut.tx_clk)
+
+
 def size_list():
     return list(range(60, 128)) + [512, 1514] + [60]*10
 
 
+def min_size_list():
+    return [60]*256
+
+
+def jumbo_size_list():
+    return [9214]*16
+
+
 def incrementing_payload(length):
     return bytearray(itertools.islice(itertools.cycle(range(256)), length))
 
@@ -259,7 +358,18 @@ def cycle_en():
     return itertools.cycle([0, 0, 0, 1])
 
 
-if cocotb.SIM_NAME:
+if cocotb.SIM_NAME and ThroughputMeter.enabled():
+
+    for test in [run_test_rx_throughput, run_test_tx_throughput]:
+
+        factory = TestFactory(test)
+        factory.add_option("payload_lengths", [min_size_list, jumbo_size_list])
+        factory.add_option("payload_data", [incrementing_payload])
+        factory.add_option("ifg", [12])
+        factory.add_option("speed", [1000e6])
+        factory.generate_tests()
+
+elif cocotb.SIM_NAME:
 
     for test in [run_test_rx, run_test_tx]:
 
@@ -286,6 +396,7 @@ lib_dir = os.path.abspath(os.path.join(rtl_dir, '..', 'lib'))
 axis_rtl_dir = os.path.abspath(os.path.join(lib_dir, 'axis', 'rtl'))
 
 
+@pytest.mark.throughput
 def test_eth_mac_1g_rgmii(request):
     dut = "eth_mac_1g_rgmii"
     module = os.path.splitext(os.path.basename(__file__))[0]
@@ -313,6 +424,15 @@ def test_eth_mac_1g_rgmii(request):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
+    # gtx_clk and gtx_clk90 are driven from a second root module
+    if not QuadClock.python_forced():
+        os.makedirs(sim_build, exist_ok=True)
+        gtx_clk_gen = quad_clock_verilog(os.path.join(sim_build, "gtx_clk_gen.v"), "gtx_clk_gen",
+            f"{dut}.gtx_clk", f"{dut}.gtx_clk90", 8)
+        verilog_sources.append(os.path.join(sim_build, f"{gtx_clk_gen}.v"))
+        toplevel = [toplevel, gtx_clk_gen]
+        extra_env['QUAD_CLOCK_HDL'] = gtx_clk_gen
+
     cocotb_test.simulator.run(
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
@@ -26,7 +26,9 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
+import sys
 
+import pytest
 import cocotb_test.simulator
 
 import cocotb
@@ -36,6 +38,16 @@ from cocotb.regression import TestFactory
 from cocotbext.eth import GmiiFrame, MiiPhy
 from cocotbext.axi import AxiStreamBus, AxiStreamSource, AxiStreamSink, AxiStreamFrame
 
+try:
+    from tbsupport import SpeedPlan, ThroughputMeter
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import SpeedPlan, ThroughputMeter
+    finally:
+        del sys.path[0]
+
 
 class TB:
     def __init__(self, dut, speed=100e6):
@@ -76,7 +88,10 @@ async def run_test_rx(dut, payload_lengths=None, payload_data=None, ifg=12, spee
 
     await tb.reset()
 
-    test_frames = [payload_data(x) for x in payload_lengths()]
+    plan = SpeedPlan(f"rx {payload_lengths.__name__}", speed, full_speed=100e6, log=tb.log)
+    test_frames = [payload_data(x) for x in plan.lengths(payload_lengths())]
+
+    plan.start()
 
     for test_data in test_frames:
         test_frame = GmiiFrame.from_payload(test_data)
@@ -90,6 +105,8 @@ async def run_test_rx(dut, payload_lengths=None, payload_data=None, ifg=12, spee
 
     assert tb.axis_sink.empty()
 
+    plan.finish()
+
     await RisingEdge(dut.rx_clk)
     await RisingEdge(dut.rx_clk)
 
@@ -104,7 +121,10 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None, ifg=12, spee
 
     await tb.reset()
 
-    test_frames = [payload_data(x) for x in payload_lengths()]
+    plan = SpeedPlan(f"tx {payload_lengths.__name__}", speed, full_speed=100e6, log=tb.log)
+    test_frames = [payload_data(x) for x in plan.lengths(payload_lengths())]
+
+    plan.start()
 
     for test_data in test_frames:
         await tb.axis_source.send(test_data)
@@ -118,6 +138,8 @@ async def run_test_tx(dut, payload_lengths=None, payload_data=None, ifg=12, spee
 
     assert tb.mii_phy.tx.empty()
 
+    plan.finish()
+
     await RisingEdge(dut.tx_clk)
     await RisingEdge(dut.tx_clk)
 
@@ -198,10 +220,88 @@ async def run_test_tx_error(dut, ifg=12):
     await RisingEdge(dut.tx_clk)
 
 
+async def run_test_rx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12, speed=100e6):
+
+    tb = TB(dut, speed)
+
+    tb.mii_phy.rx.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_rx_enable.value = 1
+
+    await tb.reset()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"rx {payload_lengths.__name__}", speed, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        test_frame = GmiiFrame.from_payload(test_data)
+        await tb.mii_phy.rx.send(test_frame)
+
+    for test_data in test_frames:
+        rx_frame = await tb.axis_sink.recv()
+
+        assert rx_frame.tdata == test_data
+        assert rx_frame.tuser == 0
+
+        meter.add_axis_frame(rx_frame)
+
+    assert tb.axis_sink.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.rx_clk)
+    await RisingEdge(dut.rx_clk)
+
+
+async def run_test_tx_throughput(dut, payload_lengths=None, payload_data=None, ifg=12, speed=100e6):
+
+    tb = TB(dut, speed)
+
+    tb.mii_phy.rx.ifg = ifg
+    tb.dut.cfg_ifg.value = ifg
+    tb.dut.cfg_tx_enable.value = 1
+
+    await tb.reset()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    meter = ThroughputMeter(f"tx {payload_lengths.__name__}", speed, ifg=ifg, log=tb.log)
+    meter.start()
+
+    for test_data in test_frames:
+        await tb.axis_source.send(test_data)
+
+    for test_data in test_frames:
+        rx_frame = await tb.mii_phy.tx.recv()
+
+        assert rx_frame.get_payload() == test_data
+        assert rx_frame.check_fcs()
+        assert rx_frame.error is None
+
+        meter.add_frame(rx_frame)
+
+    assert tb.mii_phy.tx.empty()
+
+    meter.finish()
+
+    await RisingEdge(dut.tx_clk)
+    await RisingEdge(dut.tx_clk)
+
+
 def size_list():
     return list(range(60, 128)) + [512, 1514] + [60]*10
 
 
+def min_size_list():
+    return [60]*256
+
+
+def jumbo_size_list():
+    return [9214]*16
+
+
 def incrementing_payload(length):
     return bytearray(itertools.islice(itertools.cycle(range(256)), length))
 
@@ -210,7 +310,18 @@ def cycle_en():
     return itertools.cycle([0, 0, 0, 1])
 
 
-if cocotb.SIM_NAME:
+if cocotb.SIM_NAME and ThroughputMeter.enabled():
+
+    for test in [run_test_rx_throughput, run_test_tx_throughput]:
+
+        factory = TestFactory(test)
+        factory.add_option("payload_lengths", [min_size_list, jumbo_size_list])
+        factory.add_option("payload_data", [incrementing_payload])
+        factory.add_option("ifg", [12])
+        factory.add_option("speed", [100e6])
+        factory.generate_tests()
+
+elif cocotb.SIM_NAME:
 
     for test in [run_test_rx, run_test_tx]:
 
@@ -236,6 +347,7 @@ lib_dir = os.path.abspath(os.path.join(rtl_dir, '..', 'lib'))
 axis_rtl_dir = os.path.abspath(os.path.join(lib_dir, 'axis', 'rtl'))
 
 
+@pytest.mark.throughput
 def test_eth_mac_mii(request):
     dut = "eth_mac_mii"
     module = os.path.splitext(os.path.basename(__file__))[0]
@@ -1 +0,0 @@
-../baser.py
\ No newline at end of file
@@ -27,23 +27,26 @@ import itertools
 import logging
 import os
 import sys
+import time
 
+import pytest
 import cocotb_test.simulator
 
 import cocotb
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
+from cocotb.utils import get_sim_time
 from cocotb.regression import TestFactory
 
 from cocotbext.eth import XgmiiSource, XgmiiSink, XgmiiFrame
 
 try:
-    from baser import BaseRSerdesSource, BaseRSerdesSink
+    from tbsupport import BaseRSerdesSource, BaseRSerdesSink, ThroughputMeter
 except ImportError:
-    # attempt import from current directory
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     try:
-        from baser import BaseRSerdesSource, BaseRSerdesSink
+        from tbsupport import BaseRSerdesSource, BaseRSerdesSink, ThroughputMeter
     finally:
         del sys.path[0]
 
@@ -61,8 +64,11 @@ class TB:
         self.xgmii_source = XgmiiSource(dut.xgmii_txd, dut.xgmii_txc, dut.tx_clk, dut.tx_rst)
         self.xgmii_sink = XgmiiSink(dut.xgmii_rxd, dut.xgmii_rxc, dut.rx_clk, dut.rx_rst)
 
-        self.serdes_source = BaseRSerdesSource(dut.serdes_rx_data, dut.serdes_rx_hdr, dut.rx_clk, slip=dut.serdes_rx_bitslip)
-        self.serdes_sink = BaseRSerdesSink(dut.serdes_tx_data, dut.serdes_tx_hdr, dut.tx_clk)
+        bit_reverse = bool(int(os.getenv("PARAM_BIT_REVERSE", "0")))
+
+        self.serdes_source = BaseRSerdesSource(dut.serdes_rx_data, dut.serdes_rx_hdr, dut.rx_clk,
+            slip=dut.serdes_rx_bitslip, reverse=bit_reverse)
+        self.serdes_sink = BaseRSerdesSink(dut.serdes_tx_data, dut.serdes_tx_hdr, dut.tx_clk, reverse=bit_reverse)
 
         dut.cfg_tx_prbs31_enable.setimmediatevalue(0)
         dut.cfg_rx_prbs31_enable.setimmediatevalue(0)
@@ -181,10 +187,53 @@ async def run_test_rx_frame_sync(dut):
     await RisingEdge(dut.rx_clk)
 
 
+async def run_test_bench(dut, payload_lengths=None, payload_data=None):
+
+    tb = TB(dut)
+
+    await tb.reset()
+
+    tb.log.info("Wait for block lock")
+    while not dut.rx_block_lock.value.integer:
+        await RisingEdge(dut.rx_clk)
+
+    # clear out sink buffer
+    tb.xgmii_sink.clear()
+
+    test_frames = [payload_data(x) for x in payload_lengths()]
+
+    start_time = time.perf_counter()
+    start_sim_time = get_sim_time('ns')
+
+    for test_data in test_frames:
+        await tb.serdes_source.send(XgmiiFrame.from_payload(test_data))
+        await tb.xgmii_source.send(XgmiiFrame.from_payload(test_data))
+
+    for test_data in test_frames:
+        rx_frame = await tb.xgmii_sink.recv()
+        assert rx_frame.get_payload() == test_data
+
+        rx_frame = await tb.serdes_sink.recv()
+        assert rx_frame.get_payload() == test_data
+
+    elapsed = time.perf_counter() - start_time
+    cycles = (get_sim_time('ns') - start_sim_time) / 6.4
+
+    tb.log.info("Serdes model benchmark (reverse: %s)", tb.serdes_source.reverse)
+    tb.log.info("  %d cycles in %.3f s (%.0f cycles/s)", cycles, elapsed, cycles / elapsed)
+
+    await RisingEdge(dut.rx_clk)
+    await RisingEdge(dut.rx_clk)
+
+
 def size_list():
     return list(range(60, 128)) + [512, 1514, 9214] + [60]*10
 
 
+def bench_size_list():
+    return [9214]*16
+
+
 def incrementing_payload(length):
     return bytearray(itertools.islice(itertools.cycle(range(256)), length))
 
@@ -193,7 +242,14 @@ def cycle_en():
     return itertools.cycle([0, 0, 0, 1])
 
 
-if cocotb.SIM_NAME:
+if cocotb.SIM_NAME and ThroughputMeter.enabled():
+
+    factory = TestFactory(run_test_bench)
+    factory.add_option("payload_lengths", [bench_size_list])
+    factory.add_option("payload_data", [incrementing_payload])
+    factory.generate_tests()
+
+elif cocotb.SIM_NAME:
 
     for test in [run_test_rx, run_test_tx]:
 
@@ -215,7 +271,9 @@ lib_dir = os.path.abspath(os.path.join(rtl_dir, '..', 'lib'))
 axis_rtl_dir = os.path.abspath(os.path.join(lib_dir, 'axis', 'rtl'))
 
 
-def test_eth_phy_10g(request):
+@pytest.mark.throughput
+@pytest.mark.parametrize("bit_reverse", [0, 1])
+def test_eth_phy_10g(request, bit_reverse):
     dut = "eth_phy_10g"
     module = os.path.splitext(os.path.basename(__file__))[0]
     toplevel = dut
@@ -239,7 +297,7 @@ def test_eth_phy_10g(request):
     parameters['DATA_WIDTH'] = 64
     parameters['CTRL_WIDTH'] = parameters['DATA_WIDTH'] // 8
     parameters['HDR_WIDTH'] = 2
-    parameters['BIT_REVERSE'] = 0
+    parameters['BIT_REVERSE'] = bit_reverse
     parameters['SCRAMBLER_DISABLE'] = 0
     parameters['PRBS31_ENABLE'] = 1
     parameters['TX_SERDES_PIPELINE'] = 2
@@ -22,6 +22,8 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 
 class GMIIFrame(object):
@@ -39,23 +41,17 @@ class GMIIFrame(object):
         if self.data is None:
             return
 
-        f = list(self.data)
-        d = []
-        er = []
-        i = 0
+        d = list(self.data)
 
         assert_er = False
         if (type(self.error) is int or type(self.error) is bool) and self.error:
             assert_er = True
             self.error = None
 
-        while len(f) > 0:
-            d.append(f.pop(0))
-            if self.error is None:
-                er.append(0)
-            else:
-                er.append(self.error[i])
-            i += 1
+        if self.error is None:
+            er = [0]*len(d)
+        else:
+            er = [self.error[i] for i in range(len(d))]
 
         if assert_er:
             er[-1] = 1
@@ -85,7 +81,7 @@ class GMIIFrame(object):
 class GMIISource(object):
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
 
     def send(self, frame):
         self.queue.append(GMIIFrame(frame))
@@ -118,6 +114,7 @@ class GMIISource(object):
             frame = None
             d = []
             er = []
+            ptr = 0
             ifg_cnt = 0
 
             while True:
@@ -130,6 +127,7 @@ class GMIISource(object):
                     tx_er.next = 0
                     d = []
                     er = []
+                    ptr = 0
                     ifg_cnt = 0
                 else:
                     if not clk_enable:
@@ -139,17 +137,18 @@ class GMIISource(object):
                         txd.next = 0
                         tx_er.next = 0
                         tx_en.next = 0
-                    elif len(d) > 0:
-                        txd.next = d.pop(0)
-                        tx_er.next = er.pop(0)
+                    elif ptr < len(d):
+                        txd.next = d[ptr]
+                        tx_er.next = er[ptr]
                         tx_en.next = 1
-                        if len(d) == 0:
+                        ptr += 1
+                        if ptr == len(d):
                             if mii_select:
                                 ifg_cnt = 12*2
                             else:
                                 ifg_cnt = 12
                     elif self.queue:
-                        frame = GMIIFrame(self.queue.pop(0))
+                        frame = GMIIFrame(self.queue.popleft())
                         d, er = frame.build()
                         if name is not None:
                             print("[%s] Sending frame %s" % (name, repr(frame)))
@@ -164,9 +163,10 @@ class GMIISource(object):
                                 er2.append(b)
                                 er2.append(b)
                             er = er2
-                        txd.next = d.pop(0)
-                        tx_er.next = er.pop(0)
+                        txd.next = d[0]
+                        tx_er.next = er[0]
                         tx_en.next = 1
+                        ptr = 1
                     else:
                         txd.next = 0
                         tx_er.next = 0
@@ -178,12 +178,12 @@ class GMIISource(object):
 class GMIISink(object):
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def count(self):
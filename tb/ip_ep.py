@@ -22,11 +22,45 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 import axis_ep
+import checksum
 import eth_ep
 import struct
 
+# IPv4 header without options: version/IHL, DSCP/ECN, length,
+# identification, flags/fragment offset, TTL, protocol, header checksum,
+# source IP, destination IP
+ip_header = struct.Struct('>BBHHHBBHLL')
+
+
+def pack_ip_header(buf, offset, frame):
+    ip_header.pack_into(buf, offset,
+        frame.ip_version << 4 | frame.ip_ihl,
+        frame.ip_dscp << 2 | frame.ip_ecn,
+        frame.ip_length,
+        frame.ip_identification,
+        frame.ip_flags << 13 | frame.ip_fragment_offset,
+        frame.ip_ttl,
+        frame.ip_protocol,
+        frame.ip_header_checksum,
+        frame.ip_source_ip,
+        frame.ip_dest_ip)
+
+
+def unpack_ip_header(frame, buf, offset=0):
+    v, d, frame.ip_length, frame.ip_identification, f, frame.ip_ttl, frame.ip_protocol, \
+        frame.ip_header_checksum, frame.ip_source_ip, frame.ip_dest_ip = ip_header.unpack_from(buf, offset)
+    frame.ip_version = (v >> 4) & 0xF
+    frame.ip_ihl = v & 0xF
+    frame.ip_dscp = (d >> 2) & 0x3F
+    frame.ip_ecn = d & 0x3
+    frame.ip_flags = (f >> 13) & 0x7
+    frame.ip_fragment_offset = f & 0x1FFF
+
+
 class IPFrame(object):
     def __init__(self,
                 payload=b'',
@@ -49,6 +83,7 @@ class IPFrame(object):
             ):
 
         self._payload = axis_ep.AXIStreamFrame()
+        self._checksum_state = None
         self.eth_dest_mac = eth_dest_mac
         self.eth_src_mac = eth_src_mac
         self.eth_type = eth_type
@@ -84,9 +119,7 @@ class IPFrame(object):
             self.ip_header_checksum = payload['ip_header_checksum']
             self.ip_source_ip = payload['ip_source_ip']
             self.ip_dest_ip = payload['ip_dest_ip']
-        if type(payload) is bytes:
-            payload = bytearray(payload)
-        if type(payload) is bytearray or type(payload) is axis_ep.AXIStreamFrame:
+        if type(payload) in (bytes, bytearray, axis_ep.AXIStreamFrame):
             self.payload = axis_ep.AXIStreamFrame(payload)
         if type(payload) is IPFrame:
             self.payload = axis_ep.AXIStreamFrame(payload.payload)
@@ -119,21 +152,19 @@ class IPFrame(object):
         self.ip_length = len(self.payload.data) + 20
 
     def calc_checksum(self):
-        cksum = self.ip_version << 12 | self.ip_ihl << 8 | self.ip_dscp << 2 | self.ip_ecn
-        cksum += self.ip_length
-        cksum += self.ip_identification
-        cksum += self.ip_flags << 13 | self.ip_fragment_offset
-        cksum += self.ip_ttl << 8 | self.ip_protocol
-        cksum += self.ip_source_ip & 0xffff
-        cksum += (self.ip_source_ip >> 16) & 0xffff
-        cksum += self.ip_dest_ip & 0xffff
-        cksum += (self.ip_dest_ip >> 16) & 0xffff
-        cksum = (cksum & 0xffff) + (cksum >> 16)
-        cksum = (cksum & 0xffff) + (cksum >> 16)
-        return ~cksum & 0xffff
+        return checksum.ip_header_checksum(self)
 
     def update_checksum(self):
-        self.ip_header_checksum = self.calc_checksum()
+        # incremental update (RFC 1624) of the checksum last set here, if it
+        # is still in place, for the header words that changed since
+        words = checksum.ip_header_words(self)
+        state = self._checksum_state
+        if state is not None and state[1] == self.ip_header_checksum:
+            cksum = checksum.update_words(state[1], state[0], words)
+        else:
+            cksum = self.calc_checksum()
+        self.ip_header_checksum = cksum
+        self._checksum_state = (words, cksum)
 
     def verify_checksum(self):
         return self.ip_header_checksum == self.calc_checksum()
@@ -144,56 +175,46 @@ class IPFrame(object):
         if self.ip_header_checksum is None:
             self.update_checksum()
 
-    def build_axis(self):
-        return self.build_eth().build_axis()
-
-    def build_eth(self):
+    def build_buffer(self, headroom=0):
+        # header and payload in a new buffer, after headroom bytes for the
+        # headers of outer layers; the payload is the only data copied
         self.build()
-        data = b''
-
-        data += struct.pack('B', self.ip_version << 4 | self.ip_ihl)
-        data += struct.pack('B', self.ip_dscp << 2 | self.ip_ecn)
-        data += struct.pack('>H', self.ip_length)
-        data += struct.pack('>H', self.ip_identification)
-        data += struct.pack('>H', self.ip_flags << 13 | self.ip_fragment_offset)
-        data += struct.pack('B', self.ip_ttl)
-        data += struct.pack('B', self.ip_protocol)
-        data += struct.pack('>H', self.ip_header_checksum)
-        data += struct.pack('>L', self.ip_source_ip)
-        data += struct.pack('>L', self.ip_dest_ip)
+        data = self.payload.data
+        offset = headroom + ip_header.size
+        buf = bytearray(offset + len(data))
+        pack_ip_header(buf, headroom, self)
+        buf[offset:] = data
+        return buf
 
-        data += self.payload.data
+    def build_axis(self):
+        buf = self.build_buffer(eth_ep.eth_header.size)
+        eth_ep.pack_eth_header(buf, 0, self)
+        return axis_ep.wrap_frame(buf)
 
-        return eth_ep.EthFrame(data, self.eth_dest_mac, self.eth_src_mac, self.eth_type)
+    def build_eth(self):
+        frame = eth_ep.EthFrame(b'', self.eth_dest_mac, self.eth_src_mac, self.eth_type)
+        frame._payload = axis_ep.wrap_frame(self.build_buffer())
+        return frame
 
     def parse_axis(self, data):
-        frame = eth_ep.EthFrame()
-        frame.parse_axis(data)
-        self.parse_eth(frame)
+        data = eth_ep.frame_bytes(data)
+        self.eth_dest_mac, self.eth_src_mac, self.eth_type = eth_ep.unpack_eth_header(data)
+        self.parse_payload(data, eth_ep.eth_header.size)
 
     def parse_eth(self, data):
         self.eth_src_mac = data.eth_src_mac
         self.eth_dest_mac = data.eth_dest_mac
         self.eth_type = data.eth_type
 
-        v = struct.unpack('B', data.payload.data[0:1])[0]
-        self.ip_version = (v >> 4) & 0xF
-        self.ip_ihl = v & 0xF
-        v = struct.unpack('B', data.payload.data[1:2])[0]
-        self.ip_dscp = (v >> 2) & 0x3F
-        self.ip_ecn = v & 0x3
-        self.ip_length = struct.unpack('>H', data.payload.data[2:4])[0]
-        self.ip_identification = struct.unpack('>H', data.payload.data[4:6])[0]
-        v = struct.unpack('>H', data.payload.data[6:8])[0]
-        self.ip_flags = (v >> 13) & 0x7
-        self.ip_fragment_offset = v & 0x1FFF
-        self.ip_ttl = struct.unpack('B', data.payload.data[8:9])[0]
-        self.ip_protocol = struct.unpack('B', data.payload.data[9:10])[0]
-        self.ip_header_checksum = struct.unpack('>H', data.payload.data[10:12])[0]
-        self.ip_source_ip = struct.unpack('>L', data.payload.data[12:16])[0]
-        self.ip_dest_ip = struct.unpack('>L', data.payload.data[16:20])[0]
-
-        self.payload = axis_ep.AXIStreamFrame(data.payload.data[20:self.ip_length])
+        self.parse_payload(data.payload.data)
+
+    def parse_payload(self, data, offset=0):
+        # IP header at offset in data; the payload is the only data copied
+        data = eth_ep.frame_bytes(data)
+        unpack_ip_header(self, data, offset)
+
+        with memoryview(data) as mv:
+            self._payload = axis_ep.wrap_frame(bytearray(mv[offset:offset+self.ip_length][ip_header.size:]))
 
     def __eq__(self, other):
         if type(other) is IPFrame:
@@ -244,9 +265,9 @@ class IPFrameSource():
     def __init__(self):
         self.active = False
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.payload_source = axis_ep.AXIStreamSource()
-        self.header_queue = []
+        self.header_queue = deque()
         self.clk = Signal(bool(0))
 
     def send(self, frame):
@@ -333,7 +354,7 @@ class IPFrameSource():
                         ip_hdr_valid.next = False
                         self.active = False
                     if not self.active and self.header_queue:
-                        frame = self.header_queue.pop(0)
+                        frame = self.header_queue.popleft()
                         frame.build()
                         eth_dest_mac.next = frame.eth_dest_mac
                         eth_src_mac.next = frame.eth_src_mac
@@ -359,7 +380,7 @@ class IPFrameSource():
                         self.active = True
 
                     if self.queue and not self.header_queue:
-                        frame = self.queue.pop(0)
+                        frame = self.queue.popleft()
                         self.header_queue.append(frame)
                         self.payload_source.send(frame.payload)
 
@@ -369,14 +390,14 @@ class IPFrameSource():
 class IPFrameSink():
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.payload_sink = axis_ep.AXIStreamSink()
-        self.header_queue = []
+        self.header_queue = deque()
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def count(self):
@@ -482,7 +503,7 @@ class IPFrameSink():
                         self.header_queue.append(frame)
 
                     if not self.payload_sink.empty() and self.header_queue:
-                        frame = self.header_queue.pop(0)
+                        frame = self.header_queue.popleft()
                         frame.payload = self.payload_sink.recv()
                         self.queue.append(frame)
                         self.sync.next = not self.sync
@@ -22,6 +22,8 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 
 class MIIFrame(object):
@@ -39,27 +41,24 @@ class MIIFrame(object):
         if self.data is None:
             return
 
-        f = list(self.data)
         d = []
         er = []
-        i = 0
 
         assert_er = False
         if (type(self.error) is int or type(self.error) is bool) and self.error:
             assert_er = True
             self.error = None
 
-        while len(f) > 0:
-            db = f.pop(0)
+        for db in self.data:
             d.append(db & 0x0f)
             d.append(db >> 4)
-            if self.error is None:
-                er.append(0)
-                er.append(0)
-            else:
+
+        if self.error is None:
+            er = [0]*len(d)
+        else:
+            for i in range(len(self.data)):
                 er.append(self.error[i])
                 er.append(self.error[i])
-            i += 1
 
         if assert_er:
             er[-1] = 1
@@ -108,7 +107,7 @@ class MIIFrame(object):
 class MIISource(object):
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
 
     def send(self, frame):
         self.queue.append(MIIFrame(frame))
@@ -140,6 +139,7 @@ class MIISource(object):
             frame = None
             d = []
             er = []
+            ptr = 0
             ifg_cnt = 0
 
             while True:
@@ -152,6 +152,7 @@ class MIISource(object):
                     tx_er.next = 0
                     d = []
                     er = []
+                    ptr = 0
                     ifg_cnt = 0
                 else:
                     if not clk_enable:
@@ -161,20 +162,22 @@ class MIISource(object):
                         txd.next = 0
                         tx_er.next = 0
                         tx_en.next = 0
-                    elif len(d) > 0:
-                        txd.next = d.pop(0)
-                        tx_er.next = er.pop(0)
+                    elif ptr < len(d):
+                        txd.next = d[ptr]
+                        tx_er.next = er[ptr]
                         tx_en.next = 1
-                        if len(d) == 0:
+                        ptr += 1
+                        if ptr == len(d):
                             ifg_cnt = 12*2
                     elif self.queue:
-                        frame = MIIFrame(self.queue.pop(0))
+                        frame = MIIFrame(self.queue.popleft())
                         d, er = frame.build()
                         if name is not None:
                             print("[%s] Sending frame %s" % (name, repr(frame)))
-                        txd.next = d.pop(0)
-                        tx_er.next = er.pop(0)
+                        txd.next = d[0]
+                        tx_er.next = er[0]
                         tx_en.next = 1
+                        ptr = 1
                     else:
                         txd.next = 0
                         tx_er.next = 0
@@ -186,12 +189,12 @@ class MIISource(object):
 class MIISink(object):
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def count(self):
@@ -22,18 +22,77 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 
+# 96-bit ToD ns field wrap, in fractional ns
+NS_WRAP = 1000000000 << 16
+
 class PtpClock(object):
     def __init__(self, period_ns=0x6, period_fns=0x6666, drift_ns=0x0, drift_fns=0x0002, drift_rate=5):
-        self.period_ns = period_ns
-        self.period_fns = period_fns
-        self.drift_ns = drift_ns
-        self.drift_fns = drift_fns
+        self._period_ns = period_ns
+        self._period_fns = period_fns
+        self._drift_ns = drift_ns
+        self._drift_fns = drift_fns
         self.drift_rate = drift_rate
-
-        self.set_96_l = []
-        self.set_64_l = []
+        self._update_inc()
+
+        # pending timestamp loads, one applied per cycle
+        self.set_96_l = deque()
+        self.set_64_l = deque()
+
+        self.reset_state()
+
+    def _update_inc(self):
+        # per-cycle increment and drift, in fractional ns
+        self.inc = (self._period_ns << 16) + self._period_fns
+        self.drift = (self._drift_ns << 16) + self._drift_fns
+
+    @property
+    def period_ns(self):
+        return self._period_ns
+
+    @period_ns.setter
+    def period_ns(self, value):
+        self._period_ns = value
+        self._update_inc()
+
+    @property
+    def period_fns(self):
+        return self._period_fns
+
+    @period_fns.setter
+    def period_fns(self, value):
+        self._period_fns = value
+        self._update_inc()
+
+    @property
+    def drift_ns(self):
+        return self._drift_ns
+
+    @drift_ns.setter
+    def drift_ns(self, value):
+        self._drift_ns = value
+        self._update_inc()
+
+    @property
+    def drift_fns(self):
+        return self._drift_fns
+
+    @drift_fns.setter
+    def drift_fns(self, value):
+        self._drift_fns = value
+        self._update_inc()
+
+    def reset_state(self):
+        # both timestamps are offsets from one fractional ns accumulator;
+        # the 96-bit offset drops 1e9 ns each time the seconds field increments
+        self.acc = 0
+        self.offset_96 = 0
+        self.offset_64 = 0
+        self.ts_96_s = 0
+        self.drift_cnt = 0
 
     def set_96(self, ts):
         self.set_96_l.append(ts)
@@ -41,87 +100,135 @@ class PtpClock(object):
     def set_64(self, ts):
         self.set_64_l.append(ts)
 
-    def create_logic(self,
-            clk,
-            rst,
-            ts_96=Signal(intbv(0)[96:]),
-            ts_64=Signal(intbv(0)[64:]),
-            ts_step=Signal(bool(0))
-        ):
-
-        @instance
-        def logic():
+    def get_96(self):
+        return (self.ts_96_s << 48) | (self.acc + self.offset_96)
 
-            ts_96_s = 0
-            ts_96_ns = 0
-            ts_96_fns = 0
+    def get_64(self):
+        return self.acc + self.offset_64
 
-            ts_64_ns = 0
-            ts_64_fns = 0
+    def advance(self, n):
+        # accumulator increment over the next n cycles
+        cnt = self.drift_cnt
+        rate = self.drift_rate
 
-            drift_cnt = 0
+        drifts = min(n, cnt) if cnt > 0 else 0
+        m = n - drifts
 
-            while True:
-                yield clk.posedge, rst.posedge
+        if m > 0 and rate > 1:
+            # one cycle without drift, then rate-1 cycles with drift
+            full, rem = divmod(m, rate)
+            drifts += full*(rate-1) + max(rem-1, 0)
 
-                if rst:
-                    ts_96_s = 0
-                    ts_96_ns = 0
-                    ts_96_fns = 0
-                    ts_64_ns = 0
-                    ts_64_fns = 0
-                    drift_cnt = 0
-                    ts_96.next = 0
-                    ts_64.next = 0
-                else:
-                    ts_step.next = 0
+        return n*self.inc + drifts*self.drift
 
-                    t = ((ts_96_ns << 16) + ts_96_fns) + ((self.period_ns << 16) + self.period_fns)
+    def _ahead(self, queue, n):
+        # last load applied within the next n cycles (None if there is none),
+        # the number of cycles after it, and the accumulator increment over them
+        k = min(n, len(queue))
+        if k:
+            return queue[k-1], n-k, self.advance(n) - self.advance(k)
+        return None, n, self.advance(n)
 
-                    if drift_cnt > 0:
-                        t += (self.drift_ns << 16) + self.drift_fns
-                        ts_step.next = 1
+    def ts_96_ahead(self, n=1):
+        # value of ts_96 n cycles from now, including pending loads
+        ts, m, d = self._ahead(self.set_96_l, n)
 
-                    if t > (1000000000<<16):
-                        ts_96_s += 1
-                        t -= (1000000000<<16)
+        if ts is None:
+            s, t = self.ts_96_s, self.acc + self.offset_96
+        else:
+            s, t = ts >> 48, ts & 0x3fffffffffff
 
-                    ts_96_fns = t & 0xffff
-                    ts_96_ns = t >> 16
+        if m:
+            t += d
+            if t > NS_WRAP:
+                k = (t-1) // NS_WRAP
+                s += k
+                t -= k*NS_WRAP
 
-                    if self.set_96_l:
-                        ts = self.set_96_l.pop(0)
+        return (s << 48) | t
 
-                        ts_96_s = ts >> 48
-                        ts_96_ns = (ts >> 16) & 0x3fffffff
-                        ts_96_fns = ts & 0xffff
+    def ts_64_ahead(self, n=1):
+        # value of ts_64 n cycles from now, including pending loads
+        ts, m, d = self._ahead(self.set_64_l, n)
 
-                        ts_step.next = 1
+        if ts is None:
+            return self.acc + self.offset_64 + d
+        return ts + d
 
-                    ts_96.next = (ts_96_s << 48) | (ts_96_ns << 16) | (ts_96_fns)
+    def create_logic(self,
+            clk,
+            rst,
+            ts_96=None,
+            ts_64=None,
+            ts_step=None
+        ):
 
-                    t = ((ts_64_ns << 16) + ts_64_fns) + ((self.period_ns << 16) + self.period_fns)
+        # outputs that are not connected are not driven
+        if ts_96 is None:
+            ts_96 = Signal(intbv(0)[96:])
+            drive_96 = False
+        else:
+            drive_96 = True
 
-                    if drift_cnt > 0:
-                        t += ((self.drift_ns << 16) + self.drift_fns)
-                        ts_step.next = 1
+        if ts_64 is None:
+            ts_64 = Signal(intbv(0)[64:])
+            drive_64 = False
+        else:
+            drive_64 = True
 
-                    ts_64_fns = t & 0xffff
-                    ts_64_ns = t >> 16
+        if ts_step is None:
+            ts_step = Signal(bool(0))
 
-                    if self.set_64_l:
-                        ts = self.set_64_l.pop(0)
+        @instance
+        def logic():
 
-                        ts_64_ns = ts >> 16
-                        ts_64_fns = ts & 0xffff
+            step = int(ts_step)
 
-                        ts_step.next = 1
+            while True:
+                yield clk.posedge, rst.posedge
 
-                    ts_64.next = (ts_64_ns << 16) | ts_64_fns
+                if rst:
+                    self.reset_state()
+                    ts_96.next = 0
+                    ts_64.next = 0
+                    continue
 
-                    if drift_cnt > 0:
-                        drift_cnt -= 1
-                    else:
-                        drift_cnt = self.drift_rate-1
+                if self.drift_cnt > 0:
+                    acc = self.acc + self.inc + self.drift
+                    self.drift_cnt -= 1
+                    next_step = 1
+                else:
+                    acc = self.acc + self.inc
+                    self.drift_cnt = self.drift_rate-1
+                    next_step = 0
+
+                self.acc = acc
+
+                t = acc + self.offset_96
+                if t > NS_WRAP:
+                    self.ts_96_s += 1
+                    self.offset_96 -= NS_WRAP
+                    t -= NS_WRAP
+
+                if self.set_96_l:
+                    ts = self.set_96_l.popleft()
+                    self.ts_96_s = ts >> 48
+                    t = ts & 0x3fffffffffff
+                    self.offset_96 = t - acc
+                    next_step = 1
+
+                if drive_96:
+                    ts_96.next = (self.ts_96_s << 48) | t
+
+                if self.set_64_l:
+                    self.offset_64 = self.set_64_l.popleft() - acc
+                    next_step = 1
+
+                if drive_64:
+                    ts_64.next = acc + self.offset_64
+
+                if next_step != step:
+                    ts_step.next = next_step
+                    step = next_step
 
         return instances()
@@ -25,13 +25,25 @@ THE SOFTWARE.
 
 import logging
 import os
+import sys
 
 import cocotb_test.simulator
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge
-from cocotb.utils import get_sim_time
+from cocotb.regression import TestFactory
+from cocotb.triggers import RisingEdge, Timer
+from cocotb.utils import get_sim_time, get_sim_steps
+
+try:
+    from tbsupport import ReferenceClock, PiServo, ServoStats, period_regs
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import ReferenceClock, PiServo, ServoStats, period_regs
+    finally:
+        del sys.path[0]
 
 
 class TB:
@@ -41,7 +53,8 @@ class TB:
         self.log = logging.getLogger("cocotb.tb")
         self.log.setLevel(logging.DEBUG)
 
-        cocotb.start_soon(Clock(dut.clk, 6.4, units="ns").start())
+        self.clock_period = 6.4
+        cocotb.start_soon(Clock(dut.clk, self.clock_period, units="ns").start())
 
         dut.input_ts_96.setimmediatevalue(0)
         dut.input_ts_96_valid.setimmediatevalue(0)
@@ -62,6 +75,17 @@ class TB:
         dut.input_drift_rate.setimmediatevalue(0)
         dut.input_drift_valid.setimmediatevalue(0)
 
+    async def wait_cycles(self, n):
+        # skip ahead to just before the last clock edge, then sync to it
+        period = get_sim_steps(self.clock_period, 'ns')
+        if n > 1:
+            await Timer((n-1)*period + period//2, 'step')
+        await RisingEdge(self.dut.clk)
+
+    def get_ts_96_ns(self):
+        ts = self.dut.output_ts_96.value.integer
+        return (ts >> 48)*1e9 + ((ts >> 16) & 0xffffffff) + (ts & 0xffff)/2**16
+
     async def reset(self):
         self.dut.rst.setimmediatevalue(0)
         await RisingEdge(self.dut.clk)
@@ -339,6 +363,74 @@ async def run_drift_adjustment(dut):
     await RisingEdge(dut.clk)
 
 
+async def run_servo(dut, ppm=20.0, wander_ppm=0.5):
+
+    tb = TB(dut)
+
+    cycles = int(os.getenv("PTP_SERVO_CYCLES", 2**18))
+    interval = int(os.getenv("PTP_SERVO_INTERVAL", 2048))
+
+    ref = ReferenceClock(ppm=ppm, wander_ppm=wander_ppm, wander_tau_ns=1e5,
+        start_ns=1500000000, seed=1)
+    servo = PiServo()
+    stats = ServoStats(lock_threshold_ns=1.0)
+
+    await tb.reset()
+
+    for k in range(cycles // interval):
+        await tb.wait_cycles(interval)
+
+        sim_ns = get_sim_time('ns')
+        offset = tb.get_ts_96_ns() - ref.time_ns(sim_ns)
+
+        state, ppb = servo.sample(offset, interval*tb.clock_period)
+
+        if state == PiServo.JUMP:
+            tb.log.info("Step clock: offset %g ns", offset)
+            ts_s, ts_ns = divmod(int(ref.time_ns(sim_ns)), 1000000000)
+            dut.input_ts_96.value = (ts_s << 48) | (ts_ns << 16)
+            dut.input_ts_96_valid.value = 1
+
+            await RisingEdge(dut.clk)
+
+            dut.input_ts_96_valid.value = 0
+        else:
+            stats.add(sim_ns, offset, ppb)
+
+        ns, fns, num, denom = period_regs(tb.clock_period*(1+ppb*1e-9), 16, 16)
+
+        dut.input_period_ns.value = ns
+        dut.input_period_fns.value = fns
+        dut.input_period_valid.value = 1
+        dut.input_drift_ns.value = 0
+        dut.input_drift_fns.value = num
+        dut.input_drift_rate.value = denom
+        dut.input_drift_valid.value = 1
+
+        await RisingEdge(dut.clk)
+
+        dut.input_period_valid.value = 0
+        dut.input_drift_valid.value = 0
+
+    stats.log_summary(tb.log)
+    res = stats.summary()
+
+    assert res['locked']
+    assert abs(res['offset_mean_ns']) < 1.0
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+# servo convergence runs are long, so only run with PTP_SERVO_CYCLES set
+# (e.g. 262144, or 4000000 for long-horizon runs)
+if cocotb.SIM_NAME and os.getenv("PTP_SERVO_CYCLES"):
+
+    factory = TestFactory(run_servo)
+    factory.add_option("ppm", [20.0, -100.0])
+    factory.generate_tests()
+
+
 # cocotb-test
 
 tests_dir = os.path.abspath(os.path.dirname(__file__))
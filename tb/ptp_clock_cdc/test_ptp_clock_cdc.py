@@ -23,20 +23,31 @@ THE SOFTWARE.
 
 """
 
+import fcntl
 import logging
 import os
-from statistics import mean, stdev
+import sys
 
 import pytest
 import cocotb_test.simulator
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import FallingEdge, First, RisingEdge, Timer
 from cocotb.utils import get_sim_steps, get_sim_time
 
 from cocotbext.eth import PtpClock
 
+try:
+    from tbsupport import CdcSweepPoint, ErrorStats, TsComparator
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import CdcSweepPoint, ErrorStats, TsComparator
+    finally:
+        del sys.path[0]
+
 
 class TB:
     def __init__(self, dut):
@@ -133,16 +144,16 @@ class TB:
             return (ts >> 48) + ((ts & 0xffffffffffff)/2**16*1e-9)
 
     async def measure_ts_diff(self, N=100):
-        input_ts_lst = []
-        output_ts_lst = []
+        # input and output timestamps are in seconds; error statistics in ns
+        cmp = TsComparator(scale=1e9)
 
-        async def collect_timestamps(clk, get_ts, lst):
+        async def collect_timestamps(clk, get_ts, add):
             while True:
                 await RisingEdge(clk)
-                lst.append((get_sim_time('sec'), get_ts()))
+                add(get_sim_time('sec'), get_ts())
 
-        input_cr = cocotb.start_soon(collect_timestamps(self.dut.input_clk, self.get_input_ts_ns, input_ts_lst))
-        output_cr = cocotb.start_soon(collect_timestamps(self.dut.output_clk, self.get_output_ts_ns, output_ts_lst))
+        input_cr = cocotb.start_soon(collect_timestamps(self.dut.input_clk, self.get_input_ts_ns, cmp.add_ref))
+        output_cr = cocotb.start_soon(collect_timestamps(self.dut.output_clk, self.get_output_ts_ns, cmp.add_output))
 
         for k in range(N):
             await RisingEdge(self.dut.output_clk)
@@ -150,27 +161,7 @@ class TB:
         input_cr.kill()
         output_cr.kill()
 
-        diffs = []
-
-        its1 = input_ts_lst.pop(0)
-        its2 = input_ts_lst.pop(0)
-
-        for ots in output_ts_lst:
-            while its2[0] < ots[0] and input_ts_lst:
-                its1 = its2
-                its2 = input_ts_lst.pop(0)
-
-            if its2[0] < ots[0]:
-                break
-
-            dt = its2[0] - its1[0]
-            dts = its2[1] - its1[1]
-
-            its = its1[1]+dts/dt*(ots[0]-its1[0])
-
-            diffs.append(ots[1] - its)
-
-        return diffs
+        return cmp.stats
 
 
 @cocotb.test()
@@ -193,9 +184,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("10 ppm slower")
@@ -210,9 +201,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("10 ppm faster")
@@ -227,9 +218,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("200 ppm slower")
@@ -244,9 +235,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("200 ppm faster")
@@ -261,9 +252,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("Coherent tracking (+/- 10 ppm)")
@@ -293,9 +284,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("Coherent tracking (+/- 200 ppm)")
@@ -325,9 +316,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("Slightly faster (6.3 ns)")
@@ -342,9 +333,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("Slightly slower (6.5 ns)")
@@ -359,9 +350,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("Significantly faster (250 MHz)")
@@ -376,9 +367,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("Significantly slower (100 MHz)")
@@ -393,9 +384,9 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     tb.log.info("Significantly faster (390.625 MHz)")
@@ -410,14 +401,69 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference: {mean(diffs)*1e9} ns (stdev: {stdev(diffs)*1e9})")
-    assert abs(mean(diffs)*1e9) < 5
+    stats = await tb.measure_ts_diff()
+    stats.log_summary(tb.log)
+    assert abs(stats.mean) < 5
 
     await RisingEdge(dut.input_clk)
     await RisingEdge(dut.input_clk)
 
 
+async def run_sweep(dut):
+
+    tb = TB(dut)
+
+    point = CdcSweepPoint(log=tb.log)
+
+    tb.ptp_clock.set_period_ns(point.input_period)
+    tb.set_input_clock_period(point.input_period)
+    tb.set_output_clock_period(point.skewed_output_period)
+
+    await tb.reset()
+
+    t0 = get_sim_time('ns')
+    lock_time_ns = None
+    unlocks = 0
+
+    async def monitor_lock():
+        nonlocal lock_time_ns, unlocks
+        if not dut.locked.value.integer:
+            await RisingEdge(dut.locked)
+        lock_time_ns = get_sim_time('ns') - t0
+        while True:
+            await FallingEdge(dut.locked)
+            unlocks += 1
+            await RisingEdge(dut.locked)
+
+    monitor_cr = cocotb.start_soon(monitor_lock())
+
+    if not dut.locked.value.integer:
+        await First(RisingEdge(dut.locked), Timer(get_sim_steps(point.lock_timeout_us, 'us', round_mode='round')))
+
+    stats = ErrorStats()
+
+    if dut.locked.value.integer:
+        await Timer(get_sim_steps(point.settle_cycles*point.skewed_output_period, 'ns', round_mode='round'))
+        stats = await tb.measure_ts_diff(N=point.samples)
+    else:
+        lock_time_ns = None
+
+    monitor_cr.kill()
+
+    point.finish(lock_time_ns, unlocks, stats)
+
+    assert lock_time_ns is not None
+    assert not unlocks
+    assert abs(stats.mean) < 5
+
+    await RisingEdge(dut.input_clk)
+    await RisingEdge(dut.input_clk)
+
+
+if cocotb.SIM_NAME and CdcSweepPoint.enabled():
+    cocotb.test()(run_sweep)
+
+
 # cocotb-test
 
 tests_dir = os.path.abspath(os.path.dirname(__file__))
@@ -457,3 +503,54 @@ def test_ptp_clock_cdc(request, ts_width):
         sim_build=sim_build,
         extra_env=extra_env,
     )
+
+
+@pytest.mark.cdc_sweep
+@pytest.mark.parametrize("ppm", [-200, -10, 0, 10, 200])
+@pytest.mark.parametrize("output_period", [2.56, 4.0, 6.2, 6.4, 6.5, 8.0, 10.0])
+@pytest.mark.parametrize("input_period", [6.4, 8.0])
+@pytest.mark.parametrize("ts_width", [96, 64])
+def test_ptp_clock_cdc_sweep(request, ts_width, input_period, output_period, ppm):
+    dut = "ptp_clock_cdc"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+    ]
+
+    parameters = {}
+
+    parameters['TS_WIDTH'] = ts_width
+    parameters['NS_WIDTH'] = 4
+    parameters['LOG_RATE'] = 3
+    parameters['PIPELINE_OUTPUT'] = 0
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+
+    extra_env['CDC_SWEEP_INPUT_PERIOD'] = str(input_period)
+    extra_env['CDC_SWEEP_OUTPUT_PERIOD'] = str(output_period)
+    extra_env['CDC_SWEEP_PPM'] = str(ppm)
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    kwargs = dict(
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
+
+    # the clocking only differs in the environment, so all points of one
+    # width share a compiled model through the simulation model cache;
+    # build it once per width, while the other workers wait for it
+    os.makedirs(os.path.join(tests_dir, "sim_build"), exist_ok=True)
+    with open(os.path.join(tests_dir, "sim_build", f"sweep-{ts_width}.lock"), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        cocotb_test.simulator.run(compile_only=True, **kwargs)
+
+    cocotb_test.simulator.run(testcase="run_sweep", **kwargs)
@@ -25,6 +25,7 @@ THE SOFTWARE.
 
 import logging
 import os
+import sys
 
 import cocotb_test.simulator
 
@@ -34,24 +35,53 @@ from cocotb.triggers import RisingEdge, Timer
 
 from cocotbext.eth import PtpClock
 
+try:
+    from tbsupport import PeroutChecker
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import PeroutChecker
+    finally:
+        del sys.path[0]
+
+
+def tod(s=0, ns=0, fns=0):
+    return (s << 48) | (ns << 16) | fns
+
 
 class TB:
-    def __init__(self, dut):
+    def __init__(self, dut, ptp_period_ns=6.4):
         self.dut = dut
 
         self.log = logging.getLogger("cocotb.tb")
         self.log.setLevel(logging.DEBUG)
 
-        cocotb.start_soon(Clock(dut.clk, 6.4, units="ns").start())
+        self.clock_period = 6.4
+
+        cocotb.start_soon(Clock(dut.clk, self.clock_period, units="ns").start())
 
         self.ptp_clock = PtpClock(
             ts_tod=dut.input_ts_96,
             ts_step=dut.input_ts_step,
             clock=dut.clk,
             reset=dut.rst,
-            period_ns=6.4
+            period_ns=ptp_period_ns
         )
 
+        # edges are registered twice after the timestamp passes the edge time
+        self.checker = PeroutChecker(
+            pulse=dut.output_pulse,
+            ts=dut.input_ts_96,
+            latency_ns=(2*ptp_period_ns-0.01, 3*ptp_period_ns+0.01),
+            ts_rate=ptp_period_ns/self.clock_period,
+            log=self.log
+        )
+
+        self.start = tod(*(int(os.getenv(f"PARAM_OUT_START_{f}", "0")) for f in ["S", "NS", "FNS"]))
+        self.period = tod(*(int(os.getenv(f"PARAM_OUT_PERIOD_{f}", "0")) for f in ["S", "NS", "FNS"]))
+        self.width = tod(*(int(os.getenv(f"PARAM_OUT_WIDTH_{f}", "0")) for f in ["S", "NS", "FNS"]))
+
         dut.enable.setimmediatevalue(0)
         dut.input_start.setimmediatevalue(0)
         dut.input_start_valid.setimmediatevalue(0)
@@ -71,6 +101,32 @@ class TB:
         await RisingEdge(self.dut.clk)
         await RisingEdge(self.dut.clk)
 
+    async def configure(self, start=None, period=None, width=None):
+        if start is not None:
+            self.start = start
+            self.dut.input_start.value = start
+            self.dut.input_start_valid.value = 1
+        if period is not None:
+            self.period = period
+            self.dut.input_period.value = period
+            self.dut.input_period_valid.value = 1
+        if width is not None:
+            self.width = width
+            self.dut.input_width.value = width
+            self.dut.input_width_valid.value = 1
+
+        self.checker.configure(self.start, self.period, self.width)
+
+        await RisingEdge(self.dut.clk)
+
+        self.dut.input_start_valid.value = 0
+        self.dut.input_period_valid.value = 0
+        self.dut.input_width_valid.value = 0
+
+    def get_ts_ns(self):
+        ts = self.dut.input_ts_96.value.integer
+        return (ts >> 48)*1000000000 + ((ts >> 16) & 0xffffffff)
+
 
 @cocotb.test()
 async def run_test(dut):
@@ -79,41 +135,101 @@ async def run_test(dut):
 
     await tb.reset()
 
+    tb.checker.start()
+
     dut.enable.value = 1
 
     await RisingEdge(dut.clk)
 
-    dut.input_start.value = 100 << 16
-    dut.input_start_valid.value = 1
-    dut.input_period.value = 100 << 16
-    dut.input_period_valid.value = 1
-    dut.input_width.value = 50 << 16
-    dut.input_width_valid.value = 1
+    await tb.configure(start=tod(ns=100), period=tod(ns=100), width=tod(ns=50))
+
+    await Timer(10000, 'ns')
+
+    tb.checker.check(min_pulses=90)
 
     await RisingEdge(dut.clk)
 
-    dut.input_start_valid.value = 0
-    dut.input_period_valid.value = 0
-    dut.input_width_valid.value = 0
+    await tb.configure(start=tod(ns=0), period=tod(ns=100), width=tod(ns=50))
 
     await Timer(10000, 'ns')
 
+    tb.checker.log_summary()
+    tb.checker.check(min_pulses=150)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+@cocotb.test()
+async def run_test_reconfig(dut):
+
+    tb = TB(dut)
+
+    pulses = int(os.getenv("PTP_PEROUT_PULSES", "1000"))
+
+    await tb.reset()
+
+    tb.checker.start()
+
+    dut.enable.value = 1
+
     await RisingEdge(dut.clk)
 
-    dut.input_start.value = 0 << 16
-    dut.input_start_valid.value = 1
-    dut.input_period.value = 100 << 16
-    dut.input_period_valid.value = 1
-    dut.input_width.value = 50 << 16
-    dut.input_width_valid.value = 1
+    # 10 MHz, then other rates, including a fractional ns period (30 MHz)
+    # and a start time in the future
+    for period, width in [(tod(ns=100), tod(ns=50)),
+            (tod(ns=160), tod(ns=80)),
+            (tod(ns=40), tod(ns=20)),
+            (tod(ns=33, fns=0x5555), tod(ns=16, fns=0xaaab))]:
+
+        start = tod(ns=tb.get_ts_ns() + 5000)
+
+        tb.log.info("Period %.4f ns, width %.4f ns", (period & 0xffffffffffff)/2**16,
+            (width & 0xffffffffffff)/2**16)
+
+        await tb.configure(start=start, period=period, width=width)
+
+        await Timer(5000 + pulses*((period >> 16) + 1), 'ns')
+
+        tb.checker.check(min_pulses=pulses)
+
+    # width change only, no restart
+    await tb.configure(width=tod(ns=14))
+    await Timer(pulses*34, 'ns')
+
+    tb.checker.log_summary()
+    tb.checker.check()
 
     await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
 
-    dut.input_start_valid.value = 0
-    dut.input_period_valid.value = 0
-    dut.input_width_valid.value = 0
 
-    await Timer(10000, 'ns')
+@cocotb.test()
+async def run_test_pps(dut):
+
+    # PTP clock runs at 100 us per clock cycle, so a simulated second of PTP
+    # time takes 10000 cycles
+    tb = TB(dut, ptp_period_ns=100000)
+
+    seconds = int(os.getenv("PTP_PEROUT_SECONDS", "5"))
+
+    await tb.reset()
+
+    tb.checker.start()
+
+    dut.enable.value = 1
+
+    await RisingEdge(dut.clk)
+
+    for period, width in [(tod(s=1), tod(ns=250000000)),
+            (tod(ns=500000000), tod(ns=100000000))]:
+
+        await tb.configure(start=tod(ns=0), period=period, width=width)
+
+        await Timer(int((seconds+1)*1e9/100000*tb.clock_period), 'ns')
+
+    tb.checker.log_summary()
+    tb.checker.check(min_pulses=seconds*2)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -1 +0,0 @@
-../ptp_td.py
\ No newline at end of file
@@ -27,7 +27,6 @@ import logging
 import os
 import sys
 from decimal import Decimal
-from statistics import mean, stdev
 
 import cocotb_test.simulator
 
@@ -37,12 +36,12 @@ from cocotb.triggers import RisingEdge, Timer
 from cocotb.utils import get_sim_steps, get_sim_time
 
 try:
-    from ptp_td import PtpTdSource
+    from tbsupport import PtpTdSource, TsComparator
 except ImportError:
-    # attempt import from current directory
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     try:
-        from ptp_td import PtpTdSource
+        from tbsupport import PtpTdSource, TsComparator
     finally:
         del sys.path[0]
 
@@ -71,10 +70,9 @@ class TB:
         dut.clk.setimmediatevalue(0)
         cocotb.start_soon(self._run_clock())
 
-        self.ref_ts_rel = []
-        self.ref_ts_tod = []
-        self.output_ts_rel = []
-        self.output_ts_tod = []
+        self.measuring = False
+        self.rel_cmp = TsComparator()
+        self.tod_cmp = TsComparator()
 
         cocotb.start_soon(self._run_collect_ref_ts())
         cocotb.start_soon(self._run_collect_output_ts())
@@ -137,57 +135,33 @@ class TB:
         clk_event = RisingEdge(self.dut.ptp_clk)
         while True:
             await clk_event
+            if not self.measuring:
+                continue
             st = Decimal(get_sim_time('fs')).scaleb(-6)
-            self.ref_ts_rel.append((st, self.ptp_td_source.get_ts_rel_ns()))
-            self.ref_ts_tod.append((st, self.ptp_td_source.get_ts_tod_ns()))
+            self.rel_cmp.add_ref(st, self.ptp_td_source.get_ts_rel_ns())
+            self.tod_cmp.add_ref(st, self.ptp_td_source.get_ts_tod_ns())
 
     async def _run_collect_output_ts(self):
         clk_event = RisingEdge(self.dut.clk)
         while True:
             await clk_event
+            if not self.measuring:
+                continue
             st = Decimal(get_sim_time('fs')).scaleb(-6)
-            self.output_ts_rel.append((st, self.get_output_ts_rel_ns()))
-            self.output_ts_tod.append((st, self.get_output_ts_tod_ns()))
-
-    def compute_ts_diff(self, ts_lst_1, ts_lst_2):
-        ts_lst_1 = [x for x in ts_lst_1]
-
-        diffs = []
-
-        its1 = ts_lst_1.pop(0)
-        its2 = ts_lst_1.pop(0)
-
-        for ots in ts_lst_2:
-            while its2[0] < ots[0] and ts_lst_1:
-                its1 = its2
-                its2 = ts_lst_1.pop(0)
-
-            if its2[0] < ots[0]:
-                break
-
-            dt = its2[0] - its1[0]
-            dts = its2[1] - its1[1]
-
-            its = its1[1]+dts/dt*(ots[0]-its1[0])
-
-            # diffs.append(ots[1] - its)
-            diffs.append(float(ots[1] - its))
-
-        return diffs
+            self.rel_cmp.add_output(st, self.get_output_ts_rel_ns())
+            self.tod_cmp.add_output(st, self.get_output_ts_tod_ns())
 
     async def measure_ts_diff(self, N=100):
-        self.ref_ts_rel = []
-        self.ref_ts_tod = []
-        self.output_ts_rel = []
-        self.output_ts_tod = []
+        self.rel_cmp.reset()
+        self.tod_cmp.reset()
+        self.measuring = True
 
         for k in range(N):
             await RisingEdge(self.dut.clk)
 
-        rel_diffs = self.compute_ts_diff(self.ref_ts_rel, self.output_ts_rel)
-        tod_diffs = self.compute_ts_diff(self.ref_ts_tod, self.output_ts_tod)
+        self.measuring = False
 
-        return rel_diffs, tod_diffs
+        return self.rel_cmp.stats, self.tod_cmp.stats
 
 
 @cocotb.test()
@@ -214,11 +188,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("10 ppm slower")
@@ -233,11 +207,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("10 ppm faster")
@@ -252,11 +226,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("200 ppm slower")
@@ -271,11 +245,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("200 ppm faster")
@@ -290,11 +264,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("Coherent tracking (+/- 10 ppm)")
@@ -324,11 +298,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("Coherent tracking (+/- 200 ppm)")
@@ -358,11 +332,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("Slightly faster (6.3 ns)")
@@ -377,11 +351,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("Slightly slower (6.5 ns)")
@@ -396,11 +370,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("Significantly faster (250 MHz)")
@@ -415,11 +389,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("Coherent tracking (250 MHz +0/-0.5%)")
@@ -449,11 +423,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("Significantly slower (100 MHz)")
@@ -468,11 +442,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     tb.log.info("Significantly faster (390.625 MHz)")
@@ -487,11 +461,11 @@ async def run_test(dut):
 
     assert tb.dut.locked.value.integer
 
-    rel_diffs, tod_diffs = await tb.measure_ts_diff()
-    tb.log.info(f"Difference (rel): {mean(rel_diffs)} ns (stdev: {stdev(rel_diffs)})")
-    tb.log.info(f"Difference (ToD): {mean(tod_diffs)} ns (stdev: {stdev(tod_diffs)})")
-    assert abs(mean(rel_diffs)) < 5
-    assert abs(mean(tod_diffs)) < 5
+    rel_stats, tod_stats = await tb.measure_ts_diff()
+    rel_stats.log_summary(tb.log, "Difference (rel)")
+    tod_stats.log_summary(tb.log, "Difference (ToD)")
+    assert abs(rel_stats.mean) < 5
+    assert abs(tod_stats.mean) < 5
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+import cocotb_test.simulator
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, FallingEdge, Timer
+from cocotb.utils import get_sim_steps, get_sim_time
+
+try:
+    from tbsupport import PtpTdSource, TsComparator
+except ImportError:
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    try:
+        from tbsupport import PtpTdSource, TsComparator
+    finally:
+        del sys.path[0]
+
+
+# nominal port clock periods (ns), reused with a growing ppm offset
+# beyond the first eight leaves so that every leaf clock is distinct
+leaf_clock_periods = [6.4, 4.0, 2.56, 8.0, 3.2, 10.0, 5.12, 6.206]
+
+
+def leaf_clock_period(k):
+    n = len(leaf_clock_periods)
+    ppm = (k // n) * 50 * (-1 if k % 2 else 1)
+    return leaf_clock_periods[k % n]*(1+ppm*1e-6)
+
+
+class TB:
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.DEBUG)
+
+        self.leaf_count = 0
+        while hasattr(dut, f"l{self.leaf_count:02d}_locked"):
+            self.leaf_count += 1
+
+        cocotb.start_soon(Clock(dut.sample_clk, 9.9, units="ns").start())
+
+        self.ptp_td_source = PtpTdSource(
+            data=dut.ptp_td_sdi,
+            clock=dut.ptp_clk,
+            reset=dut.ptp_rst,
+            period_ns=6.4
+        )
+
+        self.ptp_clock_period = 6.4
+        dut.ptp_clk.setimmediatevalue(0)
+        cocotb.start_soon(self._run_clock(dut.ptp_clk, self.ptp_clock_period))
+
+        self.leaf_clk = [getattr(dut, f"l{k:02d}_clk") for k in range(self.leaf_count)]
+        self.leaf_rst = [getattr(dut, f"l{k:02d}_rst") for k in range(self.leaf_count)]
+        self.leaf_ts_rel = [getattr(dut, f"l{k:02d}_output_ts_rel") for k in range(self.leaf_count)]
+        self.leaf_ts_tod = [getattr(dut, f"l{k:02d}_output_ts_tod") for k in range(self.leaf_count)]
+        self.leaf_locked = [getattr(dut, f"l{k:02d}_locked") for k in range(self.leaf_count)]
+
+        self.leaf_clock_period = [leaf_clock_period(k) for k in range(self.leaf_count)]
+
+        for clk, period in zip(self.leaf_clk, self.leaf_clock_period):
+            clk.setimmediatevalue(0)
+            cocotb.start_soon(self._run_clock(clk, period))
+
+        # lock tracking
+        self.reset_time_ns = 0
+        self.lock_time_ns = [None]*self.leaf_count
+        self.unlocks = [0]*self.leaf_count
+
+        for k in range(self.leaf_count):
+            cocotb.start_soon(self._run_lock_monitor(k))
+
+        # each leaf against the source, and each leaf against leaf 0
+        self.rel_cmp = [TsComparator() for k in range(self.leaf_count)]
+        self.tod_cmp = [TsComparator() for k in range(self.leaf_count)]
+        self.leaf_cmp = [TsComparator() for k in range(self.leaf_count)]
+
+        # wall time spent in the Python collectors
+        self.model_time = 0.0
+
+    async def reset(self):
+        self.dut.ptp_rst.setimmediatevalue(0)
+        for rst in self.leaf_rst:
+            rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.ptp_clk)
+        await RisingEdge(self.dut.ptp_clk)
+        self.dut.ptp_rst.value = 1
+        for rst in self.leaf_rst:
+            rst.value = 1
+        for k in range(10):
+            await RisingEdge(self.dut.ptp_clk)
+        self.dut.ptp_rst.value = 0
+        for rst in self.leaf_rst:
+            rst.value = 0
+        self.reset_time_ns = get_sim_time('ns')
+        self.lock_time_ns = [None]*self.leaf_count
+        self.unlocks = [0]*self.leaf_count
+        for k in range(10):
+            await RisingEdge(self.dut.ptp_clk)
+
+    async def _run_clock(self, clk, period):
+        t = Timer(int(get_sim_steps(1.0, 'ns') * period / 2.0))
+
+        while True:
+            await t
+            clk.value = 1
+            await t
+            clk.value = 0
+
+    async def _run_lock_monitor(self, k):
+        locked = self.leaf_locked[k]
+        while True:
+            await RisingEdge(locked)
+            self.lock_time_ns[k] = get_sim_time('ns')
+            await FallingEdge(locked)
+            self.lock_time_ns[k] = None
+            self.unlocks[k] += 1
+
+    def all_locked(self):
+        return all(t is not None for t in self.lock_time_ns)
+
+    def settle_time_ns(self, k):
+        if self.lock_time_ns[k] is None:
+            return None
+        return self.lock_time_ns[k] - self.reset_time_ns
+
+    def get_output_ts_tod_ns(self, k):
+        ts = self.leaf_ts_tod[k].value.integer
+        return Decimal(ts >> 48).scaleb(9) + (Decimal(ts & 0xffffffffffff) / Decimal(2**16))
+
+    def get_output_ts_rel_ns(self, k):
+        ts = self.leaf_ts_rel[k].value.integer
+        return Decimal(ts) / Decimal(2**16)
+
+    async def _run_collect_ref_ts(self):
+        clk_event = RisingEdge(self.dut.ptp_clk)
+        while True:
+            await clk_event
+            start = time.perf_counter()
+            st = Decimal(get_sim_time('fs')).scaleb(-6)
+            ts_rel = self.ptp_td_source.get_ts_rel_ns()
+            ts_tod = self.ptp_td_source.get_ts_tod_ns()
+            for k in range(self.leaf_count):
+                self.rel_cmp[k].add_ref(st, ts_rel)
+                self.tod_cmp[k].add_ref(st, ts_tod)
+            self.model_time += time.perf_counter() - start
+
+    async def _run_collect_output_ts(self, k):
+        clk_event = RisingEdge(self.leaf_clk[k])
+        while True:
+            await clk_event
+            start = time.perf_counter()
+            st = Decimal(get_sim_time('fs')).scaleb(-6)
+            ts_rel = self.get_output_ts_rel_ns(k)
+            ts_tod = self.get_output_ts_tod_ns(k)
+            self.rel_cmp[k].add_output(st, ts_rel)
+            self.tod_cmp[k].add_output(st, ts_tod)
+            if k == 0:
+                # leaf 0 is the reference for the leaf-to-leaf comparison
+                for cmp in self.leaf_cmp[1:]:
+                    cmp.add_ref(st, ts_tod)
+            else:
+                self.leaf_cmp[k].add_output(st, ts_tod)
+            self.model_time += time.perf_counter() - start
+
+    async def measure_ts_diff(self, N=10000):
+        for cmp in self.rel_cmp + self.tod_cmp + self.leaf_cmp:
+            cmp.reset()
+        self.model_time = 0.0
+
+        # collectors only run while measuring, so they do not wake on every
+        # leaf clock edge during lock and settle
+        collectors = [cocotb.start_soon(self._run_collect_ref_ts())]
+        for k in range(self.leaf_count):
+            collectors.append(cocotb.start_soon(self._run_collect_output_ts(k)))
+
+        for k in range(N):
+            await RisingEdge(self.dut.ptp_clk)
+
+        for cr in collectors:
+            cr.kill()
+
+        return ([cmp.stats for cmp in self.rel_cmp], [cmp.stats for cmp in self.tod_cmp],
+            [cmp.stats for cmp in self.leaf_cmp])
+
+
+def worst(stats):
+    return max(abs(stats.min), abs(stats.max)) if stats.n else None
+
+
+@cocotb.test()
+async def run_test(dut):
+
+    tb = TB(dut)
+    n = tb.leaf_count
+
+    lock_timeout_us = float(os.getenv("PTP_TD_SCALE_LOCK_TIMEOUT_US", "2000"))
+    settle_cycles = int(os.getenv("PTP_TD_SCALE_SETTLE", "20000"))
+    measure_cycles = int(os.getenv("PTP_TD_SCALE_CYCLES", "10000"))
+
+    tb.log.info("%d leaves, clock periods: %s ns", n, ", ".join(f"{p:g}" for p in tb.leaf_clock_period))
+
+    await tb.reset()
+
+    # set small offset between timestamps
+    tb.ptp_td_source.set_ts_rel_ns(0)
+    tb.ptp_td_source.set_ts_tod_ns(10000)
+
+    # lock
+    wall_start = time.perf_counter()
+    sim_start = get_sim_time('ns')
+
+    while not tb.all_locked() and get_sim_time('ns') - tb.reset_time_ns < lock_timeout_us*1000:
+        for k in range(1000):
+            await RisingEdge(dut.ptp_clk)
+
+    for k in range(settle_cycles):
+        await RisingEdge(dut.ptp_clk)
+
+    lock_wall = time.perf_counter() - wall_start
+    lock_sim_ns = get_sim_time('ns') - sim_start
+
+    for k in range(n):
+        assert tb.lock_time_ns[k] is not None, f"leaf {k} did not lock within {lock_timeout_us} us"
+
+    settle = [tb.settle_time_ns(k) for k in range(n)]
+
+    # measure
+    unlocks = list(tb.unlocks)
+    wall_start = time.perf_counter()
+    sim_start = get_sim_time('ns')
+
+    rel_stats, tod_stats, leaf_stats = await tb.measure_ts_diff(measure_cycles)
+
+    measure_wall = time.perf_counter() - wall_start
+    measure_sim_ns = get_sim_time('ns') - sim_start
+
+    tb.log.info("%4s %9s %10s %10s %10s %10s %10s %10s", "leaf", "period", "settle us",
+        "rel mean", "tod mean", "tod worst", "l2l mean", "l2l worst")
+
+    for k in range(n):
+        tb.log.info("%4d %9.4f %10.3f %10.4f %10.4f %10.4f %10s %10s", k, tb.leaf_clock_period[k],
+            settle[k]/1000, rel_stats[k].mean, tod_stats[k].mean, worst(tod_stats[k]),
+            f"{leaf_stats[k].mean:10.4f}" if k else "-", f"{worst(leaf_stats[k]):10.4f}" if k else "-")
+
+    tod_means = [s.mean for s in tod_stats]
+    l2l_worst = max((worst(s) for s in leaf_stats[1:]), default=0.0)
+
+    tb.log.info("Settle time: max %.3f us, mean %.3f us", max(settle)/1000, sum(settle)/n/1000)
+    tb.log.info("Leaf-to-leaf disagreement (ToD): mean spread %.4f ns, worst %.4f ns",
+        max(tod_means)-min(tod_means), l2l_worst)
+    tb.log.info("Wall time (lock): %.3f s, %.3f s per leaf, %.3f ms per simulated us per leaf",
+        lock_wall, lock_wall/n, lock_wall/n/lock_sim_ns*1e6)
+    tb.log.info("Wall time (measure): %.3f s, %.3f s per leaf, %.3f ms per simulated us per leaf "
+        "(%.0f%% in the Python collectors)", measure_wall, measure_wall/n,
+        measure_wall/n/measure_sim_ns*1e6, 100*tb.model_time/measure_wall)
+
+    report = os.getenv("PTP_TD_SCALE_REPORT")
+    if report:
+        with open(report, 'a') as f:
+            f.write(json.dumps({
+                'leaves': n,
+                'simulator': cocotb.SIM_NAME,
+                'clock_periods_ns': tb.leaf_clock_period,
+                'settle_time_ns': settle,
+                'rel_mean_ns': [s.mean for s in rel_stats],
+                'tod_mean_ns': tod_means,
+                'tod_worst_ns': [worst(s) for s in tod_stats],
+                'leaf_to_leaf_worst_ns': l2l_worst,
+                'lock_sim_ns': lock_sim_ns,
+                'lock_wall_s': lock_wall,
+                'measure_sim_ns': measure_sim_ns,
+                'measure_wall_s': measure_wall,
+                'model_wall_s': tb.model_time,
+            }) + "\n")
+
+    assert tb.unlocks == unlocks
+    for k in range(n):
+        assert abs(rel_stats[k].mean) < 5
+        assert abs(tod_stats[k].mean) < 5
+    for k in range(1, n):
+        assert abs(leaf_stats[k].mean) < 5
+
+    await RisingEdge(dut.ptp_clk)
+    await RisingEdge(dut.ptp_clk)
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+# leaf counts to run; set PTP_TD_SCALE_LEAVES=1,2,4,8,16,32 for the full sweep
+leaf_counts = [int(n) for n in os.getenv("PTP_TD_SCALE_LEAVES", "1,4").split(",")]
+
+
+@pytest.mark.parametrize("leaf_count", leaf_counts)
+def test_ptp_td_leaf_scale(request, leaf_count):
+    dut = "ptp_td_leaf"
+    wrapper = f"{dut}_wrap_{leaf_count}"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = wrapper
+
+    # generate wrapper
+    wrapper_file = os.path.join(tests_dir, f"{wrapper}.v")
+    if not os.path.exists(wrapper_file):
+        subprocess.Popen(
+            [os.path.join(rtl_dir, f"{dut}_wrap.py"), "-p", f"{leaf_count}"],
+            cwd=tests_dir
+        ).wait()
+
+    verilog_sources = [
+        wrapper_file,
+        os.path.join(rtl_dir, f"{dut}.v"),
+    ]
+
+    parameters = {}
+
+    parameters['TS_REL_EN'] = 1
+    parameters['TS_TOD_EN'] = 1
+    parameters['TS_FNS_W'] = 16
+    parameters['TS_REL_NS_W'] = 48
+    parameters['TS_TOD_S_W'] = 48
+    parameters['TS_REL_W'] = parameters['TS_REL_NS_W'] + parameters['TS_FNS_W']
+    parameters['TS_TOD_W'] = parameters['TS_TOD_S_W'] + 32 + parameters['TS_FNS_W']
+    parameters['TD_SDI_PIPELINE'] = 2
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+
+    extra_env['LEAF_COUNT'] = str(leaf_count)
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    cocotb_test.simulator.run(
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
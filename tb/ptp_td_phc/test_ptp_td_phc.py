@@ -32,16 +32,17 @@ import cocotb_test.simulator
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge
-from cocotb.utils import get_sim_time
+from cocotb.regression import TestFactory
+from cocotb.triggers import RisingEdge, Timer
+from cocotb.utils import get_sim_time, get_sim_steps
 
 try:
-    from ptp_td import PtpTdSink
+    from tbsupport import PtpTdMonitor, PtpTdSink, ReferenceClock, PiServo, ServoStats, period_regs
 except ImportError:
-    # attempt import from current directory
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     try:
-        from ptp_td import PtpTdSink
+        from tbsupport import PtpTdMonitor, PtpTdSink, ReferenceClock, PiServo, ServoStats, period_regs
     finally:
         del sys.path[0]
 
@@ -53,13 +54,24 @@ class TB:
         self.log = logging.getLogger("cocotb.tb")
         self.log.setLevel(logging.DEBUG)
 
-        cocotb.start_soon(Clock(dut.clk, 6.4, units="ns").start())
+        self.clock_period = 6.4
+        cocotb.start_soon(Clock(dut.clk, self.clock_period, units="ns").start())
 
+        # closed-form sink model; set PTP_TD_FAST_FORWARD=0 for the cycle-accurate model
         self.ptp_td_sink = PtpTdSink(
             data=dut.ptp_td_sdo,
             clock=dut.clk,
             reset=dut.rst,
-            period_ns=6.4
+            period_ns=6.4,
+            fast_forward=bool(int(os.getenv("PTP_TD_FAST_FORWARD", "1")))
+        )
+
+        # decodes and checks the messages on the bus
+        self.ptp_td_monitor = PtpTdMonitor(
+            data=dut.ptp_td_sdo,
+            clock=dut.clk,
+            reset=dut.rst,
+            clock_period_ns=self.clock_period
         )
 
         dut.input_ts_rel_ns.setimmediatevalue(0)
@@ -83,6 +95,13 @@ class TB:
         dut.input_drift_denom.setimmediatevalue(0)
         dut.input_drift_valid.setimmediatevalue(0)
 
+    async def wait_cycles(self, n):
+        # skip ahead to just before the last clock edge, then sync to it
+        period = get_sim_steps(self.clock_period, 'ns')
+        if n > 1:
+            await Timer((n-1)*period + period//2, 'step')
+        await RisingEdge(self.dut.clk)
+
     async def reset(self):
         self.dut.rst.setimmediatevalue(0)
         await RisingEdge(self.dut.clk)
@@ -102,16 +121,14 @@ async def run_default_rate(dut):
 
     await tb.reset()
 
-    for k in range(256*6):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(256*6)
 
     await RisingEdge(dut.clk)
     start_time = Decimal(get_sim_time('fs')).scaleb(-6)
     start_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
     start_ts_rel = tb.ptp_td_sink.get_ts_rel_ns()
 
-    for k in range(10000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(10000)
 
     stop_time = Decimal(get_sim_time('fs')).scaleb(-6)
     stop_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
@@ -134,6 +151,9 @@ async def run_default_rate(dut):
     assert abs(ts_tod_diff) < 1e-3
     assert abs(ts_rel_diff) < 1e-3
 
+    tb.ptp_td_monitor.log_summary()
+    tb.ptp_td_monitor.check(strict=True)
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
@@ -166,8 +186,7 @@ async def run_load_timestamps(dut):
 
     dut.input_ts_rel_valid.value = 0
 
-    for k in range(256*6):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(256*6)
 
     # assert tb.ptp_td_sink.get_ts_tod_s() - (12.123456789 + (256*6-(14*17+32)-2)*6.4e-9) < 6.4e-9
     # assert tb.ptp_td_sink.get_ts_rel_ns() - (123456789 + (256*6-(14*17+32)-1)*6.4) < 6.4
@@ -177,8 +196,7 @@ async def run_load_timestamps(dut):
     start_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
     start_ts_rel = tb.ptp_td_sink.get_ts_rel_ns()
 
-    for k in range(10000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(10000)
 
     stop_time = Decimal(get_sim_time('fs')).scaleb(-6)
     stop_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
@@ -201,6 +219,9 @@ async def run_load_timestamps(dut):
     assert abs(ts_tod_diff) < 1e-3
     assert abs(ts_rel_diff) < 1e-3
 
+    tb.ptp_td_monitor.log_summary()
+    tb.ptp_td_monitor.check(strict=True)
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
@@ -212,16 +233,14 @@ async def run_offsets(dut):
 
     await tb.reset()
 
-    for k in range(256*6):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(256*6)
 
     await RisingEdge(dut.clk)
     start_time = Decimal(get_sim_time('fs')).scaleb(-6)
     start_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
     start_ts_rel = tb.ptp_td_sink.get_ts_rel_ns()
 
-    for k in range(2000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(2000)
 
     tb.log.info("Offset FNS (positive)")
 
@@ -236,8 +255,7 @@ async def run_offsets(dut):
 
     dut.input_ts_offset_valid.value = 0
 
-    for k in range(2000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(2000)
 
     tb.log.info("Offset FNS (negative)")
 
@@ -252,8 +270,7 @@ async def run_offsets(dut):
 
     dut.input_ts_offset_valid.value = 0
 
-    for k in range(2000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(2000)
 
     tb.log.info("Offset relative TS (positive)")
 
@@ -266,8 +283,7 @@ async def run_offsets(dut):
 
     dut.input_ts_rel_offset_valid.value = 0
 
-    for k in range(2000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(2000)
 
     tb.log.info("Offset relative TS (negative)")
 
@@ -280,8 +296,7 @@ async def run_offsets(dut):
 
     dut.input_ts_rel_offset_valid.value = 0
 
-    for k in range(2000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(2000)
 
     tb.log.info("Offset ToD TS (positive)")
 
@@ -298,8 +313,7 @@ async def run_offsets(dut):
 
     dut.input_ts_tod_offset_valid.value = 0
 
-    for k in range(2000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(2000)
 
     tb.log.info("Offset ToD TS (negative)")
 
@@ -316,8 +330,7 @@ async def run_offsets(dut):
 
     dut.input_ts_tod_offset_valid.value = 0
 
-    for k in range(10000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(10000)
 
     stop_time = Decimal(get_sim_time('fs')).scaleb(-6)
     stop_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
@@ -340,6 +353,10 @@ async def run_offsets(dut):
     assert abs(ts_tod_diff) < 1e-3
     assert abs(ts_rel_diff) < 1e-3
 
+    # discontinuities from unflagged updates are expected here
+    tb.ptp_td_monitor.log_summary()
+    tb.ptp_td_monitor.check()
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
@@ -363,8 +380,7 @@ async def run_seconds_increment(dut):
 
     dut.input_ts_tod_valid.value = 0
 
-    for k in range(256*6):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(256*6)
 
     await RisingEdge(dut.clk)
     start_time = Decimal(get_sim_time('fs')).scaleb(-6)
@@ -404,6 +420,9 @@ async def run_seconds_increment(dut):
     assert abs(ts_tod_diff) < 1e-3
     assert abs(ts_rel_diff) < 1e-3
 
+    tb.ptp_td_monitor.log_summary()
+    tb.ptp_td_monitor.check(strict=True)
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
@@ -425,16 +444,14 @@ async def run_frequency_adjustment(dut):
 
     dut.input_period_valid.value = 0
 
-    for k in range(256*6):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(256*6)
 
     await RisingEdge(dut.clk)
     start_time = Decimal(get_sim_time('fs')).scaleb(-6)
     start_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
     start_ts_rel = tb.ptp_td_sink.get_ts_rel_ns()
 
-    for k in range(10000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(10000)
 
     stop_time = Decimal(get_sim_time('fs')).scaleb(-6)
     stop_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
@@ -457,6 +474,9 @@ async def run_frequency_adjustment(dut):
     assert abs(ts_tod_diff) < 1e-3
     assert abs(ts_rel_diff) < 1e-3
 
+    tb.ptp_td_monitor.log_summary()
+    tb.ptp_td_monitor.check(strict=True)
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
@@ -476,16 +496,14 @@ async def run_drift_adjustment(dut):
 
     dut.input_drift_valid.value = 0
 
-    for k in range(256*6):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(256*6)
 
     await RisingEdge(dut.clk)
     start_time = Decimal(get_sim_time('fs')).scaleb(-6)
     start_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
     start_ts_rel = tb.ptp_td_sink.get_ts_rel_ns()
 
-    for k in range(10000):
-        await RisingEdge(dut.clk)
+    await tb.wait_cycles(10000)
 
     stop_time = Decimal(get_sim_time('fs')).scaleb(-6)
     stop_ts_tod = tb.ptp_td_sink.get_ts_tod_ns()
@@ -508,10 +526,92 @@ async def run_drift_adjustment(dut):
     assert abs(ts_tod_diff) < 1e-3
     assert abs(ts_rel_diff) < 1e-3
 
+    tb.ptp_td_monitor.log_summary()
+    tb.ptp_td_monitor.check(strict=True)
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
 
+async def run_servo(dut, ppm=20.0, wander_ppm=0.5):
+
+    tb = TB(dut)
+
+    cycles = int(os.getenv("PTP_SERVO_CYCLES", 2**18))
+    interval = int(os.getenv("PTP_SERVO_INTERVAL", 2048))
+
+    ref = ReferenceClock(ppm=ppm, wander_ppm=wander_ppm, wander_tau_ns=1e5,
+        start_ns=1500000000, seed=1)
+    servo = PiServo()
+    stats = ServoStats(lock_threshold_ns=1.0)
+
+    await tb.reset()
+
+    await tb.wait_cycles(256*6)
+
+    for k in range(cycles // interval):
+        await tb.wait_cycles(interval)
+
+        sim_ns = get_sim_time('ns')
+        offset = float(tb.ptp_td_sink.get_ts_tod_ns()) - ref.time_ns(sim_ns)
+
+        state, ppb = servo.sample(offset, interval*tb.clock_period)
+
+        if state == PiServo.JUMP:
+            tb.log.info("Step clock: offset %g ns", offset)
+            ts_s, ts_ns = divmod(int(ref.time_ns(sim_ns)), 1000000000)
+            dut.input_ts_tod_s.value = ts_s
+            dut.input_ts_tod_ns.value = ts_ns
+            dut.input_ts_tod_valid.value = 1
+
+            await RisingEdge(dut.clk)
+            while not dut.input_ts_tod_ready.value:
+                await RisingEdge(dut.clk)
+
+            dut.input_ts_tod_valid.value = 0
+
+            # wait for the new time to reach the sink
+            await tb.wait_cycles(256*6)
+        else:
+            stats.add(sim_ns, offset, ppb)
+
+        ns, fns, num, denom = period_regs(tb.clock_period*(1+ppb*1e-9), 32, 16)
+
+        dut.input_period_ns.value = ns
+        dut.input_period_fns.value = fns
+        dut.input_period_valid.value = 1
+        dut.input_drift_num.value = num
+        dut.input_drift_denom.value = denom
+        dut.input_drift_valid.value = 1
+
+        await RisingEdge(dut.clk)
+
+        dut.input_period_valid.value = 0
+        dut.input_drift_valid.value = 0
+
+    stats.log_summary(tb.log)
+    res = stats.summary()
+
+    assert res['locked']
+    assert abs(res['offset_mean_ns']) < 1.0
+
+    # discontinuities from unflagged updates are expected here
+    tb.ptp_td_monitor.log_summary()
+    tb.ptp_td_monitor.check()
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+# servo convergence runs are long, so only run with PTP_SERVO_CYCLES set
+# (e.g. 262144, or 4000000 for long-horizon runs)
+if cocotb.SIM_NAME and os.getenv("PTP_SERVO_CYCLES"):
+
+    factory = TestFactory(run_servo)
+    factory.add_option("ppm", [20.0, -100.0])
+    factory.generate_tests()
+
+
 # cocotb-test
 
 tests_dir = os.path.abspath(os.path.dirname(__file__))
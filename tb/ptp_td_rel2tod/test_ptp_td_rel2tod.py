@@ -37,12 +37,12 @@ from cocotb.triggers import RisingEdge
 from cocotbext.axi.stream import define_stream
 
 try:
-    from ptp_td import PtpTdSource
+    from tbsupport import ErrorStats, PtpTdSource
 except ImportError:
-    # attempt import from current directory
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     try:
-        from ptp_td import PtpTdSource
+        from tbsupport import ErrorStats, PtpTdSource
     finally:
         del sys.path[0]
 
@@ -95,6 +95,8 @@ async def run_test(dut):
 
     await tb.reset()
 
+    stats = ErrorStats(bin_width=0.0001)
+
     for start_rel, start_tod in [('1234', '123456789.987654321'),
             ('1234', '123456788.987654321'),
             ('1234.9', '123456789.987654321'),
@@ -144,10 +146,14 @@ async def run_test(dut):
 
             diff = tod - ts_tod
             tb.log.info(f"Difference: {diff} ns")
+            stats.add(float(diff))
 
             assert abs(diff) < 1e-3
             assert ns < 1000000000
 
+    stats.log_summary(tb.log)
+    stats.log_histogram(tb.log)
+
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
 
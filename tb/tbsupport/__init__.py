@@ -0,0 +1,70 @@
+"""
+
+Copyright (c) 2021-2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Shared models for the cocotb testbenches in tb/*/
+#
+# Submodules are imported on first use so that a testbench only pays for
+# the models it actually uses (the BASE-R codec tables are built when
+# tbsupport.baser is first imported, and are then shared by every model
+# instance in the simulator process).
+
+_exports = {
+    'BaseRSerdesSource': 'baser',
+    'BaseRSerdesSink': 'baser',
+    'BaseRScrambler': 'baser',
+    'BaseRDescrambler': 'baser',
+    'CdcSweepPoint': 'cdc_sweep',
+    'ErrorStats': 'ts_compare',
+    'IfgAnalyzer': 'ifg',
+    'PeroutChecker': 'perout',
+    'PiServo': 'servo',
+    'PtpTdDecoder': 'ptp_td_monitor',
+    'PtpTdMessage': 'ptp_td_monitor',
+    'PtpTdMonitor': 'ptp_td_monitor',
+    'PtpTdSource': 'ptp_td',
+    'PtpTdSink': 'ptp_td',
+    'PtpTsAuditor': 'ptp_audit',
+    'QuadClock': 'quad_clock',
+    'ReferenceClock': 'servo',
+    'ServoStats': 'servo',
+    'SpeedPlan': 'speed_plan',
+    'ThroughputMeter': 'throughput',
+    'TsComparator': 'ts_compare',
+    'period_regs': 'servo',
+    'ptp_td_decode_vcd': 'ptp_td_monitor',
+    'quad_clock_verilog': 'quad_clock',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name in _exports:
+        module = __import__(f"{__name__}.{_exports[name]}", fromlist=[name])
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,634 @@
+"""
+
+Copyright (c) 2021 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+
+import cocotb
+from cocotb.queue import Queue, QueueFull
+from cocotb.triggers import RisingEdge, Timer, First, Event
+from cocotb.utils import get_sim_time
+
+from cocotbext.eth.constants import (EthPre, XgmiiCtrl, BaseRCtrl, BaseRO,
+    BaseRSync, BaseRBlockType, xgmii_ctrl_to_baser_mapping,
+    baser_ctrl_to_xgmii_mapping, block_type_term_lane_mapping)
+from cocotbext.eth import XgmiiFrame
+
+
+# bit reversal lookup tables; reversing the bits in each byte and the order
+# of the bytes reverses the whole block
+_bit_reverse_table = bytes(int(f"{k:08b}"[::-1], 2) for k in range(256))
+_hdr_bit_reverse_table = (0b00, 0b10, 0b01, 0b11)
+
+
+# 64b/66b block codec
+#
+# Control code remapping is done with lookup tables that translate two
+# lanes at a time, so the 56-bit packed control field of a block takes
+# four table lookups.  Block encoding and decoding are driven by tables
+# indexed by the XGMII control lane mask (encode) or by the block type
+# field (decode), precomputed once at import time.
+
+_xgmii_os = {XgmiiCtrl.SEQ_OS, XgmiiCtrl.SIG_OS}
+
+_xgmii_to_baser_ctrl = [int(xgmii_ctrl_to_baser_mapping.get(k, BaseRCtrl.ERROR)) for k in range(256)]
+_xgmii_to_baser_ctrl_2 = [lo | hi << 7 for hi in _xgmii_to_baser_ctrl for lo in _xgmii_to_baser_ctrl]
+
+_baser_to_xgmii_ctrl = [int(baser_ctrl_to_xgmii_mapping.get(k, XgmiiCtrl.ERROR)) for k in range(128)]
+_baser_to_xgmii_ctrl_2 = [lo | hi << 8 for hi in _baser_to_xgmii_ctrl for lo in _baser_to_xgmii_ctrl]
+
+_baser_o_to_xgmii = [XgmiiCtrl.ERROR]*16
+_baser_o_to_xgmii[BaseRO.SEQ_OS] = XgmiiCtrl.SEQ_OS
+_baser_o_to_xgmii[BaseRO.SIG_OS] = XgmiiCtrl.SIG_OS
+
+
+def _lane_mask(lanes):
+    return sum(0xff << k*8 for k in lanes)
+
+
+def _ctrl_field_mask(lanes):
+    return sum(0x7f << k*7 for k in lanes)
+
+
+def _build_encode_table():
+    # candidate encodings in order of priority, as
+    # (ctrl lanes set, ctrl lanes clear, lane tests, block type, ctrl field mask, data mask, data shift, O code lanes)
+    rules = [
+        # D7 D6 D5 D4 D3 D2 D1    BT
+        ({0}, range(1, 8), ((0, {XgmiiCtrl.START}),),
+            BaseRBlockType.START_0, 0, _lane_mask(range(1, 8)), 0, ()),
+        # D7 D6 D5    O0 D3 D2 D1 BT
+        ({0, 4}, (1, 2, 3, 5, 6, 7), ((4, {XgmiiCtrl.START}), (0, _xgmii_os)),
+            BaseRBlockType.OS_START, 0, _lane_mask((1, 2, 3, 5, 6, 7)), 0, (0,)),
+        # D7 D6 D5    C3 C2 C1 C0 BT
+        ({4}, (5, 6, 7), ((4, {XgmiiCtrl.START}),),
+            BaseRBlockType.START_4, _ctrl_field_mask(range(4)), _lane_mask((5, 6, 7)), 0, ()),
+        # D7 D6 D5 O4 O0 D3 D2 D1 BT
+        ({0, 4}, (1, 2, 3, 5, 6, 7), ((0, _xgmii_os), (4, _xgmii_os)),
+            BaseRBlockType.OS_04, 0, _lane_mask((1, 2, 3, 5, 6, 7)), 0, (0, 4)),
+        # C7 C6 C5 C4 O0 D3 D2 D1 BT
+        ({0}, (1, 2, 3), ((0, _xgmii_os),),
+            BaseRBlockType.OS_0, _ctrl_field_mask(range(4, 8)), _lane_mask((1, 2, 3)), 0, (0,)),
+        # D7 D6 D5 O4 C3 C2 C1 C0 BT
+        ({4}, (5, 6, 7), ((4, _xgmii_os),),
+            BaseRBlockType.OS_4, _ctrl_field_mask(range(4)), _lane_mask((5, 6, 7)), 0, (4,)),
+    ]
+
+    for k in range(8):
+        # C7 C6 C5 C4 C3 C2 C1    BT
+        # ...
+        #    D6 D5 D4 D3 D2 D1 D0 BT
+        term = [bt for bt, lane in block_type_term_lane_mapping.items() if lane == k][0]
+        rules.append(({k}, range(k), ((k, {XgmiiCtrl.TERM}),),
+            term, _ctrl_field_mask(range(k+1, 8)), _lane_mask(range(k)), 8, ()))
+
+    # precompute lane masks and per-rule entries
+    rules = [(sum(1 << k for k in ctrl_set), sum(1 << k for k in ctrl_clear),
+        (tests, int(bt), ctrl_mask, data_mask, data_shift, tuple((k, BaseRO.SIG_OS << (32+k)) for k in o_lanes)))
+        for ctrl_set, ctrl_clear, tests, bt, ctrl_mask, data_mask, data_shift, o_lanes in rules]
+
+    # C7 C6 C5 C4 C3 C2 C1 C0 BT
+    ctrl_entry = ((), int(BaseRBlockType.CTRL), _ctrl_field_mask(range(8)), 0, 0, ())
+
+    table = [None]
+    for mask in range(1, 256):
+        entry = [e for ctrl_set, ctrl_clear, e in rules if mask & ctrl_set == ctrl_set and not mask & ctrl_clear]
+        entry.append(ctrl_entry)
+        table.append(tuple(entry))
+
+    return table
+
+
+def _build_decode_table():
+    # block type -> (ctrl lane mask, data mask, data shift, const, O code lanes, XGMII ctrl lane mask)
+    table = [None]*256
+
+    table[BaseRBlockType.CTRL] = (_lane_mask(range(8)), 0, 0, 0, (), 0xff)
+    table[BaseRBlockType.OS_4] = (_lane_mask(range(4)), _lane_mask((5, 6, 7)), 0, 0, (4,), 0x1f)
+    table[BaseRBlockType.START_4] = (_lane_mask(range(4)), _lane_mask((5, 6, 7)), 0,
+        XgmiiCtrl.START << 32, (), 0x1f)
+    table[BaseRBlockType.OS_START] = (0, _lane_mask((1, 2, 3, 5, 6, 7)), 0,
+        XgmiiCtrl.START << 32, (0,), 0x11)
+    table[BaseRBlockType.OS_04] = (0, _lane_mask((1, 2, 3, 5, 6, 7)), 0, 0, (0, 4), 0x11)
+    table[BaseRBlockType.START_0] = (0, _lane_mask(range(1, 8)), 0, XgmiiCtrl.START, (), 0x01)
+    table[BaseRBlockType.OS_0] = (_lane_mask(range(4, 8)), _lane_mask((1, 2, 3)), 0, 0, (0,), 0xf1)
+
+    for bt, k in block_type_term_lane_mapping.items():
+        table[bt] = (_lane_mask(range(k+1, 8)), _lane_mask(range(k)), 8,
+            XgmiiCtrl.TERM << k*8, (), (0xff << k) & 0xff)
+
+    return table
+
+
+_encode_table = _build_encode_table()
+_decode_table = _build_decode_table()
+
+
+def baser_encode_block(dl, cl):
+    # encode 8 lanes of XGMII data (bytes) and control (list) into a 64b/66b block
+    # returns (data, header)
+    data = int.from_bytes(dl, 'little')
+
+    if not any(cl):
+        return data, BaseRSync.DATA
+
+    mask = 0
+    for k in range(8):
+        if cl[k]:
+            mask |= 1 << k
+
+    for tests, bt, ctrl_mask, data_mask, data_shift, o_sig in _encode_table[mask]:
+        for lane, values in tests:
+            if dl[lane] not in values:
+                break
+        else:
+            blk = bt | (data & data_mask) << data_shift
+            if ctrl_mask:
+                t = _xgmii_to_baser_ctrl_2
+                ctrl = (t[data & 0xffff] | t[(data >> 16) & 0xffff] << 14 |
+                    t[(data >> 32) & 0xffff] << 28 | t[data >> 48] << 42)
+                blk |= (ctrl & ctrl_mask) << 8
+            for lane, o in o_sig:
+                if dl[lane] == XgmiiCtrl.SIG_OS:
+                    blk |= o
+            return blk, BaseRSync.CTRL
+
+
+def baser_decode_ctrl_block(data):
+    # decode a 64b/66b control block into 8 lanes of XGMII data and control
+    # returns (data bytes, control lane mask), or None for an invalid block type
+    entry = _decode_table[data & 0xff]
+
+    if entry is None:
+        return None
+
+    ctrl_mask, data_mask, data_shift, dl, o_lanes, cl = entry
+
+    dl |= (data >> data_shift) & data_mask
+    if ctrl_mask:
+        t = _baser_to_xgmii_ctrl_2
+        ctrl = (t[(data >> 8) & 0x3fff] | t[(data >> 22) & 0x3fff] << 16 |
+            t[(data >> 36) & 0x3fff] << 32 | t[data >> 50] << 48)
+        dl |= ctrl & ctrl_mask
+    for lane in o_lanes:
+        dl |= _baser_o_to_xgmii[(data >> (32+lane)) & 0xf] << lane*8
+
+    return dl.to_bytes(8, 'little'), cl
+
+
+class BaseRScrambler:
+
+    # 64b/66b self-synchronizing scrambler, G(x) = 1 + x^39 + x^58
+    #
+    # Scrambled bit n is s[n] = d[n] ^ s[n-39] ^ s[n-58].  Since a block
+    # is 64 bits wide, the 58 bits of history are always the top 58 bits
+    # of the previous scrambled block, so the whole block can be computed
+    # at once: with t = d ^ h ^ (h >> 19), the in-block feedback terms only
+    # ever reach bits that are still equal to t, giving
+    # s = t ^ (t << 39) ^ (t << 58).
+
+    def __init__(self, state=0):
+        self.state = state
+
+    def scramble(self, data):
+        t = data ^ self.state ^ (self.state >> 19)
+        data = (t ^ (t << 39) ^ (t << 58)) & 0xffffffffffffffff
+        self.state = data >> 6
+        return data
+
+
+class BaseRDescrambler:
+
+    # 64b/66b self-synchronizing descrambler, G(x) = 1 + x^39 + x^58
+    #
+    # d[n] = s[n] ^ s[n-39] ^ s[n-58], history is the top 58 bits of the
+    # previous received block
+
+    def __init__(self, state=0):
+        self.state = state
+
+    def descramble(self, data):
+        b = (data ^ self.state ^ (self.state >> 19) ^ (data << 39) ^ (data << 58)) & 0xffffffffffffffff
+        self.state = data >> 6
+        return b
+
+
+class BaseRSerdesSource():
+
+    def __init__(self, data, header, clock, enable=None, slip=None, scramble=True, reverse=False, *args, **kwargs):
+        self.log = logging.getLogger(f"cocotb.{data._path}")
+        self.data = data
+        self.header = header
+        self.clock = clock
+        self.enable = enable
+        self.slip = slip
+        self.scramble = scramble
+        self.reverse = reverse
+
+        self.log.info("BASE-R serdes source")
+        self.log.info("Copyright (c) 2021 Alex Forencich")
+        self.log.info("https://github.com/alexforencich/verilog-ethernet")
+
+        super().__init__(*args, **kwargs)
+
+        self.active = False
+        self.queue = Queue()
+        self.dequeue_event = Event()
+        self.current_frame = None
+        self.idle_event = Event()
+        self.idle_event.set()
+
+        self.enable_dic = True
+        self.ifg = 12
+        self.force_offset_start = False
+
+        self.bit_offset = 0
+
+        self.queue_occupancy_bytes = 0
+        self.queue_occupancy_frames = 0
+
+        self.queue_occupancy_limit_bytes = -1
+        self.queue_occupancy_limit_frames = -1
+
+        self.width = len(self.data)
+        self.byte_size = 8
+        self.byte_lanes = 8
+
+        assert self.width == self.byte_lanes * self.byte_size
+
+        self.log.info("BASE-R serdes source model configuration")
+        self.log.info("  Byte size: %d bits", self.byte_size)
+        self.log.info("  Data width: %d bits (%d bytes)", self.width, self.byte_lanes)
+        self.log.info("  Enable scrambler: %s", self.scramble)
+        self.log.info("  Bit reverse: %s", self.reverse)
+
+        self.data.setimmediatevalue(0)
+        self.header.setimmediatevalue(0)
+
+        self._run_cr = cocotb.start_soon(self._run())
+
+    async def send(self, frame):
+        while self.full():
+            self.dequeue_event.clear()
+            await self.dequeue_event.wait()
+        frame = XgmiiFrame(frame)
+        await self.queue.put(frame)
+        self.idle_event.clear()
+        self.queue_occupancy_bytes += len(frame)
+        self.queue_occupancy_frames += 1
+
+    def send_nowait(self, frame):
+        if self.full():
+            raise QueueFull()
+        frame = XgmiiFrame(frame)
+        self.queue.put_nowait(frame)
+        self.idle_event.clear()
+        self.queue_occupancy_bytes += len(frame)
+        self.queue_occupancy_frames += 1
+
+    def count(self):
+        return self.queue.qsize()
+
+    def empty(self):
+        return self.queue.empty()
+
+    def full(self):
+        if self.queue_occupancy_limit_bytes > 0 and self.queue_occupancy_bytes > self.queue_occupancy_limit_bytes:
+            return True
+        elif self.queue_occupancy_limit_frames > 0 and self.queue_occupancy_frames > self.queue_occupancy_limit_frames:
+            return True
+        else:
+            return False
+
+    def idle(self):
+        return self.empty() and not self.active
+
+    def clear(self):
+        while not self.queue.empty():
+            frame = self.queue.get_nowait()
+            frame.sim_time_end = None
+            frame.handle_tx_complete()
+        self.dequeue_event.set()
+        self.idle_event.set()
+        self.queue_occupancy_bytes = 0
+        self.queue_occupancy_frames = 0
+
+    async def wait(self):
+        await self.idle_event.wait()
+
+    async def _run(self):
+        frame = None
+        frame_offset = 0
+        ifg_cnt = 0
+        deficit_idle_cnt = 0
+        scrambler = BaseRScrambler()
+        last_d = 0
+        self.active = False
+
+        while True:
+            await RisingEdge(self.clock)
+
+            if self.enable is None or self.enable.value:
+                if ifg_cnt + deficit_idle_cnt > self.byte_lanes-1 or (not self.enable_dic and ifg_cnt > 4):
+                    # in IFG
+                    ifg_cnt = ifg_cnt - self.byte_lanes
+                    if ifg_cnt < 0:
+                        if self.enable_dic:
+                            deficit_idle_cnt = max(deficit_idle_cnt+ifg_cnt, 0)
+                        ifg_cnt = 0
+
+                elif frame is None:
+                    # idle
+                    if not self.queue.empty():
+                        # send frame
+                        frame = self.queue.get_nowait()
+                        self.dequeue_event.set()
+                        self.queue_occupancy_bytes -= len(frame)
+                        self.queue_occupancy_frames -= 1
+                        self.current_frame = frame
+                        frame.sim_time_start = get_sim_time()
+                        frame.sim_time_sfd = None
+                        frame.sim_time_end = None
+                        self.log.info("TX frame: %s", frame)
+                        frame.normalize()
+                        frame.start_lane = 0
+                        assert frame.data[0] == EthPre.PRE
+                        assert frame.ctrl[0] == 0
+                        frame.data[0] = XgmiiCtrl.START
+                        frame.ctrl[0] = 1
+                        frame.data.append(XgmiiCtrl.TERM)
+                        frame.ctrl.append(1)
+
+                        # offset start
+                        if self.enable_dic:
+                            min_ifg = 3 - deficit_idle_cnt
+                        else:
+                            min_ifg = 0
+
+                        if self.byte_lanes > 4 and (ifg_cnt > min_ifg or self.force_offset_start):
+                            ifg_cnt = ifg_cnt-4
+                            frame.start_lane = 4
+                            frame.data = bytearray([XgmiiCtrl.IDLE]*4)+frame.data
+                            frame.ctrl = [1]*4+frame.ctrl
+
+                        if self.enable_dic:
+                            deficit_idle_cnt = max(deficit_idle_cnt+ifg_cnt, 0)
+                        ifg_cnt = 0
+                        self.active = True
+                        frame_offset = 0
+                    else:
+                        # clear counters
+                        deficit_idle_cnt = 0
+                        ifg_cnt = 0
+
+                if frame is not None:
+                    if len(frame.data) - frame_offset > self.byte_lanes:
+                        # frame continues past this block
+                        dl = frame.data[frame_offset:frame_offset+self.byte_lanes]
+                        cl = frame.ctrl[frame_offset:frame_offset+self.byte_lanes]
+                        if frame.sim_time_sfd is None and EthPre.SFD in dl:
+                            frame.sim_time_sfd = get_sim_time()
+                        frame_offset += self.byte_lanes
+                    else:
+                        dl = bytearray()
+                        cl = []
+
+                        for k in range(self.byte_lanes):
+                            if frame is not None:
+                                d = frame.data[frame_offset]
+                                if frame.sim_time_sfd is None and d == EthPre.SFD:
+                                    frame.sim_time_sfd = get_sim_time()
+                                dl.append(d)
+                                cl.append(frame.ctrl[frame_offset])
+                                frame_offset += 1
+
+                                if frame_offset >= len(frame.data):
+                                    ifg_cnt = max(self.ifg - (self.byte_lanes-k), 0)
+                                    frame.sim_time_end = get_sim_time()
+                                    frame.handle_tx_complete()
+                                    frame = None
+                                    self.current_frame = None
+                            else:
+                                dl.append(XgmiiCtrl.IDLE)
+                                cl.append(1)
+
+                    data, header = baser_encode_block(dl, cl)
+                else:
+                    data = BaseRBlockType.CTRL
+                    header = BaseRSync.CTRL
+                    self.active = False
+                    self.idle_event.set()
+
+                if self.scramble:
+                    # 64b/66b scrambler
+                    data = scrambler.scramble(data)
+
+                if self.slip is not None and self.slip.value:
+                    self.bit_offset += 1
+
+                self.bit_offset = max(0, self.bit_offset) % 66
+
+                bit_offset = self.bit_offset
+
+                if bit_offset != 0:
+                    d = data << 2 | header
+
+                    out_d = (last_d >> 66-bit_offset | d << bit_offset) & 0x3ffffffffffffffff
+
+                    last_d = d
+
+                    data = out_d >> 2
+                    header = out_d & 3
+
+                if self.reverse:
+                    # bit reverse
+                    data = int.from_bytes(data.to_bytes(8, 'little').translate(_bit_reverse_table), 'big')
+                    header = _hdr_bit_reverse_table[header]
+
+                self.data.value = data
+                self.header.value = header
+
+
+class BaseRSerdesSink:
+
+    def __init__(self, data, header, clock, enable=None, scramble=True, reverse=False, *args, **kwargs):
+        self.log = logging.getLogger(f"cocotb.{data._path}")
+        self.data = data
+        self.header = header
+        self.clock = clock
+        self.enable = enable
+        self.scramble = scramble
+        self.reverse = reverse
+
+        self.log.info("BASE-R serdes sink")
+        self.log.info("Copyright (c) 2021 Alex Forencich")
+        self.log.info("https://github.com/alexforencich/verilog-ethernet")
+
+        super().__init__(*args, **kwargs)
+
+        self.active = False
+        self.queue = Queue()
+        self.active_event = Event()
+
+        self.queue_occupancy_bytes = 0
+        self.queue_occupancy_frames = 0
+
+        self.width = len(self.data)
+        self.byte_size = 8
+        self.byte_lanes = 8
+
+        assert self.width == self.byte_lanes * self.byte_size
+
+        self.log.info("BASE-R serdes sink model configuration")
+        self.log.info("  Byte size: %d bits", self.byte_size)
+        self.log.info("  Data width: %d bits (%d bytes)", self.width, self.byte_lanes)
+        self.log.info("  Enable scrambler: %s", self.scramble)
+        self.log.info("  Bit reverse: %s", self.reverse)
+
+        self._run_cr = cocotb.start_soon(self._run())
+
+    def _recv(self, frame, compact=True):
+        if self.queue.empty():
+            self.active_event.clear()
+        self.queue_occupancy_bytes -= len(frame)
+        self.queue_occupancy_frames -= 1
+        if compact:
+            frame.compact()
+        return frame
+
+    async def recv(self, compact=True):
+        frame = await self.queue.get()
+        return self._recv(frame, compact)
+
+    def recv_nowait(self, compact=True):
+        frame = self.queue.get_nowait()
+        return self._recv(frame, compact)
+
+    def count(self):
+        return self.queue.qsize()
+
+    def empty(self):
+        return self.queue.empty()
+
+    def idle(self):
+        return not self.active
+
+    def clear(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.active_event.clear()
+        self.queue_occupancy_bytes = 0
+        self.queue_occupancy_frames = 0
+
+    async def wait(self, timeout=0, timeout_unit=None):
+        if not self.empty():
+            return
+        if timeout:
+            await First(self.active_event.wait(), Timer(timeout, timeout_unit))
+        else:
+            await self.active_event.wait()
+
+    async def _run(self):
+        frame = None
+        descrambler = BaseRDescrambler()
+        self.active = False
+
+        while True:
+            await RisingEdge(self.clock)
+
+            if self.enable is None or self.enable.value:
+                data = self.data.value.integer
+                header = self.header.value.integer
+
+                if self.reverse:
+                    # bit reverse
+                    data = int.from_bytes(data.to_bytes(8, 'little').translate(_bit_reverse_table), 'big')
+                    header = _hdr_bit_reverse_table[header]
+
+                if self.scramble:
+                    # 64b/66b descrambler
+                    data = descrambler.descramble(data)
+
+                # 10GBASE-R decoding
+                if header == BaseRSync.DATA:
+                    # data
+                    dl = data.to_bytes(8, 'little')
+                    cl = 0
+                elif header == BaseRSync.CTRL:
+                    blk = baser_decode_ctrl_block(data)
+                    if blk is not None:
+                        dl, cl = blk
+                    else:
+                        # invalid block type
+                        self.log.warning("Invalid block type")
+                        dl = bytes([XgmiiCtrl.ERROR]*8)
+                        cl = 0xff
+                else:
+                    # invalid sync header
+                    self.log.warning("Invalid sync header")
+                    dl = bytes([XgmiiCtrl.ERROR]*8)
+                    cl = 0xff
+
+                if frame is not None and not cl:
+                    # data in all lanes
+                    if frame.sim_time_sfd is None and EthPre.SFD in dl:
+                        frame.sim_time_sfd = get_sim_time()
+
+                    frame.data.extend(dl)
+                    frame.ctrl.extend([0]*self.byte_lanes)
+                else:
+                    for offset in range(self.byte_lanes):
+                        d_val = dl[offset]
+                        c_val = (cl >> offset) & 1
+
+                        if frame is None:
+                            if c_val and d_val == XgmiiCtrl.START:
+                                # start
+                                frame = XgmiiFrame(bytearray([EthPre.PRE]), [0])
+                                frame.sim_time_start = get_sim_time()
+                                frame.start_lane = offset
+                        else:
+                            if c_val:
+                                # got a control character; terminate frame reception
+                                if d_val != XgmiiCtrl.TERM:
+                                    # store control character if it's not a termination
+                                    frame.data.append(d_val)
+                                    frame.ctrl.append(c_val)
+
+                                frame.compact()
+                                frame.sim_time_end = get_sim_time()
+                                self.log.info("RX frame: %s", frame)
+
+                                self.queue_occupancy_bytes += len(frame)
+                                self.queue_occupancy_frames += 1
+
+                                self.queue.put_nowait(frame)
+                                self.active_event.set()
+
+                                frame = None
+                            else:
+                                if frame.sim_time_sfd is None and d_val == EthPre.SFD:
+                                    frame.sim_time_sfd = get_sim_time()
+
+                                frame.data.append(d_val)
+                                frame.ctrl.append(c_val)
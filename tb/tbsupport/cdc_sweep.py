@@ -0,0 +1,123 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# ptp_clock_cdc parameter sweep point
+#
+# One point of the ptp_clock_cdc accuracy sweep (see
+# tbsupport.cdc_sweep_report for the pytest side).  The point is passed to
+# the simulator through the environment: $CDC_SWEEP_DIR enables the sweep
+# and receives the result as a JSON file, $CDC_SWEEP_INPUT_PERIOD and
+# $CDC_SWEEP_OUTPUT_PERIOD are the nominal clock periods in ns and
+# $CDC_SWEEP_PPM is the frequency offset applied to the output clock.
+# $CDC_SWEEP_SAMPLES sets the number of output clock cycles measured once
+# the CDC has locked and settled.
+
+import hashlib
+import json
+import os
+import time
+
+import cocotb
+from cocotb.utils import get_sim_time
+
+
+class CdcSweepPoint:
+
+    def __init__(self, log=None):
+        self.log = log
+
+        self.input_period = float(os.getenv("CDC_SWEEP_INPUT_PERIOD", "6.4"))
+        self.output_period = float(os.getenv("CDC_SWEEP_OUTPUT_PERIOD", "6.4"))
+        self.ppm = float(os.getenv("CDC_SWEEP_PPM", "0"))
+        self.samples = int(os.getenv("CDC_SWEEP_SAMPLES", "10000"))
+        self.settle_cycles = int(os.getenv("CDC_SWEEP_SETTLE", "20000"))
+        self.lock_timeout_us = float(os.getenv("CDC_SWEEP_LOCK_TIMEOUT_US", "2000"))
+
+        self.wall_start = time.perf_counter()
+        self.result = None
+
+    @staticmethod
+    def enabled():
+        return bool(os.getenv("CDC_SWEEP_DIR"))
+
+    @property
+    def skewed_output_period(self):
+        return self.output_period*(1+self.ppm*1e-6)
+
+    def finish(self, lock_time_ns, unlocks, stats):
+        wall_time = time.perf_counter() - self.wall_start
+
+        worst = None
+        if stats.n:
+            worst = max(abs(stats.min), abs(stats.max))
+
+        self.result = {
+            'test': os.getenv("PYTEST_CURRENT_TEST", "").rsplit(" ", 1)[0],
+            'simulator': cocotb.SIM_NAME,
+            'parameters': {k[6:]: v for k, v in sorted(os.environ.items()) if k.startswith("PARAM_")},
+            'ts_width': int(os.getenv("PARAM_TS_WIDTH", "0")),
+            'input_period_ns': self.input_period,
+            'output_period_ns': self.output_period,
+            'ppm': self.ppm,
+            'locked': lock_time_ns is not None,
+            'lock_time_ns': lock_time_ns,
+            'unlocks': unlocks,
+            'samples': stats.n,
+            'mean_ns': stats.mean if stats.n else None,
+            'stdev_ns': stats.stdev if stats.n > 1 else None,
+            'min_ns': stats.min,
+            'max_ns': stats.max,
+            'worst_ns': worst,
+            'histogram': stats.histogram(),
+            'sim_time_ns': get_sim_time('ns'),
+            'wall_time_s': wall_time,
+        }
+
+        if self.log:
+            self.log.info("Sweep point: input %g ns, output %g ns, %+g ppm", self.input_period,
+                self.output_period, self.ppm)
+            if lock_time_ns is None:
+                self.log.info("Did not lock within %g us", self.lock_timeout_us)
+            else:
+                self.log.info("Lock time: %.3f us (%d unlocks after lock)", lock_time_ns/1000, unlocks)
+            stats.log_summary(self.log)
+
+        self.write()
+
+        return self.result
+
+    def write(self):
+        out_dir = os.getenv("CDC_SWEEP_DIR")
+
+        if not out_dir or self.result is None:
+            return None
+
+        key = self.result['test']
+        path = os.path.join(out_dir, hashlib.sha1(key.encode()).hexdigest()[:16] + ".json")
+
+        os.makedirs(out_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.result, f, indent=2, sort_keys=True)
+
+        return path
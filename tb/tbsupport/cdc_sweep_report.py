@@ -0,0 +1,192 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# ptp_clock_cdc accuracy sweep report
+#
+# pytest plugin that enables the ptp_clock_cdc parameter sweep (the
+# cocotb-test functions marked with @pytest.mark.cdc_sweep, one pytest item
+# per sweep point, so the points fan out across pytest-xdist workers) and
+# collects the results written by tbsupport.cdc_sweep.
+#
+# Options:
+#   --cdc-sweep             run only the sweep points
+#   --cdc-sweep-dir DIR     directory for the per-point results (default:
+#                           .cdc_sweep in the pytest root directory)
+#   --cdc-sweep-report FILE
+#                           write the combined results as CSV
+#
+# Without --cdc-sweep, the sweep points are deselected.  --cdc-sweep cannot
+# be combined with --throughput, which only selects the benchmark tests, as
+# together they would deselect every test.
+#
+# At the end of the session, the worst-case error and the lock time are
+# summarized as tables of output clock period against ppm offset, one per
+# timestamp width and input clock period.
+
+import csv
+import glob
+import json
+import os
+import shutil
+
+import pytest
+
+
+_enabled = False
+_out_dir = None
+_report_file = None
+
+csv_fields = ['ts_width', 'input_period_ns', 'output_period_ns', 'ppm', 'locked', 'lock_time_ns',
+    'unlocks', 'samples', 'mean_ns', 'stdev_ns', 'min_ns', 'max_ns', 'worst_ns', 'wall_time_s', 'test']
+
+
+def _load_results():
+    results = []
+    for path in sorted(glob.glob(os.path.join(_out_dir, "*.json"))):
+        try:
+            with open(path) as f:
+                results.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+    results.sort(key=lambda r: (r['ts_width'], r['input_period_ns'], r['output_period_ns'], r['ppm']))
+    return results
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("cdc sweep", "ptp_clock_cdc accuracy sweep")
+    group.addoption("--cdc-sweep", action="store_true", dest="cdc_sweep", default=False,
+        help="run the ptp_clock_cdc parameter sweep")
+    group.addoption("--cdc-sweep-dir", action="store", dest="cdc_sweep_dir", default=None, metavar="DIR",
+        help="directory for per-point sweep results (default: <rootdir>/.cdc_sweep)")
+    group.addoption("--cdc-sweep-report", action="store", dest="cdc_sweep_report", default=None, metavar="FILE",
+        help="write combined sweep results as CSV")
+
+
+def pytest_configure(config):
+    global _enabled, _out_dir, _report_file
+
+    config.addinivalue_line("markers", "cdc_sweep: ptp_clock_cdc parameter sweep point")
+
+    if not config.getoption("cdc_sweep"):
+        return
+
+    if config.getoption("throughput", default=False):
+        raise pytest.UsageError("--cdc-sweep cannot be combined with --throughput")
+
+    out_dir = config.getoption("cdc_sweep_dir")
+    if not out_dir:
+        out_dir = os.path.join(str(config.rootpath), ".cdc_sweep")
+
+    _enabled = True
+    _out_dir = os.path.abspath(out_dir)
+    _report_file = config.getoption("cdc_sweep_report")
+
+    if not hasattr(config, 'workerinput'):
+        # controller (or no xdist); start from a clean result directory
+        shutil.rmtree(_out_dir, ignore_errors=True)
+        os.makedirs(_out_dir, exist_ok=True)
+
+    # picked up by the testbench through the simulator environment
+    os.environ["CDC_SWEEP_DIR"] = _out_dir
+
+
+def pytest_unconfigure(config):
+    global _enabled, _out_dir
+
+    if _out_dir is not None:
+        os.environ.pop("CDC_SWEEP_DIR", None)
+        _out_dir = None
+    _enabled = False
+
+
+def pytest_collection_modifyitems(config, items):
+    selected = []
+    deselected = []
+
+    for item in items:
+        if bool(item.get_closest_marker("cdc_sweep")) == _enabled:
+            selected.append(item)
+        else:
+            deselected.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+def pytest_sessionfinish(session):
+    if _out_dir is None or not _report_file or hasattr(session.config, 'workerinput'):
+        return
+
+    with open(_report_file, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=csv_fields, extrasaction='ignore')
+        w.writeheader()
+        w.writerows(_load_results())
+
+
+def _write_table(tw, title, results, fmt):
+    periods = sorted({r['output_period_ns'] for r in results})
+    ppms = sorted({r['ppm'] for r in results})
+    cells = {(r['output_period_ns'], r['ppm']): r for r in results}
+
+    tw.write_line(title)
+    tw.write_line(f"{'out ns':>8s} " + " ".join(f"{p:+9g}" for p in ppms) + "  ppm")
+
+    for period in periods:
+        cols = []
+        for ppm in ppms:
+            res = cells.get((period, ppm))
+            if res is None:
+                cols.append(f"{'':>9s}")
+            elif not res['locked']:
+                cols.append(f"{'no lock':>9s}")
+            else:
+                cols.append(fmt(res))
+        tw.write_line(f"{period:8g} " + " ".join(cols))
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _out_dir is None:
+        return
+
+    results = _load_results()
+
+    if not results:
+        return
+
+    tw = terminalreporter
+    tw.write_sep("-", "ptp_clock_cdc sweep")
+
+    groups = {}
+    for res in results:
+        groups.setdefault((res['ts_width'], res['input_period_ns']), []).append(res)
+
+    for (ts_width, input_period), group in sorted(groups.items()):
+        _write_table(tw, f"worst-case error (ns), {ts_width}-bit, input {input_period:g} ns", group,
+            lambda r: f"{r['worst_ns']:9.3f}" if r['worst_ns'] is not None else f"{'-':>9s}")
+        _write_table(tw, f"lock time (us), {ts_width}-bit, input {input_period:g} ns", group,
+            lambda r: f"{r['lock_time_ns']/1000:9.2f}")
+        tw.write_line("")
+
+    tw.write_line(f"results: {_out_dir}")
@@ -0,0 +1,186 @@
+"""
+
+Copyright (c) 2021-2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Inter-frame gap and deficit idle count (DIC) analyzer for XGMII/BASE-R
+#
+# IfgAnalyzer takes the frames received by an XGMII sink (cocotbext-eth
+# XgmiiSink or tbsupport BaseRSerdesSink) and reconstructs the byte
+# position of every start and terminate control character from the frame
+# start time, start lane, and length.  The gap before each frame counts the
+# terminate character and the idles that follow it, the same as the
+# transmit IFG setting.
+#
+# Frames must start on a 4-byte boundary.  Without DIC, every gap must be
+# at least the configured IFG.  With DIC, a gap may be shortened by up to
+# 3 bytes to align the next start, as long as the running deficit never
+# exceeds 3 bytes, so the average IFG never drops below the configured IFG.
+#
+# For back-to-back traffic the analyzer also computes the gap an ideal
+# transmitter would use (the shortest legal aligned gap) and counts the
+# gaps that are longer than that as stretched.  Only running counters are
+# kept, so the analyzer can follow arbitrarily long streams.
+
+from collections import Counter
+
+from cocotb.utils import get_sim_steps
+
+
+class IfgAnalyzer:
+
+    # number of violation messages kept for reporting
+    max_violation_log = 16
+
+    def __init__(self, sink, period, units='ns', ifg=12, enable_dic=True, log=None):
+        self.byte_lanes = sink.byte_lanes
+        self.period = get_sim_steps(period, units)
+        self.ifg = ifg
+        self.enable_dic = bool(enable_dic)
+        self.log = log or sink.log
+
+        self.max_deficit = 3 if self.enable_dic else 0
+
+        self.frames = 0
+        self.gaps = 0
+        self.ifg_total = 0
+        self.min_ifg = None
+        self.max_ifg = None
+        self.peak_deficit = 0
+        self.stretched = 0
+        self.start_lanes = Counter()
+        self.ifg_histogram = Counter()
+        self.violation_count = 0
+        self.violations = []
+
+        self.frame_bytes = 0
+        self.span_bytes = 0
+
+        self.restart()
+
+    def restart(self):
+        # start of a new burst; the next frame has no gap to check
+        self.t0 = None
+        self.last_end = None
+        self.last_len = None
+        self.deficit = 0
+
+    def _violation(self, msg):
+        self.violation_count += 1
+        if len(self.violations) < self.max_violation_log:
+            self.violations.append(msg)
+        self.log.warning("IFG violation: %s", msg)
+
+    def ideal_ifg(self, end):
+        # shortest legal gap after a terminate at byte position end
+        gap = max(self.ifg - (self.max_deficit - self.deficit), 1)
+        return gap + (-(end + gap) % 4)
+
+    def add_frame(self, frame):
+        if self.t0 is None:
+            self.t0 = frame.sim_time_start
+
+        cycle = round((frame.sim_time_start - self.t0) / self.period)
+        start = cycle*self.byte_lanes + frame.start_lane
+        length = len(frame.data)
+
+        self.frames += 1
+        self.start_lanes[frame.start_lane] += 1
+
+        if start % 4:
+            self._violation(f"frame {self.frames} starts in lane {frame.start_lane}")
+
+        if self.last_end is not None:
+            gap = start - self.last_end
+            ideal = self.ideal_ifg(self.last_end)
+
+            self.gaps += 1
+            self.ifg_total += gap
+            self.ifg_histogram[gap] += 1
+            self.min_ifg = gap if self.min_ifg is None else min(self.min_ifg, gap)
+            self.max_ifg = gap if self.max_ifg is None else max(self.max_ifg, gap)
+
+            self.frame_bytes += self.last_len + self.ifg
+            self.span_bytes += gap + self.last_len
+
+            if gap > ideal:
+                self.stretched += 1
+
+            self.deficit = max(self.deficit + self.ifg - gap, 0)
+            self.peak_deficit = max(self.peak_deficit, self.deficit)
+
+            if gap < self.ifg - self.max_deficit:
+                self._violation(f"frame {self.frames}: IFG {gap} below minimum {self.ifg - self.max_deficit}")
+            elif self.deficit > self.max_deficit:
+                self._violation(f"frame {self.frames}: IFG {gap} with deficit {self.deficit} "
+                    f"exceeds {'DIC limit' if self.enable_dic else 'IFG'}")
+
+        self.last_end = start + length
+        self.last_len = length
+
+    @property
+    def average_ifg(self):
+        if not self.gaps:
+            return None
+        return self.ifg_total / self.gaps
+
+    @property
+    def utilization(self):
+        if not self.span_bytes:
+            return None
+        return self.frame_bytes / self.span_bytes
+
+    def summary(self):
+        return {
+            'frames': self.frames,
+            'gaps': self.gaps,
+            'ifg': self.ifg,
+            'enable_dic': self.enable_dic,
+            'min_ifg': self.min_ifg,
+            'max_ifg': self.max_ifg,
+            'average_ifg': self.average_ifg,
+            'peak_deficit': self.peak_deficit,
+            'stretched': self.stretched,
+            'utilization': self.utilization,
+            'start_lanes': dict(sorted(self.start_lanes.items())),
+            'ifg_histogram': dict(sorted(self.ifg_histogram.items())),
+            'violation_count': self.violation_count,
+            'violations': list(self.violations),
+        }
+
+    def log_summary(self):
+        self.log.info("IFG: %d frames, min %s, max %s, average %s, peak deficit %d, %d stretched",
+            self.frames, self.min_ifg, self.max_ifg,
+            f"{self.average_ifg:.3f}" if self.gaps else None, self.peak_deficit, self.stretched)
+        self.log.info("IFG histogram: %s", dict(sorted(self.ifg_histogram.items())))
+        self.log.info("Start lanes: %s", dict(sorted(self.start_lanes.items())))
+        if self.span_bytes:
+            self.log.info("Utilization: %.2f%%", self.utilization*100)
+
+    def check(self, strict=False):
+        # strict: back-to-back traffic, every gap must be the shortest legal gap
+        assert not self.violation_count, \
+            f"{self.violation_count} IFG violations: {'; '.join(self.violations)}"
+        assert not self.gaps or self.ifg_total >= self.ifg*self.gaps - self.max_deficit, \
+            f"average IFG {self.average_ifg:.3f} below {self.ifg}"
+        if strict:
+            assert not self.stretched, f"{self.stretched} of {self.gaps} gaps longer than necessary"
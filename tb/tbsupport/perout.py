@@ -0,0 +1,247 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Pulse output checker for ptp_perout
+#
+# PeroutChecker follows the pulse output through edge triggers only: on
+# each output edge it reads the 96-bit ToD timestamp in the ReadOnly phase
+# of the same time step, and compares it with the edge time computed from
+# the loaded start, period and width (rise k at start + k*period, fall k
+# at start + k*period + width).  The offset of each edge from its ideal
+# time is accumulated as an edge-placement error in ns; edges outside the
+# latency window are counted as misplaced.  Skipped rising edges are
+# counted as missed pulses, and rising edges that do not advance the pulse
+# index, or falling edges without a matching rise, as extra pulses.
+#
+# After configure() (and at start), the checker waits for the first rising
+# edge that matches the new configuration and records the acquisition time,
+# since ptp_perout fast-forwards through edges that are already in the past
+# and pulses in flight may be cut short by the restart.  The PTP time
+# between edges is extrapolated from the last timestamp read at ts_rate PTP
+# ns per simulated ns, so check() also counts rising edges that are overdue
+# when it is called.
+#
+# Times are kept as integer fractional ns (ns * 2**16), as in the ptp_perout
+# registers.
+
+import cocotb
+from cocotb.triggers import Edge, ReadOnly
+from cocotb.utils import get_sim_time
+
+from .ts_compare import ErrorStats
+
+
+def tod_to_fns(ts):
+    # 96-bit ToD (48-bit s, 32-bit ns, 16-bit fns) to fractional ns
+    return ((ts >> 48)*1000000000 << 16) + (ts & 0xffffffffffff)
+
+
+class PeroutChecker:
+
+    # number of violation messages kept for reporting
+    max_violation_log = 16
+
+    def __init__(self, pulse, ts, latency_ns=(0, 20), ts_rate=1.0, log=None):
+        self.pulse = pulse
+        self.ts = ts
+        self.latency_min = round(latency_ns[0]*2**16)
+        self.latency_max = round(latency_ns[1]*2**16)
+        self.latency_mid = (self.latency_min+self.latency_max)//2
+        self.ts_rate = ts_rate
+        self.log = log
+
+        self.start_fns = None
+        self.period_fns = None
+        self.width_fns = None
+
+        self.rises = 0
+        self.falls = 0
+        self.missed = 0
+        self.extra = 0
+        self.misplaced = 0
+        self.ignored = 0
+        self.rise_error = ErrorStats(bin_width=1.0)
+        self.fall_error = ErrorStats(bin_width=1.0)
+        self.acquisitions = []
+        self.violation_count = 0
+        self.violations = []
+
+        self.anchor = None
+        self.acquiring = True
+        self.config_ts = None
+        self.last_rise = None
+        self.last_fall = None
+
+        self._run_cr = None
+
+    def _violation(self, msg):
+        self.violation_count += 1
+        if len(self.violations) < self.max_violation_log:
+            self.violations.append(msg)
+        if self.log:
+            self.log.warning("perout: %s", msg)
+
+    def configure(self, start, period, width):
+        # start, period and width as loaded into ptp_perout (96-bit ToD format)
+        self.start_fns = tod_to_fns(start)
+        self.period_fns = tod_to_fns(period)
+        self.width_fns = tod_to_fns(width)
+
+        self.acquiring = True
+        self.config_ts = self.ts_now()
+        self.last_rise = None
+        self.last_fall = None
+
+    def start(self):
+        if self._run_cr is None:
+            self._run_cr = cocotb.start_soon(self._run())
+
+    def stop(self):
+        if self._run_cr is not None:
+            self._run_cr.kill()
+            self._run_cr = None
+
+    def ts_now(self):
+        # current PTP time (fns), extrapolated from the last timestamp read
+        if self.anchor is None:
+            return None
+        t, ts = self.anchor
+        return ts + round((get_sim_time('ns') - t)*self.ts_rate*2**16)
+
+    async def _sample(self):
+        await ReadOnly()
+        ts = tod_to_fns(self.ts.value.integer)
+        self.anchor = (get_sim_time('ns'), ts)
+        return ts
+
+    async def _run(self):
+        await self._sample()
+        if self.config_ts is None:
+            self.config_ts = self.anchor[1]
+
+        while True:
+            await Edge(self.pulse)
+            level = self.pulse.value.integer
+            ts = await self._sample()
+            if self.start_fns is None:
+                continue
+            if level:
+                self._rise(ts)
+            else:
+                self._fall(ts)
+
+    def _index(self, ts, offset):
+        k = (ts - self.latency_mid - self.start_fns - offset + self.period_fns//2) // self.period_fns
+        return k, ts - (self.start_fns + k*self.period_fns + offset)
+
+    def _in_window(self, err):
+        return self.latency_min <= err <= self.latency_max
+
+    def _rise(self, ts):
+        k, err = self._index(ts, 0)
+
+        if self.acquiring:
+            if not self._in_window(err):
+                # edge from before the restart took effect
+                self.ignored += 1
+                return
+            self.acquiring = False
+            self.acquisitions.append((ts - self.config_ts)/2**16 if self.config_ts is not None else None)
+        else:
+            if k <= self.last_rise:
+                self.extra += 1
+                self._violation(f"extra pulse at {ts/2**16:.3f} ns (index {k}, last {self.last_rise})")
+            elif k > self.last_rise+1:
+                self.missed += k-self.last_rise-1
+                self._violation(f"{k-self.last_rise-1} missed pulses before {ts/2**16:.3f} ns")
+
+        self.rises += 1
+        self.last_rise = k
+        self.rise_error.add(err/2**16)
+
+        if not self._in_window(err):
+            self.misplaced += 1
+            self._violation(f"rising edge at {ts/2**16:.3f} ns off by {err/2**16:.3f} ns")
+
+    def _fall(self, ts):
+        if self.acquiring or self.last_rise is None or self.last_fall == self.last_rise:
+            if self.acquiring:
+                # pulse cut short by a restart
+                self.ignored += 1
+            else:
+                self.extra += 1
+                self._violation(f"falling edge without pulse at {ts/2**16:.3f} ns")
+            return
+
+        k = self.last_rise
+        err = ts - (self.start_fns + k*self.period_fns + self.width_fns)
+
+        self.falls += 1
+        self.last_fall = k
+        self.fall_error.add(err/2**16)
+
+        if not self._in_window(err):
+            self.misplaced += 1
+            self._violation(f"falling edge at {ts/2**16:.3f} ns off by {err/2**16:.3f} ns")
+
+    def overdue(self):
+        # rising edges that should have been seen by now
+        ts = self.ts_now()
+        if ts is None or self.start_fns is None or self.acquiring:
+            return 0
+        k = (ts - self.latency_max - self.start_fns) // self.period_fns
+        return max(0, k - self.last_rise)
+
+    def summary(self):
+        return {
+            'rises': self.rises,
+            'falls': self.falls,
+            'missed': self.missed,
+            'extra': self.extra,
+            'misplaced': self.misplaced,
+            'ignored': self.ignored,
+            'overdue': self.overdue(),
+            'rise_error': self.rise_error.summary(),
+            'fall_error': self.fall_error.summary(),
+            'acquisitions_ns': list(self.acquisitions),
+            'violation_count': self.violation_count,
+            'violations': list(self.violations),
+        }
+
+    def log_summary(self):
+        if not self.log:
+            return
+        self.log.info("perout: %d pulses, %d missed, %d extra, %d misplaced, %d ignored during acquisition",
+            self.rises, self.missed, self.extra, self.misplaced, self.ignored)
+        self.rise_error.log_summary(self.log, "Rising edge error")
+        self.fall_error.log_summary(self.log, "Falling edge error")
+        self.log.info("Acquisition times: %s ns", self.acquisitions)
+
+    def check(self, min_pulses=1):
+        overdue = self.overdue()
+        assert not self.acquiring, "no pulse since last configuration"
+        assert not self.violation_count, \
+            f"{self.violation_count} pulse output violations: {'; '.join(self.violations)}"
+        assert not overdue, f"{overdue} pulses overdue"
+        assert self.rises >= min_pulses, f"{self.rises} pulses, expected at least {min_pulses}"
@@ -0,0 +1,188 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# PTP timestamp auditor for the MAC RX and TX timestamping paths
+#
+# PtpTsAuditor pairs the SFD time of each frame seen by the testbench with
+# the PTP timestamp the MAC reported for it.  Frames and timestamps are
+# matched by tag (the transmit timestamp tag on the TX side, the frame
+# index on the RX side), so the frame list and the timestamp stream can be
+# collected independently and in any order.  For each pair, the error is
+# the timestamp-to-SFD latency minus the expected latency: timestamp minus
+# SFD time for RX (the MAC stamps the frame after the PHY sees it), SFD
+# time minus timestamp for TX (the MAC stamps the frame before it reaches
+# the PHY).  Errors are kept in an array('d'), in match order, and are also
+# fed to an ErrorStats for the summary and histogram.
+#
+# Frames that start in lane 4 of a 64-bit XGMII interface report a full
+# cycle of delay, so half a clock period is subtracted from their SFD time.
+#
+# Per-frame logging is off by default; pass verbose=True or set the
+# PTP_TS_LOG environment variable to 1 to log every pair.
+
+import os
+from array import array
+
+from cocotb.utils import get_time_from_sim_steps
+
+from .ts_compare import ErrorStats
+
+
+class PtpTsAuditor:
+
+    # number of unmatched tags kept for reporting
+    max_unmatched_log = 16
+
+    def __init__(self, clk_period, offset_ns, tolerance_ns=0.01, direction='rx',
+            tag_width=16, bin_width=0.1, log=None, verbose=None):
+        if direction not in ('rx', 'tx'):
+            raise ValueError(f"direction must be 'rx' or 'tx', not {direction!r}")
+
+        self.clk_period = clk_period
+        self.offset_ns = offset_ns
+        self.tolerance_ns = tolerance_ns
+        self.direction = direction
+        self.tag_mask = 2**tag_width-1
+        self.log = log
+
+        if verbose is None:
+            verbose = bool(int(os.getenv("PTP_TS_LOG", "0")))
+        self.verbose = verbose
+
+        self.stats = ErrorStats(bin_width)
+        self.reset()
+
+    def reset(self):
+        self.errors = array('d')
+        self.tags = []
+        self.frames = {}
+        self.timestamps = {}
+        self.stats.reset()
+
+    def sfd_time_ns(self, frame):
+        sfd_ns = get_time_from_sim_steps(frame.sim_time_sfd, "ns")
+
+        if getattr(frame, 'start_lane', 0) == 4:
+            # start in lane 4 reports 1 full cycle delay, so subtract half clock period
+            sfd_ns -= self.clk_period/2
+
+        return sfd_ns
+
+    def add_frame(self, tag, frame):
+        tag = int(tag) & self.tag_mask
+        sfd_ns = self.sfd_time_ns(frame)
+
+        pending = self.timestamps.get(tag)
+        if pending:
+            self._compare(tag, sfd_ns, pending.pop(0))
+        else:
+            self.frames.setdefault(tag, []).append(sfd_ns)
+
+    def add_frames(self, frames, first_tag=0):
+        for k, frame in enumerate(frames):
+            self.add_frame(first_tag+k, frame)
+
+    def add_ts(self, tag, ts):
+        # ts in fractional ns (ns * 2**16, sim time is well under 1 s so the
+        # seconds field of a ToD timestamp is zero)
+        tag = int(tag) & self.tag_mask
+        ts_ns = int(ts) / 2**16
+
+        pending = self.frames.get(tag)
+        if pending:
+            self._compare(tag, pending.pop(0), ts_ns)
+        else:
+            self.timestamps.setdefault(tag, []).append(ts_ns)
+
+    def _compare(self, tag, sfd_ns, ts_ns):
+        if self.direction == 'rx':
+            err = ts_ns - sfd_ns - self.offset_ns
+        else:
+            err = sfd_ns - ts_ns - self.offset_ns
+
+        self.errors.append(err)
+        self.tags.append(tag)
+        self.stats.add(err)
+
+        if self.verbose and self.log:
+            if self.direction == 'rx':
+                self.log.info("RX frame %d PTP TS: %f ns", tag, ts_ns)
+                self.log.info("TX frame %d SFD sim time: %f ns", tag, sfd_ns)
+            else:
+                self.log.info("TX frame %d PTP TS: %f ns", tag, ts_ns)
+                self.log.info("RX frame %d SFD sim time: %f ns", tag, sfd_ns)
+            self.log.info("Difference: %f ns (error %f ns)", abs(ts_ns - sfd_ns), err)
+
+    def unmatched_frames(self):
+        return sorted(tag for tag, v in self.frames.items() for sfd_ns in v)
+
+    def unmatched_timestamps(self):
+        return sorted(tag for tag, v in self.timestamps.items() for ts_ns in v)
+
+    @property
+    def matched(self):
+        return len(self.errors)
+
+    def outliers(self):
+        # (tag, error) of every pair outside the tolerance
+        return [(tag, err) for tag, err in zip(self.tags, self.errors) if abs(err) >= self.tolerance_ns]
+
+    def summary(self):
+        res = self.stats.summary()
+        res.update({
+            'direction': self.direction,
+            'offset_ns': self.offset_ns,
+            'tolerance_ns': self.tolerance_ns,
+            'matched': self.matched,
+            'unmatched_frames': len(self.unmatched_frames()),
+            'unmatched_timestamps': len(self.unmatched_timestamps()),
+            'outliers': len(self.outliers()),
+        })
+        return res
+
+    def log_summary(self, histogram=False):
+        if not self.log:
+            return
+        res = self.summary()
+        self.log.info("%s PTP TS: %d matched, %d unmatched frames, %d unmatched timestamps, %d outliers",
+            self.direction.upper(), res['matched'], res['unmatched_frames'],
+            res['unmatched_timestamps'], res['outliers'])
+        self.stats.log_summary(self.log, name=f"{self.direction.upper()} PTP TS error")
+        if histogram:
+            self.stats.log_histogram(self.log)
+
+    def check(self, min_samples=1):
+        frames = self.unmatched_frames()
+        timestamps = self.unmatched_timestamps()
+        outliers = self.outliers()
+
+        assert not frames, \
+            f"{len(frames)} frames without timestamp, tags {frames[:self.max_unmatched_log]}"
+        assert not timestamps, \
+            f"{len(timestamps)} timestamps without frame, tags {timestamps[:self.max_unmatched_log]}"
+        assert self.matched >= min_samples, f"{self.matched} timestamps, expected at least {min_samples}"
+        assert not outliers, \
+            f"{len(outliers)} of {self.matched} timestamps off by {self.tolerance_ns} ns or more " \
+            f"(min {self.stats.min:.4f} ns, max {self.stats.max:.4f} ns), " \
+            f"first: {', '.join(f'tag {t}: {e:.4f} ns' for t, e in outliers[:self.max_unmatched_log])}"
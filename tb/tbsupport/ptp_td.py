@@ -0,0 +1,902 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+from decimal import Decimal, Context
+from fractions import Fraction
+
+import cocotb
+from cocotb.triggers import RisingEdge, Edge, Timer, Event
+from cocotb.utils import get_sim_time, get_sim_steps
+
+from cocotbext.eth.reset import Reset
+
+
+def td_advance(ts, period, n):
+    # advance timestamp state by n clock cycles, bit-exact with the
+    # per-cycle update.  ts is (tod_s, tod_ns, rel_ns, fns, drift_cnt),
+    # period is (period_ns, period_fns, drift_num, drift_denom).
+    # Returns the new state and the number of seconds rollovers.
+    tod_s, tod_ns, rel_ns, fns, drift_cnt = ts
+    period_ns, period_fns, drift_num, drift_denom = period
+
+    fns += n*((period_ns << 32) + period_fns)
+
+    if drift_denom:
+        # drift is added on the cycle where drift_cnt is zero, then every drift_denom cycles
+        if n > drift_cnt:
+            fns += (1 + (n-1-drift_cnt)//drift_denom)*drift_num
+            drift_cnt = (drift_cnt-n) % drift_denom
+        else:
+            drift_cnt -= n
+
+    ns_inc = fns >> 32
+    fns &= 0xffffffff
+
+    rel_ns = (rel_ns + ns_inc) & 0xffffffffffff
+
+    # at most one rollover per cycle
+    tod_ns += ns_inc
+    rollovers = max(0, min(n, tod_ns // 1000000000))
+    tod_s += rollovers
+    tod_ns -= rollovers*1000000000
+
+    return (tod_s, tod_ns, rel_ns, fns, drift_cnt), rollovers
+
+
+class PtpTdFastForward:
+    # Fast-forward mode for the PTP time distribution models
+    #
+    # Instead of running the per-cycle update on every clock edge, the clock
+    # cycle count is derived from the simulation time (the clock period must
+    # be fixed), and the timestamp state is advanced in closed form when it
+    # is accessed and on message and serial data events.  Clock edges in the
+    # current time step are not counted; this matches the cycle-accurate model
+    # as seen from coroutines that resume on the same clock edge ahead of it.
+
+    def _ff_init(self, fast_forward, clock_period_ns):
+        self.fast_forward = bool(fast_forward)
+        self.clock_period_ns = clock_period_ns
+        self._ff_period = None
+        # clock cycles applied to the timestamp state
+        self._ff_cycle = 0
+        # sim time of clock cycle _ff_c0 (None when not running)
+        self._ff_t0 = None
+        self._ff_c0 = 0
+
+    def _ff_start(self):
+        # on the first clock edge after reset release
+        if self._ff_period is None:
+            self._ff_period = get_sim_steps(self.clock_period_ns, 'ns')
+        self._ff_t0 = get_sim_time()
+        self._ff_c0 = self._ff_cycle+1
+
+    def _ff_stop(self):
+        if self._ff_t0 is not None:
+            self._ff_sync()
+            self._ff_t0 = None
+
+    def _ff_cycles(self):
+        if self._ff_t0 is None:
+            return self._ff_cycle
+        return self._ff_c0 + (get_sim_time() - self._ff_t0 - 1) // self._ff_period
+
+    async def _ff_wait(self, cycle):
+        # wait until between clock edges cycle and cycle+1
+        t = self._ff_t0 + (cycle-self._ff_c0)*self._ff_period + self._ff_period//2 - get_sim_time()
+        if t > 0:
+            await Timer(t, 'step')
+
+    def _ff_advance(self, cycle):
+        n = cycle - self._ff_cycle
+        if n <= 0:
+            return
+
+        self._ff_cycle = cycle
+
+        ts = (self.ts_tod_s, self.ts_tod_ns, self.ts_rel_ns, self.ts_fns, self.drift_cnt)
+        period = (self.period_ns, self.period_fns, self.drift_num, self.drift_denom)
+        ts, rollovers = td_advance(ts, period, n)
+        self.ts_tod_s, self.ts_tod_ns, self.ts_rel_ns, self.ts_fns, self.drift_cnt = ts
+
+        for k in range(rollovers):
+            self.log.info("Seconds rollover")
+        if rollovers:
+            self.pps.set()
+
+    def _ff_sync(self):
+        if self.fast_forward:
+            self._ff_advance(self._ff_cycles())
+
+
+class PtpTdSource(PtpTdFastForward, Reset):
+    def __init__(self,
+            data=None,
+            clock=None,
+            reset=None,
+            reset_active_level=True,
+            period_ns=6.4,
+            td_delay=32,
+            fast_forward=False,
+            clock_period_ns=None,
+            *args, **kwargs):
+
+        self.log = logging.getLogger(f"cocotb.{data._path}")
+        self.data = data
+        self.clock = clock
+        self.reset = reset
+        self.fast_forward = False
+
+        self.log.info("PTP time distribution source")
+        self.log.info("Copyright (c) 2023 Alex Forencich")
+        self.log.info("https://github.com/alexforencich/verilog-ethernet")
+
+        super().__init__(*args, **kwargs)
+
+        self.ctx = Context(prec=60)
+
+        self.period_ns = 0
+        self.period_fns = 0
+        self.drift_num = 0
+        self.drift_denom = 0
+        self.drift_cnt = 0
+        self.set_period_ns(period_ns)
+
+        self.ts_fns = 0
+
+        self.ts_rel_ns = 0
+        self.ts_rel_updated = False
+
+        self.ts_tod_s = 0
+        self.ts_tod_ns = 0
+        self.ts_tod_updated = False
+
+        self.ts_tod_offset_ns = 0
+
+        self.ts_tod_alt_s = 0
+        self.ts_tod_alt_offset_ns = 0
+
+        self.td_delay = td_delay
+
+        # timestamp delay line (ring buffer, oldest entry at timestamp_delay_ptr)
+        self.timestamp_delay = [(0, 0, 0, 0)]*(14*17+self.td_delay)
+        self.timestamp_delay_ptr = 0
+
+        self.data.setimmediatevalue(1)
+
+        self.pps = Event()
+
+        self._run_cr = None
+
+        self._ff_init(fast_forward, period_ns if clock_period_ns is None else clock_period_ns)
+        # state anchors for the delayed timestamps: (cycle, ts, period)
+        self._ff_hist = []
+        self._ff_mark()
+
+        self._init_reset(reset, reset_active_level)
+
+    def set_period(self, ns, fns):
+        self._ff_sync()
+        self.period_ns = int(ns)
+        self.period_fns = int(fns) & 0xffffffff
+        self._ff_mark()
+
+    def set_drift(self, num, denom):
+        self._ff_sync()
+        self.drift_num = int(num)
+        self.drift_denom = int(denom)
+        self._ff_mark()
+
+    def set_period_ns(self, t):
+        t = Decimal(t)
+        period, drift = self.ctx.divmod(Decimal(t) * Decimal(2**32), Decimal(1))
+        period = int(period)
+        frac = Fraction(drift).limit_denominator(2**16-1)
+        self.set_period(period >> 32, period & 0xffffffff)
+        self.set_drift(frac.numerator, frac.denominator)
+
+        self.log.info("Set period: %s ns", t)
+        self.log.info("Period: 0x%x ns 0x%08x fns", self.period_ns, self.period_fns)
+        self.log.info("Drift: 0x%04x / 0x%04x fns", self.drift_num, self.drift_denom)
+
+    def get_period_ns(self):
+        p = Decimal((self.period_ns << 32) | self.period_fns)
+        if self.drift_denom:
+            p += Decimal(self.drift_num) / Decimal(self.drift_denom)
+        return p / Decimal(2**32)
+
+    def set_ts_tod(self, ts_s, ts_ns, ts_fns):
+        self._ff_sync()
+        self.ts_tod_s = int(ts_s)
+        self.ts_tod_ns = int(ts_ns)
+        self.ts_fns = int(ts_fns)
+        self.ts_tod_updated = True
+        self._ff_mark()
+
+    def set_ts_tod_64(self, ts):
+        ts = int(ts)
+        self.set_ts_tod(ts >> 48, (ts >> 32) & 0x3fffffff, (ts & 0xffff) << 16)
+
+    def set_ts_tod_ns(self, t):
+        ts_s, ts_ns = self.ctx.divmod(Decimal(t), Decimal(1000000000))
+        ts_ns, ts_fns = self.ctx.divmod(ts_ns, Decimal(1))
+        ts_ns = ts_ns.to_integral_value()
+        ts_fns = (ts_fns * Decimal(2**32)).to_integral_value()
+        self.set_ts_tod(ts_s, ts_ns, ts_fns)
+
+    def set_ts_tod_s(self, t):
+        self.set_ts_tod_ns(Decimal(t).scaleb(9, self.ctx))
+
+    def set_ts_tod_sim_time(self):
+        self.set_ts_tod_ns(Decimal(get_sim_time('fs')).scaleb(-6))
+
+    def get_ts_tod(self):
+        ts_tod_s, ts_tod_ns, ts_rel_ns, ts_fns = self._get_ts_delayed()
+        return (ts_tod_s, ts_tod_ns, ts_fns)
+
+    def get_ts_tod_96(self):
+        ts_tod_s, ts_tod_ns, ts_fns = self.get_ts_tod()
+        return (ts_tod_s << 48) | (ts_tod_ns << 16) | (ts_fns >> 16)
+
+    def get_ts_tod_ns(self):
+        ts_tod_s, ts_tod_ns, ts_fns = self.get_ts_tod()
+        ns = Decimal(ts_fns) / Decimal(2**32)
+        ns = self.ctx.add(ns, Decimal(ts_tod_ns))
+        return self.ctx.add(ns, Decimal(ts_tod_s).scaleb(9))
+
+    def get_ts_tod_s(self):
+        return self.get_ts_tod_ns().scaleb(-9, self.ctx)
+
+    def set_ts_rel(self, ts_ns, ts_fns):
+        self._ff_sync()
+        self.ts_rel_ns = int(ts_ns)
+        self.ts_fns = int(ts_fns)
+        self.ts_rel_updated = True
+        self._ff_mark()
+
+    def set_ts_rel_64(self, ts):
+        ts = int(ts)
+        self.set_ts_rel(ts >> 16, (ts & 0xffff) << 16)
+
+    def set_ts_rel_ns(self, t):
+        ts_ns, ts_fns = self.ctx.divmod(Decimal(t), Decimal(1))
+        ts_ns = ts_ns.to_integral_value()
+        ts_fns = (ts_fns * Decimal(2**32)).to_integral_value()
+        self.set_ts_rel(ts_ns, ts_fns)
+
+    def set_ts_rel_s(self, t):
+        self.set_ts_rel_ns(Decimal(t).scaleb(9, self.ctx))
+
+    def set_ts_rel_sim_time(self):
+        self.set_ts_rel_ns(Decimal(get_sim_time('fs')).scaleb(-6))
+
+    def get_ts_rel(self):
+        ts_tod_s, ts_tod_ns, ts_rel_ns, ts_fns = self._get_ts_delayed()
+        return (ts_rel_ns, ts_fns)
+
+    def get_ts_rel_64(self):
+        ts_rel_ns, ts_fns = self.get_ts_rel()
+        return (ts_rel_ns << 16) | (ts_fns >> 16)
+
+    def get_ts_rel_ns(self):
+        ts_rel_ns, ts_fns = self.get_ts_rel()
+        return self.ctx.add(Decimal(ts_fns) / Decimal(2**32), Decimal(ts_rel_ns))
+
+    def get_ts_rel_s(self):
+        return self.get_ts_rel_ns().scaleb(-9, self.ctx)
+
+    def _get_ts_delayed(self):
+        if not self.fast_forward:
+            return self.timestamp_delay[self.timestamp_delay_ptr]
+
+        # state from before the oldest cycle in the delay line
+        cycle = self._ff_cycles() - (14*17+self.td_delay)
+
+        if cycle < 0:
+            return (0, 0, 0, 0)
+
+        hist = self._ff_hist
+        while len(hist) > 1 and hist[1][0] <= cycle:
+            hist.pop(0)
+
+        for anchor, ts, period in reversed(hist):
+            if anchor <= cycle:
+                break
+        ts, rollovers = td_advance(ts, period, cycle-anchor)
+        return ts[:4]
+
+    def _ff_mark(self):
+        # record current state for the delayed timestamps
+        if self.fast_forward:
+            self._ff_hist.append((self._ff_cycle,
+                (self.ts_tod_s, self.ts_tod_ns, self.ts_rel_ns, self.ts_fns, self.drift_cnt),
+                (self.period_ns, self.period_fns, self.drift_num, self.drift_denom)))
+
+    def _update_offsets(self):
+        # compute offset for current second
+        self.ts_tod_offset_ns = (self.ts_tod_ns - self.ts_rel_ns) & 0xffffffff
+
+        # compute alternate offset
+        if self.ts_tod_ns >> 27 == 7:
+            # latter portion of second; compute offset for next second
+            self.ts_tod_alt_s = self.ts_tod_s+1
+            self.ts_tod_alt_offset_ns = (self.ts_tod_offset_ns - 1000000000) & 0xffffffff
+        else:
+            # former portion of second; compute offset for previous second
+            self.ts_tod_alt_s = self.ts_tod_s-1
+            self.ts_tod_alt_offset_ns = (self.ts_tod_offset_ns + 1000000000) & 0xffffffff
+
+    def _build_msg(self, msg_index):
+        msg = []
+
+        # word 0: control
+        ctrl = 0
+        ctrl |= msg_index & 0xf
+        ctrl |= bool(self.ts_rel_updated) << 8
+        ctrl |= bool(self.ts_tod_s & 1) << 9
+        self.ts_rel_updated = False
+        msg.append(ctrl)
+
+        if msg_index == 0:
+            # msg 0 word 1: current ToD TS ns 15:0
+            msg.append(self.ts_tod_ns & 0xffff)
+            # msg 0 word 2: current ToD TS ns 29:16 and flag bit
+            msg.append(((self.ts_tod_ns >> 16) & 0x3fff) | (0x8000 if self.ts_tod_updated else 0))
+            self.ts_tod_updated = False
+            # msg 0 word 3: current ToD TS seconds 15:0
+            msg.append(self.ts_tod_s & 0xffff)
+            # msg 0 word 4: current ToD TS seconds 31:16
+            msg.append((self.ts_tod_s >> 16) & 0xffff)
+            # msg 0 word 5: current ToD TS seconds 47:32
+            msg.append((self.ts_tod_s >> 32) & 0xffff)
+            msg_index = 1
+        elif msg_index == 1:
+            # msg 1 word 1: current ToD TS ns offset 15:0
+            msg.append(self.ts_tod_offset_ns & 0xffff)
+            # msg 1 word 2: current ToD TS ns offset 31:16
+            msg.append((self.ts_tod_offset_ns >> 16) & 0xffff)
+            # msg 1 word 3: drift num
+            msg.append(self.drift_num)
+            # msg 1 word 4: drift denom
+            msg.append(self.drift_denom)
+            # msg 1 word 5: drift state
+            msg.append(self.drift_cnt)
+            msg_index = 2
+        elif msg_index == 2:
+            # msg 2 word 1: alternate ToD TS ns offset 15:0
+            msg.append(self.ts_tod_alt_offset_ns & 0xffff)
+            # msg 2 word 2: alternate ToD TS ns offset 31:16
+            msg.append((self.ts_tod_alt_offset_ns >> 16) & 0xffff)
+            # msg 2 word 3: alternate ToD TS seconds 15:0
+            msg.append(self.ts_tod_alt_s & 0xffff)
+            # msg 2 word 4: alternate ToD TS seconds 31:16
+            msg.append((self.ts_tod_alt_s >> 16) & 0xffff)
+            # msg 2 word 5: alternate ToD TS seconds 47:32
+            msg.append((self.ts_tod_alt_s >> 32) & 0xffff)
+            msg_index = 0
+
+        # word 6: current fns 15:0
+        msg.append(self.ts_fns & 0xffff)
+        # word 7: current fns 31:16
+        msg.append((self.ts_fns >> 16) & 0xffff)
+        # word 8: current relative TS ns 15:0
+        msg.append(self.ts_rel_ns & 0xffff)
+        # word 9: current relative TS ns 31:16
+        msg.append((self.ts_rel_ns >> 16) & 0xffff)
+        # word 10: current relative TS ns 47:32
+        msg.append((self.ts_rel_ns >> 32) & 0xffff)
+        # word 11: current phase increment fns 15:0
+        msg.append(self.period_fns & 0xffff)
+        # word 12: current phase increment fns 31:16
+        msg.append((self.period_fns >> 16) & 0xffff)
+        # word 13: current phase increment ns 7:0 + crc
+        msg.append(self.period_ns & 0xff)
+
+        # serialize message: start bit (0), then 16 data bits, LSB first
+        bits = bytes(b for w in msg for b in (0, *((w >> k) & 1 for k in range(16))))
+
+        return msg, bits, msg_index
+
+    def _resize_timestamp_delay(self):
+        # td_delay changed; keep the newest entries, and pad with the oldest
+        # entry so that it remains visible for the additional cycles
+        n = 14*17+self.td_delay
+        ptr = self.timestamp_delay_ptr
+        entries = self.timestamp_delay[ptr:] + self.timestamp_delay[:ptr]
+        if n > len(entries):
+            entries = [entries[0]]*(n-len(entries)) + entries
+        else:
+            entries = entries[len(entries)-n:]
+        self.timestamp_delay = entries
+        self.timestamp_delay_ptr = 0
+
+    def _handle_reset(self, state):
+        if state:
+            self.log.info("Reset asserted")
+            if self._run_cr is not None:
+                self._run_cr.kill()
+                self._run_cr = None
+            self._ff_stop()
+
+            self.ts_tod_s = 0
+            self.ts_tod_ns = 0
+            self.ts_rel_ns = 0
+            self.ts_fns = 0
+            self.drift_cnt = 0
+            self._ff_mark()
+
+            self.data.value = 1
+        else:
+            self.log.info("Reset de-asserted")
+            if self._run_cr is None:
+                if self.fast_forward:
+                    self._run_cr = cocotb.start_soon(self._run_fast())
+                else:
+                    self._run_cr = cocotb.start_soon(self._run())
+
+    async def _run_fast(self):
+        clock_edge_event = RisingEdge(self.clock)
+        msg_index = 0
+        data = None
+
+        await clock_edge_event
+        self._ff_start()
+        msg_cycle = self._ff_c0
+
+        while True:
+            # build message
+            self._ff_advance(msg_cycle)
+            self._update_offsets()
+            msg, bits, msg_index = self._build_msg(msg_index)
+
+            # drive serial data, waking only when the bit changes
+            for k, bit in enumerate(bits+b'\x01'):
+                if bit != data:
+                    await self._ff_wait(msg_cycle+k)
+                    self.data.value = bit
+                    data = bit
+
+            # next message on a clock edge, same as the cycle-accurate model
+            msg_cycle += 256
+            await self._ff_wait(msg_cycle-1)
+            await clock_edge_event
+
+    async def _run(self):
+        clock_edge_event = RisingEdge(self.clock)
+        msg_index = 0
+        msg_delay = 0
+        bits = ()
+        bit_ptr = 0
+        data = None
+
+        while True:
+            await clock_edge_event
+
+            # delay timestamp
+            if len(self.timestamp_delay) != 14*17+self.td_delay:
+                self._resize_timestamp_delay()
+            ptr = self.timestamp_delay_ptr
+            self.timestamp_delay[ptr] = (self.ts_tod_s, self.ts_tod_ns, self.ts_rel_ns, self.ts_fns)
+            ptr += 1
+            if ptr >= len(self.timestamp_delay):
+                ptr = 0
+            self.timestamp_delay_ptr = ptr
+
+            # increment fns portion
+            self.ts_fns += ((self.period_ns << 32) + self.period_fns)
+
+            if self.drift_denom:
+                if self.drift_cnt > 0:
+                    self.drift_cnt -= 1
+                else:
+                    self.drift_cnt = self.drift_denom-1
+                    self.ts_fns += self.drift_num
+
+            ns_inc = self.ts_fns >> 32
+            self.ts_fns &= 0xffffffff
+
+            # increment relative timestamp
+            self.ts_rel_ns = (self.ts_rel_ns + ns_inc) & 0xffffffffffff
+
+            # increment ToD timestamp
+            self.ts_tod_ns = self.ts_tod_ns + ns_inc
+
+            if self.ts_tod_ns >= 1000000000:
+                self.log.info("Seconds rollover")
+                self.pps.set()
+                self.ts_tod_s += 1
+                self.ts_tod_ns -= 1000000000
+
+            self._update_offsets()
+
+            if msg_delay <= 0:
+                # build message
+                msg, bits, msg_index = self._build_msg(msg_index)
+                bit_ptr = 0
+
+                msg_delay = 255
+            else:
+                msg_delay -= 1
+
+            # drive serial data, only writing the signal when the bit changes
+            if bit_ptr < len(bits):
+                bit = bits[bit_ptr]
+                bit_ptr += 1
+            else:
+                bit = 1
+            if bit != data:
+                self.data.value = bit
+                data = bit
+
+
+class PtpTdSink(PtpTdFastForward, Reset):
+    def __init__(self,
+            data=None,
+            clock=None,
+            reset=None,
+            reset_active_level=True,
+            period_ns=6.4,
+            td_delay=32,
+            fast_forward=False,
+            clock_period_ns=None,
+            *args, **kwargs):
+
+        self.log = logging.getLogger(f"cocotb.{data._path}")
+        self.data = data
+        self.clock = clock
+        self.reset = reset
+
+        self.log.info("PTP time distribution sink")
+        self.log.info("Copyright (c) 2023 Alex Forencich")
+        self.log.info("https://github.com/alexforencich/verilog-ethernet")
+
+        super().__init__(*args, **kwargs)
+
+        self.ctx = Context(prec=60)
+
+        self.period_ns = 0
+        self.period_fns = 0
+        self.drift_num = 0
+        self.drift_denom = 0
+
+        self.ts_fns = 0
+
+        self.ts_rel_ns = 0
+
+        self.ts_tod_s = 0
+        self.ts_tod_ns = 0
+
+        self.ts_tod_offset_ns = 0
+
+        self.ts_tod_alt_s = 0
+        self.ts_tod_alt_offset_ns = 0
+
+        self.td_delay = td_delay
+
+        self.drift_cnt = 0
+
+        self.pps = Event()
+
+        self._run_cr = None
+
+        self._ff_init(fast_forward, period_ns if clock_period_ns is None else clock_period_ns)
+        self._ff_reset_deserializer()
+
+        self._init_reset(reset, reset_active_level)
+
+    def get_period_ns(self):
+        self._ff_sync()
+        p = Decimal((self.period_ns << 32) | self.period_fns)
+        if self.drift_denom:
+            return p + Decimal(self.drift_num) / Decimal(self.drift_denom)
+        return p / Decimal(2**32)
+
+    def get_ts_tod(self):
+        self._ff_sync()
+        return (self.ts_tod_s, self.ts_tod_ns, self.ts_fns)
+
+    def get_ts_tod_96(self):
+        ts_tod_s, ts_tod_ns, ts_fns = self.get_ts_tod()
+        return (ts_tod_s << 48) | (ts_tod_ns << 16) | (ts_fns >> 16)
+
+    def get_ts_tod_ns(self):
+        ts_tod_s, ts_tod_ns, ts_fns = self.get_ts_tod()
+        ns = Decimal(ts_fns) / Decimal(2**32)
+        ns = self.ctx.add(ns, Decimal(ts_tod_ns))
+        return self.ctx.add(ns, Decimal(ts_tod_s).scaleb(9))
+
+    def get_ts_tod_s(self):
+        return self.get_ts_tod_ns().scaleb(-9, self.ctx)
+
+    def get_ts_rel(self):
+        self._ff_sync()
+        return (self.ts_rel_ns, self.ts_fns)
+
+    def get_ts_rel_64(self):
+        ts_rel_ns, ts_fns = self.get_ts_rel()
+        return (ts_rel_ns << 16) | (ts_fns >> 16)
+
+    def get_ts_rel_ns(self):
+        ts_rel_ns, ts_fns = self.get_ts_rel()
+        return self.ctx.add(Decimal(ts_fns) / Decimal(2**32), Decimal(ts_rel_ns))
+
+    def get_ts_rel_s(self):
+        return self.get_ts_rel_ns().scaleb(-9, self.ctx)
+
+    def _process_msg(self, msg):
+        self.log.info("process message %r", msg)
+
+        # word 0: control
+        msg_index = msg[0] & 0xf
+
+        if msg_index == 0:
+            # msg 0 word 1: current ToD TS ns 15:0
+            # msg 0 word 2: current ToD TS ns 29:16
+            val = ((msg[2] & 0x3fff) << 16) | msg[1]
+            if self.ts_tod_ns != val:
+                self.log.info("update ts_tod_ns: old 0x%x, new 0x%x", self.ts_tod_ns, val)
+                self.ts_tod_ns = val
+            # msg 0 word 3: current ToD TS seconds 15:0
+            # msg 0 word 4: current ToD TS seconds 31:16
+            # msg 0 word 5: current ToD TS seconds 47:32
+            val = (msg[5] << 32) | (msg[4] << 16) | msg[3]
+            if self.ts_tod_s != val:
+                self.log.info("update ts_tod_s: old 0x%x, new 0x%x", self.ts_tod_s, val)
+                self.ts_tod_s = val
+        elif msg_index == 1:
+            # msg 1 word 1: current ToD TS ns offset 15:0
+            # msg 1 word 2: current ToD TS ns offset 31:16
+            val = (msg[2] << 16) | msg[1]
+            if self.ts_tod_offset_ns != val:
+                self.log.info("update ts_tod_offset_ns: old 0x%x, new 0x%x", self.ts_tod_offset_ns, val)
+                self.ts_tod_offset_ns = val
+            # msg 1 word 3: drift num
+            val = msg[3]
+            if self.drift_num != val:
+                self.log.info("update drift_num: old 0x%x, new 0x%x", self.drift_num, val)
+                self.drift_num = val
+            # msg 1 word 4: drift denom
+            val = msg[4]
+            if self.drift_denom != val:
+                self.log.info("update drift_denom: old 0x%x, new 0x%x", self.drift_denom, val)
+                self.drift_denom = val
+            # msg 1 word 5: drift state
+            val = msg[5]
+            if self.drift_cnt != val:
+                self.log.info("update drift_cnt: old 0x%x, new 0x%x", self.drift_cnt, val)
+                self.drift_cnt = val
+        elif msg_index == 2:
+            # msg 2 word 1: alternate ToD TS ns offset 15:0
+            # msg 2 word 2: alternate ToD TS ns offset 31:16
+            val = (msg[2] << 16) | msg[1]
+            if self.ts_tod_alt_offset_ns != val:
+                self.log.info("update ts_tod_alt_offset_ns: old 0x%x, new 0x%x", self.ts_tod_alt_offset_ns, val)
+                self.ts_tod_alt_offset_ns = val
+            # msg 2 word 3: alternate ToD TS seconds 15:0
+            # msg 2 word 4: alternate ToD TS seconds 31:16
+            # msg 2 word 5: alternate ToD TS seconds 47:32
+            val = (msg[5] << 32) | (msg[4] << 16) | msg[3]
+            if self.ts_tod_alt_s != val:
+                self.log.info("update ts_tod_alt_s: old 0x%x, new 0x%x", self.ts_tod_alt_s, val)
+                self.ts_tod_alt_s = val
+
+        # word 6: current fns 15:0
+        # word 7: current fns 31:16
+        val = (msg[7] << 16) | msg[6]
+        if self.ts_fns != val:
+            self.log.info("update ts_fns: old 0x%x, new 0x%x", self.ts_fns, val)
+            self.ts_fns = val
+        # word 8: current relative TS ns 15:0
+        # word 9: current relative TS ns 31:16
+        # word 10: current relative TS ns 47:32
+        val = (msg[10] << 32) | (msg[9] << 16) | msg[8]
+        if self.ts_rel_ns != val:
+            self.log.info("update ts_rel_ns: old 0x%x, new 0x%x", self.ts_rel_ns, val)
+            self.ts_rel_ns = val
+        # word 11: current phase increment fns 15:0
+        # word 12: current phase increment fns 31:16
+        val = (msg[12] << 16) | msg[11]
+        if self.period_fns != val:
+            self.log.info("update period_fns: old 0x%x, new 0x%x", self.period_fns, val)
+            self.period_fns = val
+        # word 13: current phase increment ns 7:0 + crc
+        val = msg[13] & 0xff
+        if self.period_ns != val:
+            self.log.info("update period_ns: old 0x%x, new 0x%x", self.period_ns, val)
+            self.period_ns = val
+
+    def _ff_reset_deserializer(self):
+        self._ff_level = 1
+        self._ff_sample = 0
+        self._ff_word = None
+        self._ff_bit_index = 0
+        self._ff_cur_msg = []
+        # received messages: (cycle to process, msg)
+        self._ff_pending = []
+
+    def _ff_deserialize(self, cycle):
+        # deserialize the samples up to and including clock cycle cycle,
+        # at the current serial data level (run-length)
+        n = cycle - self._ff_sample
+        if n <= 0:
+            return
+
+        self._ff_sample = cycle
+        c = cycle - n
+
+        while n > 0:
+            if self._ff_word is not None:
+                m = min(n, 16-self._ff_bit_index)
+                if self._ff_level:
+                    self._ff_word |= ((1 << m)-1) << self._ff_bit_index
+                self._ff_bit_index += m
+                n -= m
+                c += m
+
+                if self._ff_bit_index == 16:
+                    self._ff_cur_msg.append(self._ff_word)
+                    self._ff_word = None
+            elif not self._ff_level:
+                # start bit
+                self._ff_word = 0
+                self._ff_bit_index = 0
+                n -= 1
+                c += 1
+            elif self._ff_cur_msg:
+                # idle
+                n -= 1
+                c += 1
+                # a new message replaces one that has not been processed yet
+                self._ff_pending = [p for p in self._ff_pending if p[0] <= c]
+                if self.td_delay >= 0:
+                    self._ff_pending.append((c+max(self.td_delay, 1), self._ff_cur_msg))
+                self._ff_cur_msg = []
+            else:
+                break
+
+    def _ff_sync(self):
+        if not self.fast_forward:
+            return
+
+        cycle = self._ff_cycles()
+
+        if self._ff_t0 is not None:
+            self._ff_deserialize(cycle)
+
+        while self._ff_pending and self._ff_pending[0][0] <= cycle:
+            msg_cycle, msg = self._ff_pending.pop(0)
+            self._ff_advance(msg_cycle)
+            self._process_msg(msg)
+
+        self._ff_advance(cycle)
+
+    def _handle_reset(self, state):
+        if state:
+            self.log.info("Reset asserted")
+            if self._run_cr is not None:
+                self._run_cr.kill()
+                self._run_cr = None
+            self._ff_stop()
+            self._ff_reset_deserializer()
+
+            self.ts_tod_s = 0
+            self.ts_tod_ns = 0
+            self.ts_rel_ns = 0
+            self.ts_fns = 0
+            self.drift_cnt = 0
+
+            self.data.value = 1
+        else:
+            self.log.info("Reset de-asserted")
+            if self._run_cr is None:
+                if self.fast_forward:
+                    self._run_cr = cocotb.start_soon(self._run_fast())
+                else:
+                    self._run_cr = cocotb.start_soon(self._run())
+
+    async def _run_fast(self):
+        data_edge_event = Edge(self.data)
+
+        await RisingEdge(self.clock)
+        self._ff_start()
+
+        # first sample, same as the cycle-accurate model
+        self._ff_sample = self._ff_cycle
+        self._ff_level = self.data.value.integer
+
+        while True:
+            await data_edge_event
+
+            # samples up to the last clock edge have the previous level
+            cycle = self._ff_c0 + (get_sim_time() - self._ff_t0) // self._ff_period
+            self._ff_deserialize(cycle)
+            self._ff_level = self.data.value.integer
+
+            self._ff_sync()
+
+    async def _run(self):
+        clock_edge_event = RisingEdge(self.clock)
+        msg_index = 0
+        msg = None
+        msg_delay = 0
+        cur_msg = []
+        word = None
+        bit_index = 0
+
+        while True:
+            await clock_edge_event
+
+            sdi_sample = self.data.value.integer
+
+            # increment fns portion
+            self.ts_fns += ((self.period_ns << 32) + self.period_fns)
+
+            if self.drift_denom:
+                if self.drift_cnt > 0:
+                    self.drift_cnt -= 1
+                else:
+                    self.drift_cnt = self.drift_denom-1
+                    self.ts_fns += self.drift_num
+
+            ns_inc = self.ts_fns >> 32
+            self.ts_fns &= 0xffffffff
+
+            # increment relative timestamp
+            self.ts_rel_ns = (self.ts_rel_ns + ns_inc) & 0xffffffffffff
+
+            # increment ToD timestamp
+            self.ts_tod_ns = self.ts_tod_ns + ns_inc
+
+            if self.ts_tod_ns >= 1000000000:
+                self.log.info("Seconds rollover")
+                self.pps.set()
+                self.ts_tod_s += 1
+                self.ts_tod_ns -= 1000000000
+
+            # process messages
+            if msg_delay > 0:
+                msg_delay -= 1
+
+            if msg_delay == 0 and msg:
+                self._process_msg(msg)
+                msg = None
+
+            # deserialize message
+            if word is not None:
+                word = word | (sdi_sample << bit_index)
+                bit_index += 1
+
+                if bit_index == 16:
+                    cur_msg.append(word)
+                    word = None
+            else:
+                if not sdi_sample:
+                    # start bit
+                    word = 0
+                    bit_index = 0
+                elif cur_msg:
+                    # idle
+                    msg = cur_msg
+                    msg_delay = self.td_delay
+                    cur_msg = []
@@ -0,0 +1,636 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Passive monitor for the PTP time distribution serial bus
+#
+# PtpTdDecoder reassembles the 14-word messages of the ptp_td_sdo bitstream
+# (as produced by ptp_td_phc and PtpTdSource) and emits them as PtpTdMessage
+# records.  It is fed the serial data level as run lengths (the sample cycle
+# of every level change), and a run is decoded a word at a time, so the cost
+# is per edge and per word rather than per bit.
+#
+# Every message is checked for framing (14 words, message index sequence
+# 0, 1, 2, message spacing, reserved bits) and field errors, which are
+# counted as violations.  The decoder also tracks the distributed time:
+#
+# - the relative timestamp and fns must advance by the message spacing
+#   times the period (plus drift) from one message to the next, unless the
+#   period changed or the message has the relative timestamp update flag set
+# - the ToD timestamp is carried forward from message 0 by the relative
+#   timestamp increments; message 0 must match it, message 1 carries the
+#   ToD offset (ToD ns - relative ns) and message 2 the alternate offset and
+#   seconds for the next second (in the latter part of a second) or for the
+#   previous second, and bit 9 of the control word is the seconds LSB
+# - the drift counter of message 1 must follow the drift setting from one
+#   message 1 to the next
+#
+# A step in the time that is not explained by an update is counted as a
+# discontinuity, separately from the violations: time offsets that are not
+# flagged on the bus (the fns offset input of ptp_td_phc) legitimately cause
+# them.  ToD loads are only flagged in message 0 and drift changes only show
+# up in message 1, so mismatches are held for a full message cycle, and are
+# dropped if a ToD load or a drift change is seen in the meantime.
+#
+# PtpTdMonitor runs a decoder on a live serial data signal, waking only on
+# data edges (the clock period must be fixed).  The decoded messages are
+# only queued for recv() when constructed with keep=True; otherwise only
+# the counters and checks are kept, so long runs do not accumulate them.
+# ptp_td_decode_vcd runs a decoder on a signal in a VCD file, counting
+# rising edges of the clock signal.
+
+import logging
+from collections import deque
+
+import cocotb
+from cocotb.triggers import RisingEdge, Edge, Event
+from cocotb.utils import get_sim_time, get_sim_steps
+
+from cocotbext.eth.reset import Reset
+
+
+MSG_WORDS = 14
+NS_PER_S = 1000000000
+
+
+class PtpTdMessage:
+    def __init__(self, cycle, words):
+        self.cycle = cycle
+        self.words = tuple(words)
+
+        # word 0: control
+        ctrl = words[0]
+        self.index = ctrl & 0xf
+        self.ts_rel_updated = bool(ctrl & 0x100)
+        self.ts_tod_s_lsb = (ctrl >> 9) & 1
+
+        self.ts_tod_updated = False
+        self.ts_tod_s = None
+        self.ts_tod_ns = None
+        self.ts_tod_offset_ns = None
+        self.ts_tod_alt_s = None
+        self.ts_tod_alt_offset_ns = None
+        self.drift_num = None
+        self.drift_denom = None
+        self.drift_cnt = None
+
+        if self.index == 0:
+            # words 1-2: ToD ns and update flag, words 3-5: ToD seconds
+            self.ts_tod_ns = ((words[2] & 0x3fff) << 16) | words[1]
+            self.ts_tod_updated = bool(words[2] & 0x8000)
+            self.ts_tod_s = (words[5] << 32) | (words[4] << 16) | words[3]
+        elif self.index == 1:
+            # words 1-2: ToD offset, words 3-5: drift num, denom, and state
+            self.ts_tod_offset_ns = (words[2] << 16) | words[1]
+            self.drift_num = words[3]
+            self.drift_denom = words[4]
+            self.drift_cnt = words[5]
+        elif self.index == 2:
+            # words 1-2: alternate ToD offset, words 3-5: alternate ToD seconds
+            self.ts_tod_alt_offset_ns = (words[2] << 16) | words[1]
+            self.ts_tod_alt_s = (words[5] << 32) | (words[4] << 16) | words[3]
+
+        # words 6-7: fns, words 8-10: relative ns, words 11-13: period
+        self.ts_fns = (words[7] << 16) | words[6]
+        self.ts_rel_ns = (words[10] << 32) | (words[9] << 16) | words[8]
+        self.period_fns = (words[12] << 16) | words[11]
+        self.period_ns = words[13] & 0xff
+
+    def __repr__(self):
+        fields = [f"cycle={self.cycle}", f"index={self.index}"]
+        for name in ('ts_tod_s', 'ts_tod_ns', 'ts_tod_updated', 'ts_tod_offset_ns', 'ts_tod_alt_s',
+                'ts_tod_alt_offset_ns', 'drift_num', 'drift_denom', 'drift_cnt'):
+            val = getattr(self, name)
+            if val is not None and val is not False:
+                fields.append(f"{name}={val}")
+        fields += [f"ts_rel_ns={self.ts_rel_ns}", f"ts_fns=0x{self.ts_fns:08x}",
+            f"ts_rel_updated={self.ts_rel_updated}",
+            f"period_ns={self.period_ns}", f"period_fns=0x{self.period_fns:08x}"]
+        return f"{type(self).__name__}({', '.join(fields)})"
+
+
+class PtpTdDecoder:
+
+    # number of violation and discontinuity messages kept for reporting
+    max_violation_log = 16
+
+    def __init__(self, msg_period=256, callback=None, log=None):
+        self.msg_period = msg_period
+        self.callback = callback
+        self.log = log
+
+        self.messages = 0
+        self.index_count = [0, 0, 0]
+        self.violation_count = 0
+        self.violations = []
+        self.discontinuity_count = 0
+        self.discontinuities = []
+        self.rel_loads = 0
+        self.tod_loads = 0
+        self.period_changes = 0
+        self.drift_changes = 0
+
+        self.restart()
+
+    def restart(self, cycle=0, level=1):
+        # start decoding at sample cycle, at the serial data level; keeps the statistics
+        self._level = level
+        self._level_cycle = cycle
+        self._sample = cycle
+        self._word = None
+        self._bit_index = 0
+        self._cur_msg = []
+        self._msg_cycle = None
+        self._hunt = False
+
+        self.last = None
+        self._drift = None
+        self._drift_msg = None
+        self._tod = None
+        self._suspect = []
+
+    def _violation(self, cycle, msg):
+        self.violation_count += 1
+        if len(self.violations) < self.max_violation_log:
+            self.violations.append(f"cycle {cycle}: {msg}")
+        if self.log:
+            self.log.warning("PTP TD violation at cycle %d: %s", cycle, msg)
+
+    def _discontinuity(self, cycle, msg):
+        self.discontinuity_count += 1
+        if len(self.discontinuities) < self.max_violation_log:
+            self.discontinuities.append(f"cycle {cycle}: {msg}")
+        if self.log:
+            self.log.info("PTP TD discontinuity at cycle %d: %s", cycle, msg)
+
+    def _suspect_discontinuity(self, cycle, msg):
+        # confirmed after a full message cycle without a ToD load or drift change
+        self._suspect.append((self.messages+3, cycle, msg))
+
+    def edge(self, cycle, level):
+        # serial data changes to level, sampled from clock cycle cycle on
+        self._decode(cycle)
+        if level != self._level:
+            self._level = level
+            self._level_cycle = cycle
+
+    def flush(self, cycle):
+        # decode the samples before clock cycle cycle
+        self._decode(cycle)
+
+    def _decode(self, cycle):
+        n = cycle - self._sample
+        if n <= 0:
+            return
+
+        c = self._sample
+        self._sample = cycle
+        level = self._level
+
+        if self._hunt:
+            # lost framing; wait for an idle run longer than a word
+            if not level or cycle - self._level_cycle <= 17:
+                return
+            self._hunt = False
+            n = 1
+            c = cycle-1
+
+        while n > 0:
+            if self._word is not None:
+                # data bits
+                m = min(n, 16-self._bit_index)
+                if level:
+                    self._word |= ((1 << m)-1) << self._bit_index
+                self._bit_index += m
+                n -= m
+                c += m
+
+                if self._bit_index == 16:
+                    self._cur_msg.append(self._word)
+                    self._word = None
+            elif not level:
+                # start bit
+                if not self._cur_msg:
+                    self._msg_cycle = c
+                elif len(self._cur_msg) >= MSG_WORDS:
+                    self._violation(c, f"message longer than {MSG_WORDS} words")
+                    self._cur_msg = []
+                    self.last = None
+                    self._hunt = True
+                    return
+                self._word = 0
+                self._bit_index = 0
+                n -= 1
+                c += 1
+            else:
+                # idle
+                if self._cur_msg:
+                    self._message(self._msg_cycle, self._cur_msg)
+                    self._cur_msg = []
+                break
+
+    def _message(self, cycle, words):
+        if len(words) != MSG_WORDS:
+            self._violation(cycle, f"{len(words)} word message, expected {MSG_WORDS}")
+            self.last = None
+            return
+
+        msg = PtpTdMessage(cycle, words)
+
+        self._check(msg)
+
+        self.messages += 1
+        if msg.index < 3:
+            self.index_count[msg.index] += 1
+        self.last = msg
+
+        while self._suspect and self._suspect[0][0] <= self.messages:
+            self._discontinuity(*self._suspect.pop(0)[1:])
+
+        if self.callback:
+            self.callback(msg)
+
+    def _check(self, msg):
+        cycle = msg.cycle
+        prev = self.last
+        words = msg.words
+
+        if words[0] & 0xfcf0:
+            self._violation(cycle, f"reserved control bits set: 0x{words[0]:04x}")
+        if words[13] & 0xff00:
+            self._violation(cycle, f"reserved bits set in word 13: 0x{words[13]:04x}")
+
+        if msg.index > 2:
+            self._violation(cycle, f"invalid message index {msg.index}")
+            self._tod = None
+            self._drift = None
+            return
+
+        if prev is not None:
+            n = cycle - prev.cycle
+            if n != self.msg_period:
+                self._violation(cycle, f"message spacing {n} cycles, expected {self.msg_period}")
+            if msg.index != (prev.index+1) % 3:
+                self._violation(cycle, f"message index {msg.index} after {prev.index}")
+
+            if msg.ts_rel_updated:
+                self.rel_loads += 1
+            elif (msg.period_ns, msg.period_fns) != (prev.period_ns, prev.period_fns):
+                self.period_changes += 1
+            elif self._drift is not None:
+                self._check_step(prev, msg, n)
+
+        # carry ToD forward by the relative timestamp increment
+        if msg.ts_rel_updated or prev is None:
+            self._tod = None
+        elif self._tod is not None:
+            s, ns = self._tod
+            ns += (msg.ts_rel_ns - prev.ts_rel_ns) & 0xffffffffffff
+            s += ns // NS_PER_S
+            ns %= NS_PER_S
+            self._tod = (s, ns)
+
+        if msg.index == 0:
+            self._check_msg0(msg)
+        elif msg.index == 1:
+            self._check_msg1(msg)
+        else:
+            self._check_msg2(msg)
+
+        if self._tod is not None and msg.index != 0:
+            msg.ts_tod_s, msg.ts_tod_ns = self._tod
+
+    def _check_step(self, prev, msg, n):
+        # relative timestamp and fns advance by n periods, plus drift
+        num, denom = self._drift
+        step = ((msg.ts_rel_ns << 32) | msg.ts_fns) - ((prev.ts_rel_ns << 32) | prev.ts_fns)
+        step &= 2**80-1
+        expected = n*((prev.period_ns << 32) | prev.period_fns)
+        err = step - expected
+        if denom:
+            # drift applied floor or ceil of n/denom times
+            err -= n*num/denom
+        if abs(err) > num+1:
+            self._suspect_discontinuity(msg.cycle, f"relative timestamp step {step/2**32:.6f} ns, "
+                f"expected {expected/2**32:.6f} ns")
+
+    def _check_msg0(self, msg):
+        cycle = msg.cycle
+
+        if msg.words[2] & 0x4000:
+            self._violation(cycle, f"reserved bit set in word 2: 0x{msg.words[2]:04x}")
+        if msg.ts_tod_ns >= NS_PER_S:
+            self._violation(cycle, f"ToD ns {msg.ts_tod_ns} out of range")
+        if msg.ts_tod_s_lsb != msg.ts_tod_s & 1:
+            self._violation(cycle, f"seconds LSB {msg.ts_tod_s_lsb} does not match ToD seconds {msg.ts_tod_s}")
+
+        if msg.ts_tod_updated:
+            self.tod_loads += 1
+            self._suspect = []
+        elif self._tod is not None and self._tod != (msg.ts_tod_s, msg.ts_tod_ns):
+            self._suspect_discontinuity(cycle, f"ToD {msg.ts_tod_s}.{msg.ts_tod_ns:09d}, "
+                f"expected {self._tod[0]}.{self._tod[1]:09d}")
+
+        self._tod = (msg.ts_tod_s, msg.ts_tod_ns)
+
+    def _check_tod(self, msg):
+        # returns expected (offset, alt seconds, alt offset) from the tracked ToD
+        s, ns = self._tod
+
+        if msg.ts_tod_s_lsb != s & 1:
+            self._suspect_discontinuity(msg.cycle, f"seconds LSB {msg.ts_tod_s_lsb}, expected {s & 1}")
+
+        offset = (ns - msg.ts_rel_ns) & 0xffffffff
+        if ns >> 27 == 7:
+            # latter portion of second; offset for next second
+            return offset, (s+1) & 0xffffffffffff, (offset - NS_PER_S) & 0xffffffff
+        # former portion of second; offset for previous second
+        return offset, (s-1) & 0xffffffffffff, (offset + NS_PER_S) & 0xffffffff
+
+    def _check_msg1(self, msg):
+        cycle = msg.cycle
+        drift = (msg.drift_num, msg.drift_denom)
+
+        if self._tod is not None:
+            offset, alt_s, alt_offset = self._check_tod(msg)
+            if msg.ts_tod_offset_ns != offset:
+                self._suspect_discontinuity(cycle, f"ToD offset 0x{msg.ts_tod_offset_ns:08x}, expected 0x{offset:08x}")
+
+        if self._drift is not None and drift != self._drift:
+            self.drift_changes += 1
+            self._suspect = []
+        elif self._drift_msg is not None:
+            # drift counter counts down every cycle, and reloads with denom-1
+            prev = self._drift_msg
+            num, denom = drift
+            if not denom:
+                if msg.drift_cnt:
+                    self._violation(cycle, f"drift state {msg.drift_cnt} with drift disabled")
+            elif msg.drift_cnt >= denom:
+                self._violation(cycle, f"drift state {msg.drift_cnt} out of range for denom {denom}")
+            elif prev.drift_cnt < denom:
+                expected = (prev.drift_cnt - (cycle - prev.cycle)) % denom
+                if msg.drift_cnt != expected:
+                    self._violation(cycle, f"drift state {msg.drift_cnt}, expected {expected}")
+
+        self._drift = drift
+        self._drift_msg = msg
+
+    def _check_msg2(self, msg):
+        cycle = msg.cycle
+
+        if self._tod is not None:
+            offset, alt_s, alt_offset = self._check_tod(msg)
+            if (msg.ts_tod_alt_s, msg.ts_tod_alt_offset_ns) != (alt_s, alt_offset):
+                self._suspect_discontinuity(cycle, f"alternate ToD {msg.ts_tod_alt_s} offset "
+                    f"0x{msg.ts_tod_alt_offset_ns:08x}, expected {alt_s} offset 0x{alt_offset:08x}")
+
+    def summary(self):
+        return {
+            'messages': self.messages,
+            'index_count': list(self.index_count),
+            'rel_loads': self.rel_loads,
+            'tod_loads': self.tod_loads,
+            'period_changes': self.period_changes,
+            'drift_changes': self.drift_changes,
+            'violation_count': self.violation_count,
+            'violations': list(self.violations),
+            'discontinuity_count': self.discontinuity_count,
+            'discontinuities': list(self.discontinuities),
+        }
+
+    def log_summary(self, log=None):
+        log = log or self.log
+        log.info("PTP TD: %d messages (%s), %d rel loads, %d ToD loads, %d period changes, %d drift changes",
+            self.messages, "/".join(str(k) for k in self.index_count), self.rel_loads, self.tod_loads,
+            self.period_changes, self.drift_changes)
+        log.info("PTP TD: %d violations, %d discontinuities", self.violation_count, self.discontinuity_count)
+
+    def check(self, min_messages=1, strict=False):
+        # strict: every time step must be explained by a flagged update
+        assert not self.violation_count, \
+            f"{self.violation_count} PTP TD violations: {'; '.join(self.violations)}"
+        assert self.messages >= min_messages, f"{self.messages} PTP TD messages, expected at least {min_messages}"
+        if strict:
+            assert not self.discontinuity_count, \
+                f"{self.discontinuity_count} PTP TD discontinuities: {'; '.join(self.discontinuities)}"
+
+
+class PtpTdMonitor(Reset):
+    def __init__(self,
+            data=None,
+            clock=None,
+            reset=None,
+            reset_active_level=True,
+            clock_period_ns=6.4,
+            msg_period=256,
+            callback=None,
+            keep=False,
+            *args, **kwargs):
+
+        self.log = logging.getLogger(f"cocotb.{data._path}")
+        self.data = data
+        self.clock = clock
+        self.reset = reset
+        self.clock_period_ns = clock_period_ns
+        self.callback = callback
+        self.keep = keep
+
+        self.log.info("PTP time distribution monitor")
+
+        super().__init__(*args, **kwargs)
+
+        self.decoder = PtpTdDecoder(msg_period, callback=self._recv_msg, log=self.log)
+
+        self.queue = deque()
+        self.active_event = Event()
+
+        self._period = None
+        self._t0 = None
+
+        self._run_cr = None
+
+        self._init_reset(reset, reset_active_level)
+
+    def _recv_msg(self, msg):
+        if self.keep:
+            self.queue.append(msg)
+            self.active_event.set()
+        if self.callback:
+            self.callback(msg)
+
+    def _cycle(self):
+        # clock cycle of the next sample
+        return (get_sim_time() - self._t0) // self._period + 1
+
+    def flush(self):
+        # decode everything sampled so far
+        if self._t0 is not None:
+            self.decoder.flush(self._cycle())
+
+    def count(self):
+        return len(self.queue)
+
+    def empty(self):
+        return not self.queue
+
+    def clear(self):
+        self.queue.clear()
+
+    def _check_keep(self):
+        if not self.keep:
+            raise RuntimeError("PtpTdMonitor does not queue messages; construct with keep=True to receive them")
+
+    def recv_nowait(self):
+        self._check_keep()
+        if not self.queue:
+            self.flush()
+        return self.queue.popleft()
+
+    async def recv(self):
+        self._check_keep()
+        while not self.queue:
+            self.flush()
+            if self.queue:
+                break
+            self.active_event.clear()
+            await self.active_event.wait()
+        return self.queue.popleft()
+
+    def summary(self):
+        self.flush()
+        return self.decoder.summary()
+
+    def log_summary(self):
+        self.flush()
+        self.decoder.log_summary()
+
+    def check(self, min_messages=1, strict=False):
+        self.flush()
+        self.decoder.check(min_messages, strict)
+
+    def _level(self):
+        val = self.data.value
+        return val.integer if val.is_resolvable else 1
+
+    def _handle_reset(self, state):
+        if state:
+            self.log.info("Reset asserted")
+            if self._run_cr is not None:
+                self._run_cr.kill()
+                self._run_cr = None
+            self.flush()
+            self._t0 = None
+        else:
+            self.log.info("Reset de-asserted")
+            if self._run_cr is None:
+                self._run_cr = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        data_edge_event = Edge(self.data)
+
+        if self._period is None:
+            self._period = get_sim_steps(self.clock_period_ns, 'ns')
+
+        # cycle 0 is the first clock edge after reset release
+        await RisingEdge(self.clock)
+        self._t0 = get_sim_time()
+        self.decoder.restart(0, self._level())
+
+        while True:
+            await data_edge_event
+            self.decoder.edge(self._cycle(), self._level())
+
+
+def ptp_td_decode_vcd(path, data, clock, msg_period=256, callback=None, log=None):
+    # decode the serial data signal data of a VCD file, sampled on the rising
+    # edges of clock; signals are matched by full hierarchical name or by
+    # trailing components (e.g. "ptp_td_sdo" or "dut.ptp_td_sdo")
+    decoder = PtpTdDecoder(msg_period, callback=callback, log=log)
+
+    def match(name, pattern):
+        return name == pattern or name.endswith("." + pattern)
+
+    data_ids = set()
+    clock_ids = set()
+    scope = []
+
+    with open(path) as f:
+        # header
+        for line in f:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0] == '$scope':
+                scope.append(tokens[2])
+            elif tokens[0] == '$upscope':
+                scope.pop()
+            elif tokens[0] == '$var':
+                name = ".".join(scope + [tokens[4]])
+                if match(name, data):
+                    data_ids.add(tokens[3])
+                if match(name, clock):
+                    clock_ids.add(tokens[3])
+            elif tokens[0] == '$enddefinitions':
+                break
+
+        if not data_ids:
+            raise ValueError(f"signal {data!r} not found in {path}")
+        if not clock_ids:
+            raise ValueError(f"signal {clock!r} not found in {path}")
+
+        # value changes; a data change is sampled from the first clock edge
+        # after it, so apply it after the clock edges at the same time
+        clk = None
+        cycle = 0
+        level = None
+        first = True
+
+        for line in f:
+            if not line or line[0] in '$ \n':
+                continue
+            if line[0] == '#':
+                if level is not None:
+                    if first:
+                        decoder.restart(cycle, level)
+                        first = False
+                    else:
+                        decoder.edge(cycle, level)
+                    level = None
+                continue
+            if line[0] in 'bBrR':
+                continue
+            val = line[0]
+            ident = line[1:].strip()
+            if ident in clock_ids:
+                if val == '1' and clk != '1':
+                    cycle += 1
+                clk = val
+            elif ident in data_ids:
+                level = 0 if val == '0' else 1
+
+        if level is not None:
+            decoder.edge(cycle, level)
+        decoder.flush(cycle+1)
+
+    return decoder
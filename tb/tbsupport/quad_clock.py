@@ -0,0 +1,142 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Quadrature clock pair driver
+#
+# Drives a clock and a copy delayed by a quarter period (e.g. gtx_clk and
+# gtx_clk90 of the RGMII MACs).  quad_clock_verilog() generates a Verilog
+# module that runs the clocks inside the simulator and forces them onto
+# the DUT inputs by hierarchical reference; elaborated as a second root
+# module (a list toplevel in cocotb-test, -s for Icarus), it removes the
+# four Python wakeups per period of a cocotb coroutine driver.
+#
+# QuadClock is the cocotb side: the runner lists the generated root
+# modules in $QUAD_CLOCK_HDL (through extra_env), and start() only falls
+# back to driving the clocks from a coroutine when its module is not listed
+# or the simulator is not Icarus (Verilator elaborates a single root).  Set
+# $QUAD_CLOCK_PYTHON=1 to always use the coroutine driver, e.g. to compare
+# wall time; the runner then leaves the generated module out.
+
+import os
+
+import cocotb
+from cocotb.triggers import Timer
+from cocotb.utils import get_sim_steps
+
+
+def quad_clock_verilog(path, name, clk, clk90, period_ns):
+    # clk and clk90 are hierarchical references, e.g. "eth_mac_1g_rgmii.gtx_clk"
+    quarter = period_ns / 4
+
+    text = f"""// Generated by tbsupport.quad_clock
+
+`resetall
+`timescale 1ns / 1ps
+`default_nettype none
+
+/*
+ * Quadrature clock driver for {clk} and {clk90} ({period_ns:g} ns)
+ */
+module {name};
+
+reg clk = 1'b0;
+reg clk90 = 1'b0;
+
+initial begin
+    force {clk} = clk;
+    force {clk90} = clk90;
+end
+
+always begin
+    clk = 1'b1;
+    #{quarter:g};
+    clk90 = 1'b1;
+    #{quarter:g};
+    clk = 1'b0;
+    #{quarter:g};
+    clk90 = 1'b0;
+    #{quarter:g};
+end
+
+endmodule
+
+`resetall
+"""
+
+    # only rewrite on change, so the model is not considered outdated
+    try:
+        with open(path) as f:
+            if f.read() == text:
+                return name
+    except OSError:
+        pass
+
+    with open(path, 'w') as f:
+        f.write(text)
+
+    return name
+
+
+class QuadClock:
+
+    def __init__(self, clk, clk90, period_ns, name=None):
+        self.clk = clk
+        self.clk90 = clk90
+        self.period_ns = period_ns
+        self.name = name
+
+        self.hdl = False
+        self._task = None
+
+    @staticmethod
+    def python_forced():
+        return bool(int(os.getenv("QUAD_CLOCK_PYTHON", "0")))
+
+    @staticmethod
+    def hdl_modules():
+        return os.getenv("QUAD_CLOCK_HDL", "").split()
+
+    def start(self):
+        if self.name in self.hdl_modules() and cocotb.SIM_NAME.lower().startswith("icarus"):
+            # running in the simulator
+            self.hdl = True
+            return
+
+        self.clk.setimmediatevalue(0)
+        self.clk90.setimmediatevalue(0)
+
+        if self._task is None:
+            self._task = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        t = Timer(get_sim_steps(self.period_ns / 4, 'ns'))
+        while True:
+            self.clk.value = 1
+            await t
+            self.clk90.value = 1
+            await t
+            self.clk.value = 0
+            await t
+            self.clk90.value = 0
+            await t
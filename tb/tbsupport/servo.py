@@ -0,0 +1,203 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# PI servo convergence harness for the PTP hardware clocks
+#
+# ReferenceClock models the time of a reference (grandmaster) clock as a
+# function of simulation time, with a fixed frequency error and a random
+# frequency wander.  PiServo is a software PI servo in the style of the
+# linuxptp one: the first sample steps the clock, later samples produce a
+# frequency correction in ppb.  The gains are scaled by the sample
+# interval, so kp=0.7, ki=0.3 behave like the linuxptp defaults at a 1 s
+# sync interval, however short the simulated interval is.  ServoStats
+# records the offsets and reports time-to-lock and the steady-state offset
+# and jitter once locked.
+#
+# period_regs() converts a clock period to the ns, fns and drift register
+# values of ptp_clock and ptp_td_phc.
+
+import math
+import random
+from fractions import Fraction
+
+
+def period_regs(period_ns, fns_bits=32, drift_bits=16):
+    # split period into ns, fns and a drift of num fns every denom cycles
+    period = Fraction(period_ns) * 2**fns_bits
+    fns = math.floor(period)
+    drift = Fraction(period - fns).limit_denominator(2**drift_bits-1)
+    if drift == 1:
+        fns += 1
+        drift = Fraction(0)
+    return fns >> fns_bits, fns & (2**fns_bits-1), drift.numerator, drift.denominator
+
+
+class ReferenceClock:
+    def __init__(self, ppm=0.0, wander_ppm=0.0, wander_tau_ns=1e6, noise_ns=0.0, start_ns=0, seed=None):
+        self.ppm = ppm
+        self.wander_ppm = wander_ppm
+        self.wander_tau_ns = wander_tau_ns
+        self.noise_ns = noise_ns
+
+        self.rng = random.Random(seed)
+
+        # frequency wander (Ornstein-Uhlenbeck, in ppm)
+        self.wander = 0.0
+
+        self.sim_ns = 0.0
+        self.ref_ns = float(start_ns)
+
+    def time_ns(self, sim_ns):
+        # advance to sim_ns; returns reference time (including measurement noise)
+        dt = sim_ns - self.sim_ns
+
+        if dt > 0:
+            wander = self.wander
+            if self.wander_ppm:
+                a = math.exp(-dt/self.wander_tau_ns)
+                wander = wander*a + self.wander_ppm*math.sqrt(1-a*a)*self.rng.gauss(0, 1)
+
+            self.ref_ns += dt * (1 + (self.ppm + (self.wander + wander)/2)*1e-6)
+            self.wander = wander
+            self.sim_ns = sim_ns
+
+        if self.noise_ns:
+            return self.ref_ns + self.rng.gauss(0, self.noise_ns)
+        return self.ref_ns
+
+    def freq_ppm(self):
+        return self.ppm + self.wander
+
+
+class PiServo:
+    # states
+    UNLOCKED = 0
+    JUMP = 1
+    LOCKED = 2
+
+    def __init__(self, kp=0.7, ki=0.3, step_threshold_ns=20000.0, max_ppb=500000.0):
+        self.kp = kp
+        self.ki = ki
+        self.step_threshold_ns = step_threshold_ns
+        self.max_ppb = max_ppb
+
+        self.reset()
+
+    def reset(self):
+        self.state = self.UNLOCKED
+        self.drift_ppb = 0.0
+        self.ppb = 0.0
+        self.samples = 0
+
+    def sample(self, offset_ns, interval_ns):
+        # offset is local clock minus reference; returns (state, ppb)
+        # JUMP means step the clock by -offset before applying ppb
+        interval_s = interval_ns * 1e-9
+        self.samples += 1
+
+        if self.state == self.UNLOCKED or abs(offset_ns) > self.step_threshold_ns:
+            self.state = self.JUMP
+            self.ppb = self.drift_ppb
+            return self.state, self.ppb
+
+        self.state = self.LOCKED
+
+        ki = self.ki / interval_s
+        kp = self.kp / interval_s
+
+        self.drift_ppb = max(-self.max_ppb, min(self.max_ppb, self.drift_ppb - ki*offset_ns))
+        self.ppb = max(-self.max_ppb, min(self.max_ppb, self.drift_ppb - kp*offset_ns))
+
+        return self.state, self.ppb
+
+
+class ServoStats:
+    def __init__(self, lock_threshold_ns=1.0, lock_samples=16):
+        self.lock_threshold_ns = lock_threshold_ns
+        self.lock_samples = lock_samples
+
+        self.samples = []
+        self.lock_index = None
+
+    def add(self, sim_ns, offset_ns, ppb):
+        self.samples.append((sim_ns, offset_ns, ppb))
+
+        if self.lock_index is None:
+            run = self.samples[-self.lock_samples:]
+            if len(run) == self.lock_samples and all(abs(s[1]) < self.lock_threshold_ns for s in run):
+                self.lock_index = len(self.samples)-self.lock_samples
+        elif abs(offset_ns) >= self.lock_threshold_ns:
+            # lost lock
+            self.lock_index = None
+
+    @property
+    def locked(self):
+        return self.lock_index is not None
+
+    def summary(self):
+        res = {
+            'samples': len(self.samples),
+            'locked': self.locked,
+            'time_to_lock_us': None,
+        }
+
+        if not self.locked:
+            return res
+
+        start_ns = self.samples[0][0]
+        steady = self.samples[self.lock_index:]
+        offsets = [s[1] for s in steady]
+        n = len(offsets)
+        mean = sum(offsets)/n
+        var = sum((x-mean)**2 for x in offsets)/n
+        tie = [b-a for a, b in zip(offsets, offsets[1:])]
+
+        res.update({
+            'time_to_lock_us': (steady[0][0]-start_ns)*1e-3,
+            'steady_samples': n,
+            'offset_mean_ns': mean,
+            'offset_rms_ns': math.sqrt(sum(x*x for x in offsets)/n),
+            'offset_std_ns': math.sqrt(var),
+            'offset_max_ns': max(abs(x) for x in offsets),
+            'offset_pk_pk_ns': max(offsets)-min(offsets),
+            'jitter_rms_ns': math.sqrt(sum(x*x for x in tie)/len(tie)) if tie else 0.0,
+            'freq_ppb_mean': sum(s[2] for s in steady)/n,
+        })
+
+        return res
+
+    def log_summary(self, log):
+        res = self.summary()
+        log.info("Servo samples: %d", res['samples'])
+        if not res['locked']:
+            log.info("Servo did not lock (threshold %g ns)", self.lock_threshold_ns)
+            return
+        log.info("Time to lock:  %.3f us", res['time_to_lock_us'])
+        log.info("Offset mean:   %.4f ns", res['offset_mean_ns'])
+        log.info("Offset RMS:    %.4f ns", res['offset_rms_ns'])
+        log.info("Offset std:    %.4f ns", res['offset_std_ns'])
+        log.info("Offset max:    %.4f ns", res['offset_max_ns'])
+        log.info("Offset pk-pk:  %.4f ns", res['offset_pk_pk_ns'])
+        log.info("Jitter RMS:    %.4f ns", res['jitter_rms_ns'])
+        log.info("Frequency:     %.3f ppb", res['freq_ppb_mean'])
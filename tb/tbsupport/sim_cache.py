@@ -0,0 +1,342 @@
+"""
+
+Copyright (c) 2021-2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Content-addressed cache of compiled simulation models for cocotb-test
+#
+# pytest plugin that wraps cocotb_test.simulator.run.  The compiled model
+# (the .vvp file for Icarus, the model executable for Verilator) is stored
+# under a key derived from the simulator and its version, the contents of
+# the Verilog sources, the module parameters and the other build options.
+# On a hit, the cached model is copied into sim_build and elaboration is
+# skipped; on a miss, the model is always rebuilt (cocotb-test's own
+# up-to-date check only looks at source timestamps, not at parameters) and
+# then stored.
+#
+# Cache hits touch the entry, and at the end of the session the least
+# recently used entries are removed until the cache fits in its size limit.
+#
+# Options:
+#   --sim-cache-dir DIR   cache location (default: $SIM_CACHE_DIR or .sim_cache
+#                         in the pytest root directory)
+#   --sim-cache-size MB   size limit (default: $SIM_CACHE_SIZE or 4096, 0 for
+#                         no limit)
+#   --sim-cache-clear     remove all cached models before the session
+#   --no-sim-cache        disable the cache
+
+import glob
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import pytest
+
+import cocotb
+import cocotb_test.simulator
+
+
+_orig_run = None
+_cache_dir = None
+_cache_size = 0
+_sim_versions = {}
+_stats = {'hits': 0, 'misses': 0, 'pruned': 0}
+
+# default size limit (MB)
+default_cache_size = 4096
+
+_version_cmds = {
+    'icarus': ['iverilog', '-V'],
+    'verilator': ['verilator', '--version'],
+}
+
+
+def _sim_version(sim):
+    if sim not in _sim_versions:
+        version = None
+        try:
+            res = subprocess.run(_version_cmds[sim], stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, text=True)
+            lines = res.stdout.splitlines()
+            if lines:
+                version = lines[0].strip()
+        except OSError:
+            pass
+        _sim_versions[sim] = version
+    return _sim_versions[sim]
+
+
+def _flat_sources(sources):
+    if not sources:
+        return []
+    if isinstance(sources, dict):
+        return [src for lib in sources.values() for src in lib]
+    return list(sources)
+
+
+def _hash_file(h, path):
+    h.update(os.path.basename(path).encode())
+    with open(path, 'rb') as f:
+        h.update(hashlib.sha256(f.read()).digest())
+
+
+def build_key(sim, **kwargs):
+    version = _sim_version(sim)
+
+    if version is None:
+        return None
+
+    h = hashlib.sha256()
+
+    def add(name, value):
+        h.update(f"{name}={value!r};".encode())
+
+    add('sim', sim)
+    add('version', version)
+    add('cocotb', cocotb.__version__)
+    add('toplevel', kwargs.get('toplevel'))
+    add('toplevel_lang', kwargs.get('toplevel_lang', 'verilog'))
+
+    for path in _flat_sources(kwargs.get('verilog_sources')):
+        _hash_file(h, os.path.abspath(path))
+
+    for inc in kwargs.get('includes') or []:
+        for root, dirs, files in sorted(os.walk(inc)):
+            for name in sorted(files):
+                _hash_file(h, os.path.join(root, name))
+
+    add('parameters', sorted((k, str(v)) for k, v in (kwargs.get('parameters') or {}).items()))
+    add('defines', kwargs.get('defines'))
+    add('compile_args', kwargs.get('compile_args'))
+    add('verilog_compile_args', kwargs.get('verilog_compile_args'))
+    add('extra_args', kwargs.get('extra_args'))
+    add('timescale', kwargs.get('timescale'))
+
+    waves = kwargs.get('waves')
+    if waves is None:
+        waves = bool(int(os.getenv("WAVES", 0)))
+    add('waves', bool(waves))
+
+    return h.hexdigest()
+
+
+def _model_file(sim, sim_build, toplevel):
+    if isinstance(toplevel, list):
+        toplevel = toplevel[0]
+    toplevel = toplevel.rsplit(".", 1)[-1]
+
+    if sim == 'icarus':
+        return os.path.join(sim_build, f"{toplevel}.vvp")
+    return os.path.join(sim_build, toplevel)
+
+
+def _store(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dst))
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp)
+        shutil.copymode(src, tmp)
+        os.replace(tmp, dst)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def run(simulator=None, **kwargs):
+    __tracebackhide__ = True  # Hide the traceback when using PyTest.
+
+    # same simulator selection as cocotb_test.simulator.run
+    sim = os.getenv("SIM")
+    if sim is None:
+        sim = "icarus" if simulator is None else simulator
+
+    if _cache_dir is None or sim not in _version_cmds or kwargs.get('force_compile'):
+        return _orig_run(simulator=simulator, **kwargs)
+
+    key = build_key(sim, **kwargs)
+
+    if key is None:
+        return _orig_run(simulator=simulator, **kwargs)
+
+    log = logging.getLogger("cocotb")
+
+    sim_build = os.path.abspath(kwargs.get('sim_build', "sim_build"))
+    model_file = _model_file(sim, sim_build, kwargs['toplevel'])
+    cache_file = os.path.join(_cache_dir, key[:2], key, os.path.basename(model_file))
+
+    try:
+        os.makedirs(sim_build, exist_ok=True)
+        shutil.copyfile(cache_file, model_file)
+        shutil.copymode(cache_file, model_file)
+        # mark as recently used for pruning
+        os.utime(cache_file)
+        hit = True
+    except OSError:
+        # not cached, or removed by a concurrent session
+        hit = False
+
+    if hit:
+        _stats['hits'] += 1
+        log.info("Simulation model cache hit: %s", key)
+
+        if sim == 'icarus':
+            # freshly copied model is newer than the sources, so cocotb-test skips compilation
+            return _orig_run(simulator=simulator, **kwargs)
+
+        kwargs.pop('simulator', None)
+        sim_obj = cocotb_test.simulator.Verilator(**kwargs)
+        sim_obj.build_command = lambda: [] if sim_obj.compile_only else [[model_file] + sim_obj.plus_args]
+        return sim_obj.run()
+
+    _stats['misses'] += 1
+    log.info("Simulation model cache miss: %s", key)
+
+    kwargs['force_compile'] = True
+
+    # a failed compile can leave the previous model in place, so remove it
+    # first and only store a model written by this build
+    if os.path.isfile(model_file):
+        os.remove(model_file)
+
+    start = time.time()
+    ret = _orig_run(simulator=simulator, **kwargs)
+
+    if os.path.isfile(model_file) and os.path.getmtime(model_file) >= start - 1:
+        try:
+            _store(model_file, cache_file)
+        except OSError as e:
+            log.warning("Failed to store simulation model in cache: %s", e)
+
+    return ret
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("sim cache", "compiled simulation model cache")
+    group.addoption("--sim-cache-dir", action="store", dest="sim_cache_dir", default=None, metavar="DIR",
+        help="directory for cached simulation models (default: $SIM_CACHE_DIR or <rootdir>/.sim_cache)")
+    group.addoption("--sim-cache-size", action="store", dest="sim_cache_size", type=int, default=None, metavar="MB",
+        help=f"size limit of the simulation model cache, least recently used models are removed at the end "
+            f"of the session (default: $SIM_CACHE_SIZE or {default_cache_size}, 0 for no limit)")
+    group.addoption("--sim-cache-clear", action="store_true", dest="sim_cache_clear", default=False,
+        help="remove all cached simulation models before running")
+    group.addoption("--no-sim-cache", action="store_true", dest="no_sim_cache", default=False,
+        help="disable the compiled simulation model cache")
+
+
+def _entries():
+    # (last use, size, path) of each cached model directory
+    entries = []
+    for path in glob.glob(os.path.join(_cache_dir, "*", "*")):
+        try:
+            files = [os.path.join(path, name) for name in os.listdir(path)]
+            st = [os.stat(f) for f in files]
+        except OSError:
+            continue
+        entries.append((max((s.st_mtime for s in st), default=0), sum(s.st_size for s in st), path))
+    return entries
+
+
+def prune(max_bytes):
+    # remove least recently used models until the cache fits in max_bytes
+    entries = sorted(_entries())
+    total = sum(e[1] for e in entries)
+    removed = 0
+
+    for mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+        total -= size
+        removed += 1
+
+    return removed
+
+
+def pytest_configure(config):
+    global _orig_run, _cache_dir, _cache_size
+
+    if config.getoption("no_sim_cache"):
+        return
+
+    cache_dir = config.getoption("sim_cache_dir") or os.getenv("SIM_CACHE_DIR")
+    if not cache_dir:
+        cache_dir = os.path.join(str(config.rootpath), ".sim_cache")
+
+    cache_size = config.getoption("sim_cache_size")
+    if cache_size is None:
+        cache_size = int(os.getenv("SIM_CACHE_SIZE", default_cache_size))
+
+    _cache_dir = os.path.abspath(cache_dir)
+    _cache_size = cache_size
+
+    if config.getoption("sim_cache_clear") and not hasattr(config, 'workerinput'):
+        # controller (or no xdist), before any worker starts
+        shutil.rmtree(_cache_dir, ignore_errors=True)
+
+    _orig_run = cocotb_test.simulator.run
+    cocotb_test.simulator.run = run
+
+
+def pytest_unconfigure(config):
+    global _orig_run, _cache_dir
+
+    if _orig_run is not None:
+        cocotb_test.simulator.run = _orig_run
+        _orig_run = None
+    _cache_dir = None
+
+
+def pytest_sessionfinish(session):
+    workeroutput = getattr(session.config, 'workeroutput', None)
+    if workeroutput is not None:
+        # pytest-xdist worker; report counts to the controller
+        workeroutput['sim_cache_stats'] = dict(_stats)
+    elif _cache_dir is not None and _cache_size > 0:
+        _stats['pruned'] += prune(_cache_size*1024*1024)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    stats = getattr(node, 'workeroutput', {}).get('sim_cache_stats')
+    if stats:
+        for k, v in stats.items():
+            _stats[k] += v
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _cache_dir is None or not (_stats['hits'] or _stats['misses']):
+        return
+
+    total = _stats['hits'] + _stats['misses']
+    terminalreporter.write_sep("-", "simulation model cache")
+    terminalreporter.write_line(f"{_stats['hits']} hits, {_stats['misses']} misses "
+        f"({100*_stats['hits']/total:.0f}% hit rate), {_stats['pruned']} pruned, cache: {_cache_dir}")
@@ -0,0 +1,235 @@
+"""
+
+Copyright (c) 2021-2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Simulator selection profiles for cocotb-test runs
+#
+# pytest plugin that wraps cocotb_test.simulator.run.
+#
+# Options:
+#   --sim-profile=default   use $SIM or the test's simulator (Icarus)
+#   --sim-profile=fast      run on Verilator, fall back to Icarus per test
+#                           if the Verilator model fails to build
+#   --sim-profile=compare   run every test on both Icarus and Verilator
+#   --verilator-threads N   build wide models (any *_WIDTH parameter of at
+#                           least 256 bits) as N-thread Verilator models
+#   --sim-report FILE       write the per-test wall time report as JSON
+#
+# The per-test wall time of each simulator is reported at the end of the
+# session for the fast and compare profiles.
+
+import json
+import logging
+import os
+import time
+
+import pytest
+
+import cocotb_test.simulator
+
+
+_orig_run = None
+_profile = 'default'
+_verilator_threads = 1
+_report_file = None
+_results = {}
+
+# same warning suppression as the testbench makefiles
+verilator_compile_args = ['-Wno-SELRANGE', '-Wno-WIDTH']
+
+# minimum datapath width for multithreaded Verilator models
+verilator_threads_min_width = 256
+
+
+def _current_test():
+    return os.getenv("PYTEST_CURRENT_TEST", "").rsplit(" ", 1)[0]
+
+
+def _sim_kwargs(sim, kwargs):
+    kwargs = dict(kwargs)
+
+    if sim == 'verilator':
+        kwargs['sim_build'] = kwargs.get('sim_build', "sim_build") + "-verilator"
+
+        compile_args = list(kwargs.get('compile_args') or []) + verilator_compile_args
+
+        parameters = kwargs.get('parameters') or {}
+        width = max((int(v) for k, v in parameters.items() if k.endswith('_WIDTH') and str(v).isdigit()), default=0)
+        if _verilator_threads > 1 and width >= verilator_threads_min_width:
+            compile_args += ['--threads', str(_verilator_threads)]
+
+        kwargs['compile_args'] = compile_args
+
+    return kwargs
+
+
+def _run_sim(sim, **kwargs):
+    __tracebackhide__ = True  # Hide the traceback when using PyTest.
+
+    kwargs = _sim_kwargs(sim, kwargs)
+
+    # explicit simulator selection, so $SIM must not override it
+    saved_sim = os.environ.pop("SIM", None)
+    start = time.perf_counter()
+    try:
+        return _orig_run(simulator=sim, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        if saved_sim is not None:
+            os.environ["SIM"] = saved_sim
+        res = _results.setdefault(_current_test(), {})
+        res[sim] = res.get(sim, 0.0) + elapsed
+
+
+def _run_verilator_model(**kwargs):
+    __tracebackhide__ = True  # Hide the traceback when using PyTest.
+
+    # run the model built by a previous compile_only run without rebuilding it
+    sim_obj = cocotb_test.simulator.Verilator(**_sim_kwargs('verilator', kwargs))
+    model_file = os.path.join(sim_obj.sim_dir, sim_obj.toplevel_module)
+    sim_obj.build_command = lambda: [[model_file] + sim_obj.plus_args]
+
+    start = time.perf_counter()
+    try:
+        return sim_obj.run()
+    finally:
+        res = _results.setdefault(_current_test(), {})
+        res['verilator'] = res.get('verilator', 0.0) + time.perf_counter() - start
+
+
+def run(simulator=None, **kwargs):
+    __tracebackhide__ = True  # Hide the traceback when using PyTest.
+
+    log = logging.getLogger("cocotb")
+
+    if _profile == 'fast':
+        # fall back only if the Verilator model fails to build; failures
+        # of the tests themselves are reported as such
+        try:
+            results = _run_sim('verilator', **dict(kwargs, compile_only=True))
+        except (Exception, SystemExit) as e:
+            log.warning("Verilator build failed (%s), falling back to Icarus", e)
+            _results.setdefault(_current_test(), {})['fallback'] = True
+            return _run_sim('icarus', **kwargs)
+
+        if kwargs.get('compile_only'):
+            return results
+        return _run_verilator_model(**kwargs)
+
+    if _profile == 'compare':
+        results = _run_sim('icarus', **kwargs)
+        _run_sim('verilator', **kwargs)
+        return results
+
+    return _orig_run(simulator=simulator, **kwargs)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("sim select", "simulator selection")
+    group.addoption("--sim-profile", action="store", dest="sim_profile", default="default",
+        choices=["default", "fast", "compare"],
+        help="simulator profile: default ($SIM or Icarus), fast (Verilator with Icarus fallback), "
+            "compare (run on both)")
+    group.addoption("--verilator-threads", action="store", dest="verilator_threads", type=int, default=1,
+        metavar="N", help=f"threads for Verilator models at least {verilator_threads_min_width} bits wide")
+    group.addoption("--sim-report", action="store", dest="sim_report", default=None, metavar="FILE",
+        help="write per-test simulator wall time report as JSON")
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_configure(config):
+    global _orig_run, _profile, _verilator_threads, _report_file
+
+    _profile = config.getoption("sim_profile")
+    _verilator_threads = config.getoption("verilator_threads")
+    _report_file = config.getoption("sim_report")
+
+    if _profile == 'default':
+        return
+
+    # wrap last, so that simulator selection happens before the cache lookup
+    _orig_run = cocotb_test.simulator.run
+    cocotb_test.simulator.run = run
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_unconfigure(config):
+    global _orig_run
+
+    if _orig_run is not None:
+        cocotb_test.simulator.run = _orig_run
+        _orig_run = None
+
+
+def pytest_sessionfinish(session):
+    workeroutput = getattr(session.config, 'workeroutput', None)
+    if workeroutput is not None:
+        # pytest-xdist worker; report results to the controller
+        workeroutput['sim_select_results'] = json.dumps(_results)
+    elif _report_file and _results:
+        with open(_report_file, 'w') as f:
+            json.dump({'profile': _profile, 'tests': _results}, f, indent=2, sort_keys=True)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    results = getattr(node, 'workeroutput', {}).get('sim_select_results')
+    if results:
+        _results.update(json.loads(results))
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+
+    tw = terminalreporter
+    tw.write_sep("-", f"simulator wall time ({_profile} profile)")
+    tw.write_line(f"{'test':72s} {'icarus':>9s} {'verilator':>9s} {'speedup':>8s}")
+
+    total = {'icarus': 0.0, 'verilator': 0.0}
+    fallbacks = 0
+
+    for name in sorted(_results):
+        res = _results[name]
+        icarus = res.get('icarus')
+        verilator = res.get('verilator')
+
+        cols = [f"{icarus:9.2f}" if icarus is not None else f"{'-':>9s}",
+            f"{verilator:9.2f}" if verilator is not None else f"{'-':>9s}"]
+
+        if icarus and verilator and not res.get('fallback'):
+            cols.append(f"{icarus/verilator:7.2f}x")
+        elif res.get('fallback'):
+            cols.append(f"{'fallback':>8s}")
+            fallbacks += 1
+        else:
+            cols.append(f"{'':>8s}")
+
+        for sim in total:
+            total[sim] += res.get(sim) or 0.0
+
+        tw.write_line(f"{name[-72:]:72s} " + " ".join(cols))
+
+    tw.write_line(f"{'total':72s} {total['icarus']:9.2f} {total['verilator']:9.2f}")
+    if fallbacks:
+        tw.write_line(f"{fallbacks} tests fell back to Icarus")
@@ -0,0 +1,187 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Link speed scaled test plans for the 10/100/1000 Mbit MAC testbenches
+#
+# At 100 and 10 Mbit/s every byte takes 10x and 100x as many clock cycles
+# as at 1000 Mbit/s, so running the full payload length list at every
+# speed makes the slow speeds dominate the wall time.  SpeedPlan thins the
+# length list in proportion to the link speed, relative to the fastest
+# speed of the testbench, while keeping:
+#
+#   - the first frame of every length class (below 64 bytes, then powers
+#     of two up to the jumbo frame size) for every length modulo the lane
+#     alignment (8 bytes by default), so all tail alignments are covered
+#     in every class that the full list covers
+#   - the longest frame of every class
+#   - back-to-back runs of the same length, shortened but at least two
+#     frames long
+#   - every 1/scale-th frame of the remaining list
+#
+# The full list is used at the fastest speed, and at every speed when
+# $SPEED_PLAN_FULL is set (the --full pytest option).  finish() records
+# the simulated bytes, simulated time and wall time of the test; they are
+# written as JSON to $SPEED_PLAN_DIR when it is set (see
+# tbsupport.speed_plan_report for the pytest side).
+
+import hashlib
+import json
+import math
+import os
+import time
+
+import cocotb
+from cocotb.utils import get_sim_time
+
+
+# upper bounds of the length classes (frame length without FCS)
+LENGTH_CLASSES = (64, 128, 256, 512, 1024, 1519, 2048, 4096, 8192, 16384)
+
+
+def length_class(length):
+    for k, limit in enumerate(LENGTH_CLASSES):
+        if length < limit:
+            return k
+    return len(LENGTH_CLASSES)
+
+
+class SpeedPlan:
+
+    def __init__(self, name, speed, full_speed=1000e6, align=8, full=None, log=None):
+        self.name = name
+        self.speed = speed
+        self.full_speed = full_speed
+        self.align = align
+        self.log = log
+
+        if full is None:
+            full = self.full_enabled()
+        self.full = full
+
+        self.scale = 1.0 if full else min(1.0, speed / full_speed)
+
+        self.full_lengths = []
+        self.plan_lengths = []
+        self.sim_start_ns = None
+        self.wall_start = None
+        self.result = None
+
+    @staticmethod
+    def full_enabled():
+        return bool(int(os.getenv("SPEED_PLAN_FULL", "0")))
+
+    def lengths(self, lengths):
+        self.full_lengths = list(lengths)
+
+        if self.scale >= 1.0:
+            self.plan_lengths = list(self.full_lengths)
+            return list(self.plan_lengths)
+
+        # runs of back-to-back frames of the same length
+        runs = []
+        for length in self.full_lengths:
+            if runs and runs[-1][0] == length:
+                runs[-1][1] += 1
+            else:
+                runs.append([length, 1])
+
+        # longest frame of each class
+        longest = {}
+        for length, count in runs:
+            k = length_class(length)
+            longest[k] = max(longest.get(k, length), length)
+
+        stride = math.ceil(1 / self.scale)
+        seen = set()
+        plan = []
+        index = 0
+
+        for length, count in runs:
+            k = length_class(length)
+            key = (k, length % self.align)
+
+            if count > 1:
+                plan.extend([length]*max(2, math.ceil(count*self.scale)))
+            elif key not in seen or length == longest[k] or index % stride == 0:
+                plan.append(length)
+
+            seen.add(key)
+            index += 1
+
+        self.plan_lengths = plan
+        return list(plan)
+
+    def start(self):
+        self.result = None
+        self.sim_start_ns = get_sim_time('ns')
+        self.wall_start = time.perf_counter()
+
+    def finish(self, **extra):
+        wall_time = time.perf_counter() - self.wall_start
+        sim_time_ns = get_sim_time('ns') - self.sim_start_ns
+
+        plan_bytes = sum(self.plan_lengths)
+        full_bytes = sum(self.full_lengths)
+
+        self.result = {
+            'name': self.name,
+            'test': os.getenv("PYTEST_CURRENT_TEST", "").rsplit(" ", 1)[0],
+            'simulator': cocotb.SIM_NAME,
+            'toplevel': cocotb.top._name if cocotb.top is not None else None,
+            'speed': self.speed,
+            'scale': self.scale,
+            'full': self.full,
+            'frames': len(self.plan_lengths),
+            'full_frames': len(self.full_lengths),
+            'bytes': plan_bytes,
+            'full_bytes': full_bytes,
+            'sim_time_ns': sim_time_ns,
+            'wall_time_s': wall_time,
+            'bytes_per_wall_s': plan_bytes / wall_time if wall_time else None,
+        }
+        self.result.update(extra)
+
+        if self.log:
+            self.log.info("%s at %g Mbps: %d of %d frames, %d of %d bytes, %.3f us simulated in %.2f s",
+                self.name, self.speed/1e6, len(self.plan_lengths), len(self.full_lengths),
+                plan_bytes, full_bytes, sim_time_ns/1000, wall_time)
+
+        self.write()
+
+        return self.result
+
+    def write(self):
+        out_dir = os.getenv("SPEED_PLAN_DIR")
+
+        if not out_dir or self.result is None:
+            return None
+
+        key = f"{self.result['test']}:{self.result['toplevel']}:{self.name}:{self.speed}"
+        path = os.path.join(out_dir, hashlib.sha1(key.encode()).hexdigest()[:16] + ".json")
+
+        os.makedirs(out_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.result, f, indent=2, sort_keys=True)
+
+        return path
@@ -0,0 +1,123 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Speed-scaled test plan report for cocotb-test runs
+#
+# pytest plugin for the link speed scaled test plans of the 10/100/1000
+# Mbit MAC testbenches (see tbsupport.speed_plan).
+#
+# Options:
+#   --full                  run the full test plan at every link speed
+#   --speed-plan-dir DIR    directory for the per-test results (default:
+#                           .speed_plan in the pytest root directory)
+#
+# The simulated bytes, simulated time and wall time of each test are
+# reported at the end of the session.
+
+import glob
+import json
+import os
+import shutil
+
+
+_out_dir = None
+
+
+def _load_results():
+    results = []
+    for path in sorted(glob.glob(os.path.join(_out_dir, "*.json"))):
+        try:
+            with open(path) as f:
+                results.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+    results.sort(key=lambda r: (r.get('test', ''), r.get('name', ''), -r.get('speed', 0)))
+    return results
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("speed plan", "link speed scaled test plans")
+    group.addoption("--full", action="store_true", dest="speed_plan_full", default=False,
+        help="run the full test plan at every link speed")
+    group.addoption("--speed-plan-dir", action="store", dest="speed_plan_dir", default=None, metavar="DIR",
+        help="directory for per-test speed plan results (default: <rootdir>/.speed_plan)")
+
+
+def pytest_configure(config):
+    global _out_dir
+
+    out_dir = config.getoption("speed_plan_dir")
+    if not out_dir:
+        out_dir = os.path.join(str(config.rootpath), ".speed_plan")
+
+    _out_dir = os.path.abspath(out_dir)
+
+    if not hasattr(config, 'workerinput'):
+        # controller (or no xdist); start from a clean result directory
+        shutil.rmtree(_out_dir, ignore_errors=True)
+
+    # picked up by the testbenches through the simulator environment
+    os.environ["SPEED_PLAN_DIR"] = _out_dir
+    if config.getoption("speed_plan_full"):
+        os.environ["SPEED_PLAN_FULL"] = "1"
+
+
+def pytest_unconfigure(config):
+    global _out_dir
+
+    if _out_dir is not None:
+        os.environ.pop("SPEED_PLAN_DIR", None)
+        os.environ.pop("SPEED_PLAN_FULL", None)
+        _out_dir = None
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _out_dir is None:
+        return
+
+    results = _load_results()
+
+    if not results:
+        return
+
+    tw = terminalreporter
+    tw.write_sep("-", "speed plan")
+    tw.write_line(f"{'test':52s} {'Mbps':>5s} {'frames':>9s} {'bytes':>13s} {'sim us':>9s} "
+        f"{'wall s':>7s} {'kB/s':>7s}")
+
+    total = {'bytes': 0, 'full_bytes': 0, 'wall_time_s': 0.0}
+
+    for res in results:
+        name = f"{res.get('test', '').rsplit('::', 1)[-1]} {res.get('name', '')}"
+        frames = f"{res['frames']}/{res['full_frames']}"
+        size = f"{res['bytes']}/{res['full_bytes']}"
+        tw.write_line(f"{name[-52:]:52s} {res['speed']/1e6:5g} {frames:>9s} {size:>13s} "
+            f"{res['sim_time_ns']/1000:9.1f} {res['wall_time_s']:7.2f} {(res['bytes_per_wall_s'] or 0)/1000:7.2f}")
+
+        for k in total:
+            total[k] += res[k]
+
+    tw.write_line(f"{total['bytes']} of {total['full_bytes']} bytes simulated "
+        f"({'full plan' if os.getenv('SPEED_PLAN_FULL') else 'scaled plan'}) in {total['wall_time_s']:.2f} s")
+    tw.write_line(f"results: {_out_dir}")
@@ -0,0 +1,154 @@
+"""
+
+Copyright (c) 2021-2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Line rate measurement for the MAC/PHY throughput benchmarks
+#
+# ThroughputMeter collects the frames received by a cocotbext-eth (or
+# tbsupport BASE-R) sink while back-to-back traffic is streamed through the
+# DUT, and compares the achieved rate with the theoretical rate for the
+# configured line rate and inter-frame gap.  The rate is measured from the
+# SFD of the first frame to the SFD of the last frame, so every measured
+# frame period includes preamble, frame, and gap.  In the RX direction, the
+# frames are taken from the AXI stream side of the MAC instead (the FCS is
+# counted back in) and measured from their first transfer.  Simulator wall
+# time per simulated microsecond is recorded alongside, to catch slowdowns
+# in the models as well as lost line rate in the RTL.
+#
+# The throughput benchmarks only run when $THROUGHPUT_DIR is set; each
+# result is written there as a JSON file (see tbsupport.throughput_report
+# for the pytest side).
+
+import hashlib
+import json
+import os
+import time
+
+import cocotb
+from cocotb.utils import get_sim_time, get_time_from_sim_steps
+
+
+# preamble and SFD
+PREAMBLE_LEN = 8
+# FCS, removed by the MAC on receive
+FCS_LEN = 4
+
+
+class ThroughputMeter:
+
+    def __init__(self, name, line_rate, ifg=12, log=None):
+        self.name = name
+        self.line_rate = line_rate
+        self.ifg = ifg
+        self.log = log
+
+        self.frames = []
+        self.sim_start_ns = None
+        self.wall_start = None
+        self.result = None
+
+    @staticmethod
+    def enabled():
+        return bool(os.getenv("THROUGHPUT_DIR"))
+
+    def start(self):
+        self.frames = []
+        self.result = None
+        self.sim_start_ns = get_sim_time('ns')
+        self.wall_start = time.perf_counter()
+
+    def add_frame(self, frame):
+        # length on the wire, excluding preamble
+        self.frames.append((len(frame.get_payload(strip_fcs=False)),
+            get_time_from_sim_steps(frame.sim_time_sfd, 'ns'),
+            get_time_from_sim_steps(frame.sim_time_end, 'ns')))
+
+    def add_axis_frame(self, frame):
+        # frame from the MAC RX path, length on the wire, excluding preamble
+        self.frames.append((len(frame.tdata) + FCS_LEN,
+            get_time_from_sim_steps(frame.sim_time_start, 'ns'),
+            get_time_from_sim_steps(frame.sim_time_end, 'ns')))
+
+    def finish(self, **extra):
+        wall_time = time.perf_counter() - self.wall_start
+
+        if len(self.frames) < 2:
+            raise ValueError("at least two frames are required to measure throughput")
+
+        # every frame but the last one has a full period between its SFD and the next SFD
+        lengths = [f[0] for f in self.frames[:-1]]
+        period_ns = self.frames[-1][1] - self.frames[0][1]
+        sim_time_ns = self.frames[-1][2] - self.sim_start_ns
+
+        frame_bits = sum(lengths)*8
+        theoretical_ns = (frame_bits + len(lengths)*(PREAMBLE_LEN+self.ifg)*8) * 1e9 / self.line_rate
+
+        self.result = {
+            'name': self.name,
+            'test': os.getenv("PYTEST_CURRENT_TEST", "").rsplit(" ", 1)[0],
+            'simulator': cocotb.SIM_NAME,
+            'toplevel': cocotb.top._name if cocotb.top is not None else None,
+            'parameters': {k[6:]: v for k, v in sorted(os.environ.items()) if k.startswith("PARAM_")},
+            'line_rate': self.line_rate,
+            'ifg': self.ifg,
+            'frames': len(self.frames),
+            'min_frame_len': min(f[0] for f in self.frames),
+            'max_frame_len': max(f[0] for f in self.frames),
+            'achieved_gbps': frame_bits / period_ns,
+            'achieved_fps': len(lengths) * 1e9 / period_ns,
+            'theoretical_gbps': frame_bits / theoretical_ns,
+            'theoretical_fps': len(lengths) * 1e9 / theoretical_ns,
+            'utilization': theoretical_ns / period_ns,
+            'sim_time_ns': sim_time_ns,
+            'wall_time_s': wall_time,
+            'wall_s_per_sim_us': wall_time / (sim_time_ns / 1000) if sim_time_ns else None,
+        }
+        self.result.update(extra)
+
+        if self.log:
+            self.log.info("%s: %d frames, %.3f Gbps (theoretical %.3f Gbps), %.0f fps (theoretical %.0f fps), "
+                "%.2f%% of theoretical", self.name, self.result['frames'],
+                self.result['achieved_gbps'], self.result['theoretical_gbps'],
+                self.result['achieved_fps'], self.result['theoretical_fps'],
+                self.result['utilization']*100)
+            self.log.info("%s: %.3f us simulated in %.2f s (%.3f s per simulated us)", self.name,
+                sim_time_ns / 1000, wall_time, self.result['wall_s_per_sim_us'] or 0.0)
+
+        self.write()
+
+        return self.result
+
+    def write(self):
+        out_dir = os.getenv("THROUGHPUT_DIR")
+
+        if not out_dir or self.result is None:
+            return None
+
+        key = f"{self.result['test']}:{self.result['toplevel']}:{self.name}"
+        path = os.path.join(out_dir, hashlib.sha1(key.encode()).hexdigest()[:16] + ".json")
+
+        os.makedirs(out_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.result, f, indent=2, sort_keys=True)
+
+        return path
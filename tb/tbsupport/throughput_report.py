@@ -0,0 +1,150 @@
+"""
+
+Copyright (c) 2021-2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Throughput benchmark report for cocotb-test runs
+#
+# pytest plugin that enables the throughput benchmarks in the MAC/PHY
+# testbenches (see tbsupport.throughput) and collects their results.
+#
+# Options:
+#   --throughput            run only the throughput benchmarks (the cocotb-test
+#                           functions or parameter sets marked with
+#                           @pytest.mark.throughput)
+#   --throughput-dir DIR    directory for the per-test results (default:
+#                           .throughput in the pytest root directory)
+#   --throughput-report FILE
+#                           write the combined results as JSON
+#
+# A summary of the achieved line rate of each benchmark is reported at the
+# end of the session.
+
+import glob
+import json
+import os
+import shutil
+
+
+_out_dir = None
+_report_file = None
+
+
+def _load_results():
+    results = []
+    for path in sorted(glob.glob(os.path.join(_out_dir, "*.json"))):
+        try:
+            with open(path) as f:
+                results.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+    results.sort(key=lambda r: (r.get('test', ''), r.get('name', '')))
+    return results
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("throughput", "MAC/PHY throughput benchmarks")
+    group.addoption("--throughput", action="store_true", dest="throughput", default=False,
+        help="run the MAC/PHY throughput benchmarks")
+    group.addoption("--throughput-dir", action="store", dest="throughput_dir", default=None, metavar="DIR",
+        help="directory for per-test throughput results (default: <rootdir>/.throughput)")
+    group.addoption("--throughput-report", action="store", dest="throughput_report", default=None, metavar="FILE",
+        help="write combined throughput results as JSON")
+
+
+def pytest_configure(config):
+    global _out_dir, _report_file
+
+    config.addinivalue_line("markers", "throughput: testbench includes the MAC/PHY throughput benchmarks")
+
+    if not config.getoption("throughput"):
+        return
+
+    out_dir = config.getoption("throughput_dir")
+    if not out_dir:
+        out_dir = os.path.join(str(config.rootpath), ".throughput")
+
+    _out_dir = os.path.abspath(out_dir)
+    _report_file = config.getoption("throughput_report")
+
+    if not hasattr(config, 'workerinput'):
+        # controller (or no xdist); start from a clean result directory
+        shutil.rmtree(_out_dir, ignore_errors=True)
+        os.makedirs(_out_dir, exist_ok=True)
+
+    # picked up by the testbenches through the simulator environment
+    os.environ["THROUGHPUT_DIR"] = _out_dir
+
+
+def pytest_unconfigure(config):
+    global _out_dir
+
+    if _out_dir is not None:
+        os.environ.pop("THROUGHPUT_DIR", None)
+        _out_dir = None
+
+
+def pytest_collection_modifyitems(config, items):
+    if _out_dir is None:
+        return
+
+    selected = []
+    deselected = []
+
+    for item in items:
+        if item.get_closest_marker("throughput"):
+            selected.append(item)
+        else:
+            deselected.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+def pytest_sessionfinish(session):
+    if _out_dir is None or not _report_file or hasattr(session.config, 'workerinput'):
+        return
+
+    with open(_report_file, 'w') as f:
+        json.dump({'results': _load_results()}, f, indent=2, sort_keys=True)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _out_dir is None:
+        return
+
+    results = _load_results()
+
+    if not results:
+        return
+
+    tw = terminalreporter
+    tw.write_sep("-", "throughput")
+    tw.write_line(f"{'test':56s} {'frames':>6s} {'Gbps':>8s} {'max':>8s} {'util':>7s} {'s/us':>7s}")
+
+    for res in results:
+        name = f"{res.get('test', '').rsplit('::', 1)[-1]} {res.get('name', '')}"
+        tw.write_line(f"{name[-56:]:56s} {res['frames']:6d} {res['achieved_gbps']:8.3f} "
+            f"{res['theoretical_gbps']:8.3f} {res['utilization']*100:6.2f}% {res['wall_s_per_sim_us'] or 0:7.3f}")
+
+    tw.write_line(f"results: {_out_dir}")
@@ -0,0 +1,142 @@
+"""
+
+Copyright (c) 2023 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Streaming timestamp error statistics
+#
+# ErrorStats accumulates error samples online (Welford mean and variance,
+# min/max and a fixed bin width histogram), so arbitrarily long captures
+# run in constant memory.  TsComparator compares an output timestamp
+# against a reference timestamp linearly interpolated to the output sample
+# time.  Only the last two reference samples are kept; output samples that
+# are newer than the newest reference sample are held until a reference
+# sample at or after their sample time arrives, so the reference and output
+# collectors can run as independent coroutines.  Output samples that are
+# still pending when the capture stops are discarded.
+
+import math
+from collections import deque
+
+
+class ErrorStats:
+    def __init__(self, bin_width=0.1):
+        self.bin_width = bin_width
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.hist = {}
+
+    def add(self, err):
+        self.n += 1
+        d = err - self._mean
+        self._mean += d / self.n
+        self._m2 += d * (err - self._mean)
+
+        if self.n == 1:
+            self.min = self.max = err
+        elif err < self.min:
+            self.min = err
+        elif err > self.max:
+            self.max = err
+
+        b = math.floor(err / self.bin_width)
+        self.hist[b] = self.hist.get(b, 0) + 1
+
+    @property
+    def mean(self):
+        return self._mean if self.n else float('nan')
+
+    @property
+    def variance(self):
+        # sample variance, as statistics.variance
+        return self._m2 / (self.n-1) if self.n > 1 else float('nan')
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    def histogram(self):
+        # list of (bin lower edge, count)
+        return [(b*self.bin_width, self.hist[b]) for b in sorted(self.hist)]
+
+    def summary(self):
+        return {
+            'samples': self.n,
+            'mean': self.mean,
+            'stdev': self.stdev,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    def log_summary(self, log, name="Difference", units="ns"):
+        log.info("%s: %s %s (stdev: %s, min: %s, max: %s, samples: %d)",
+            name, self.mean, units, self.stdev, self.min, self.max, self.n)
+
+    def log_histogram(self, log, width=50):
+        if not self.hist:
+            return
+        peak = max(self.hist.values())
+        for lo, count in self.histogram():
+            log.info("%12.4f %8d %s", lo, count, '#'*max(1, count*width//peak))
+
+
+class TsComparator:
+    def __init__(self, scale=1, bin_width=0.1):
+        self.scale = scale
+        self.stats = ErrorStats(bin_width)
+        self.reset()
+
+    def reset(self):
+        self.ref1 = None
+        self.ref2 = None
+        self.pending = deque()
+        self.stats.reset()
+
+    def add_ref(self, t, ts):
+        self.ref1 = self.ref2
+        self.ref2 = (t, ts)
+
+        if self.ref1 is None:
+            return
+
+        while self.pending and self.pending[0][0] <= t:
+            self._compare(*self.pending.popleft())
+
+    def add_output(self, t, ts):
+        if self.pending or self.ref1 is None or self.ref2[0] < t:
+            self.pending.append((t, ts))
+        else:
+            self._compare(t, ts)
+
+    def _compare(self, t, ts):
+        t1, ts1 = self.ref1
+        t2, ts2 = self.ref2
+
+        its = ts1 + (ts2-ts1)/(t2-t1)*(t-t1)
+
+        self.stats.add(float(ts - its)*self.scale)
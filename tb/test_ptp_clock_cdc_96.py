@@ -117,6 +117,14 @@ def bench():
     def clkgen_sample():
         sample_clk.next = not sample_clk
 
+    def wait_cycles(n):
+        # wait n input clock cycles in one step, then check the PTP clock
+        # model output against its own prediction
+        yield input_clk.negedge
+        ts = ptp_clock.ts_96_ahead(n)
+        yield delay(n*6400)
+        assert input_ts == ts
+
     @instance
     def check():
         yield delay(100000)
@@ -141,8 +149,7 @@ def bench():
 
         yield clk.posedge
 
-        for i in range(20000):
-            yield clk.posedge
+        yield from wait_cycles(20000)
 
         input_stop_ts = input_ts[96:48] + (input_ts[48:0]/2**16*1e-9)
         output_stop_ts = output_ts[96:48] + (output_ts[48:0]/2**16*1e-9)
@@ -161,8 +168,7 @@ def bench():
 
         yield clk.posedge
 
-        for i in range(20000):
-            yield clk.posedge
+        yield from wait_cycles(20000)
 
         input_stop_ts = input_ts[96:48] + (input_ts[48:0]/2**16*1e-9)
         output_stop_ts = output_ts[96:48] + (output_ts[48:0]/2**16*1e-9)
@@ -181,8 +187,7 @@ def bench():
 
         yield clk.posedge
 
-        for i in range(20000):
-            yield clk.posedge
+        yield from wait_cycles(20000)
 
         input_stop_ts = input_ts[96:48] + (input_ts[48:0]/2**16*1e-9)
         output_stop_ts = output_ts[96:48] + (output_ts[48:0]/2**16*1e-9)
@@ -201,8 +206,7 @@ def bench():
 
         yield clk.posedge
 
-        for i in range(20000):
-            yield clk.posedge
+        yield from wait_cycles(20000)
 
         input_stop_ts = input_ts[96:48] + (input_ts[48:0]/2**16*1e-9)
         output_stop_ts = output_ts[96:48] + (output_ts[48:0]/2**16*1e-9)
@@ -221,8 +225,7 @@ def bench():
 
         yield clk.posedge
 
-        for i in range(30000):
-            yield clk.posedge
+        yield from wait_cycles(30000)
 
         input_stop_ts = input_ts[96:48] + (input_ts[48:0]/2**16*1e-9)
         output_stop_ts = output_ts[96:48] + (output_ts[48:0]/2**16*1e-9)
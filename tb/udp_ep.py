@@ -22,12 +22,19 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 import axis_ep
+import checksum
 import eth_ep
 import ip_ep
 import struct
 
+# UDP header: source port, destination port, length, checksum
+udp_header = struct.Struct('>HHHH')
+
+
 class UDPFrame(object):
     def __init__(self,
                 payload=b'',
@@ -54,6 +61,8 @@ class UDPFrame(object):
             ):
 
         self._payload = axis_ep.AXIStreamFrame()
+        self._ip_checksum_state = None
+        self._udp_checksum_state = None
         self.eth_dest_mac = eth_dest_mac
         self.eth_src_mac = eth_src_mac
         self.eth_type = eth_type
@@ -97,9 +106,7 @@ class UDPFrame(object):
             self.udp_dest_port = payload['udp_dest_port']
             self.udp_length = payload['udp_length']
             self.udp_checksum = payload['udp_checksum']
-        if type(payload) is bytes:
-            payload = bytearray(payload)
-        if type(payload) is bytearray or type(payload) is axis_ep.AXIStreamFrame:
+        if type(payload) in (bytes, bytearray, axis_ep.AXIStreamFrame):
             self.payload = axis_ep.AXIStreamFrame(payload)
         if type(payload) is UDPFrame:
             self.payload = axis_ep.AXIStreamFrame(payload.payload)
@@ -143,35 +150,25 @@ class UDPFrame(object):
         self.update_ip_length()
 
     def calc_ip_checksum(self):
-        cksum = self.ip_version << 12 | self.ip_ihl << 8 | self.ip_dscp << 2 | self.ip_ecn
-        cksum += self.ip_length
-        cksum += self.ip_identification
-        cksum += self.ip_flags << 13 | self.ip_fragment_offset
-        cksum += self.ip_ttl << 8 | self.ip_protocol
-        cksum += self.ip_source_ip & 0xffff
-        cksum += (self.ip_source_ip >> 16) & 0xffff
-        cksum += self.ip_dest_ip & 0xffff
-        cksum += (self.ip_dest_ip >> 16) & 0xffff
-        cksum = (cksum & 0xffff) + (cksum >> 16)
-        cksum = (cksum & 0xffff) + (cksum >> 16)
-        return ~cksum & 0xffff
+        return checksum.ip_header_checksum(self)
 
     def update_ip_checksum(self):
-        self.ip_header_checksum = self.calc_ip_checksum()
+        # incremental update (RFC 1624) of the checksum last set here, if it
+        # is still in place, for the header words that changed since
+        words = checksum.ip_header_words(self)
+        state = self._ip_checksum_state
+        if state is not None and state[1] == self.ip_header_checksum:
+            cksum = checksum.update_words(state[1], state[0], words)
+        else:
+            cksum = self.calc_ip_checksum()
+        self.ip_header_checksum = cksum
+        self._ip_checksum_state = (words, cksum)
 
     def verify_ip_checksum(self):
         return self.ip_header_checksum == self.calc_ip_checksum()
 
     def calc_udp_pseudo_header_checksum(self):
-        cksum = self.ip_source_ip & 0xffff
-        cksum += (self.ip_source_ip >> 16) & 0xffff
-        cksum += self.ip_dest_ip & 0xffff
-        cksum += (self.ip_dest_ip >> 16) & 0xffff
-        cksum += self.ip_protocol
-        cksum += self.udp_length
-        cksum = (cksum & 0xffff) + (cksum >> 16)
-        cksum = (cksum & 0xffff) + (cksum >> 16)
-        return cksum
+        return checksum.udp_pseudo_header_sum(self)
 
     def set_udp_pseudo_header_checksum(self):
         if self.udp_length is None:
@@ -179,25 +176,24 @@ class UDPFrame(object):
         self.udp_checksum = self.calc_udp_pseudo_header_checksum()
 
     def calc_udp_checksum(self):
-        cksum = self.calc_udp_pseudo_header_checksum()
-        cksum += self.udp_source_port
-        cksum += self.udp_dest_port
-        cksum += self.udp_length
-        odd = False
-        for d in self.payload.data:
-            if odd:
-                cksum += d
-            else:
-                cksum += d << 8
-            odd = not odd
-        cksum = (cksum & 0xffff) + (cksum >> 16)
-        cksum = (cksum & 0xffff) + (cksum >> 16)
-        return ~cksum & 0xffff
+        return checksum.udp_checksum(self, self.payload.data)
 
     def update_udp_checksum(self):
         if self.udp_length is None:
             self.update_udp_length()
-        self.udp_checksum = self.calc_udp_checksum()
+        # as update_ip_checksum, if the payload is also unchanged; keeps a
+        # copy of the payload to check that
+        words = checksum.udp_header_words(self)
+        data = self.payload.data
+        state = self._udp_checksum_state
+        if state is not None and state[2] == self.udp_checksum and state[1] == data:
+            cksum = checksum.update_words(state[2], state[0], words)
+            data = state[1]
+        else:
+            cksum = self.calc_udp_checksum()
+            data = bytes(data)
+        self.udp_checksum = cksum
+        self._udp_checksum_state = (words, data, cksum)
 
     def verify_udp_checksum(self):
         return self.udp_checksum == self.calc_udp_checksum()
@@ -213,31 +209,43 @@ class UDPFrame(object):
         if self.udp_length is None:
             self.update_udp_length()
         if self.udp_checksum is None:
-            self.update_udp_checksum()
+            # without keeping a copy of the payload for later updates
+            self.udp_checksum = self.calc_udp_checksum()
         if self.ip_length is None:
             self.update_ip_length()
         if self.ip_header_checksum is None:
             self.update_ip_checksum()
 
+    def build_buffer(self, headroom=0):
+        # header and payload in a new buffer, after headroom bytes for the
+        # headers of outer layers; the payload is the only data copied
+        self.build()
+        data = self.payload.data
+        offset = headroom + udp_header.size
+        buf = bytearray(offset + len(data))
+        udp_header.pack_into(buf, headroom, self.udp_source_port, self.udp_dest_port,
+            self.udp_length, self.udp_checksum)
+        buf[offset:] = data
+        return buf
+
     def build_axis(self):
-        return self.build_eth().build_axis()
+        buf = self.build_buffer(eth_ep.eth_header.size + ip_ep.ip_header.size)
+        eth_ep.pack_eth_header(buf, 0, self)
+        ip_ep.pack_ip_header(buf, eth_ep.eth_header.size, self)
+        return axis_ep.wrap_frame(buf)
 
     def build_eth(self):
-        return self.build_ip().build_eth()
+        buf = self.build_buffer(ip_ep.ip_header.size)
+        ip_ep.pack_ip_header(buf, 0, self)
+        frame = eth_ep.EthFrame(b'', self.eth_dest_mac, self.eth_src_mac, self.eth_type)
+        frame._payload = axis_ep.wrap_frame(buf)
+        return frame
 
     def build_ip(self):
-        self.build()
-        data = b''
-
-        data += struct.pack('>H', self.udp_source_port)
-        data += struct.pack('>H', self.udp_dest_port)
-        data += struct.pack('>H', self.udp_length)
-        data += struct.pack('>H', self.udp_checksum)
+        buf = self.build_buffer()
 
-        data += self.payload.data
-
-        return ip_ep.IPFrame(
-                data,
+        frame = ip_ep.IPFrame(
+                b'',
                 self.eth_dest_mac,
                 self.eth_src_mac,
                 self.eth_type,
@@ -255,16 +263,28 @@ class UDPFrame(object):
                 self.ip_source_ip,
                 self.ip_dest_ip
             )
+        frame._payload = axis_ep.wrap_frame(buf)
+        return frame
 
     def parse_axis(self, data):
-        frame = eth_ep.EthFrame()
-        frame.parse_axis(data)
-        self.parse_eth(frame)
+        data = eth_ep.frame_bytes(data)
+        self.eth_dest_mac, self.eth_src_mac, self.eth_type = eth_ep.unpack_eth_header(data)
+        self.parse_ip_payload(data, eth_ep.eth_header.size)
 
     def parse_eth(self, data):
-        frame = ip_ep.IPFrame()
-        frame.parse_eth(data)
-        self.parse_ip(frame)
+        self.eth_src_mac = data.eth_src_mac
+        self.eth_dest_mac = data.eth_dest_mac
+        self.eth_type = data.eth_type
+
+        self.parse_ip_payload(data.payload.data)
+
+    def parse_ip_payload(self, data, offset=0):
+        # IP header at offset in data, followed by the UDP header and payload
+        data = eth_ep.frame_bytes(data)
+        ip_ep.unpack_ip_header(self, data, offset)
+
+        with memoryview(data) as mv:
+            self.parse_payload(mv[offset:offset+self.ip_length], ip_ep.ip_header.size)
 
     def parse_ip(self, data):
         self.eth_src_mac = data.eth_src_mac
@@ -284,12 +304,16 @@ class UDPFrame(object):
         self.ip_source_ip = data.ip_source_ip
         self.ip_dest_ip = data.ip_dest_ip
 
-        self.udp_source_port = struct.unpack('>H', data.payload.data[0:2])[0]
-        self.udp_dest_port = struct.unpack('>H', data.payload.data[2:4])[0]
-        self.udp_length = struct.unpack('>H', data.payload.data[4:6])[0]
-        self.udp_checksum = struct.unpack('>H', data.payload.data[6:8])[0]
+        self.parse_payload(data.payload.data)
+
+    def parse_payload(self, data, offset=0):
+        # UDP header at offset in data; the payload is the only data copied
+        data = eth_ep.frame_bytes(data)
+        self.udp_source_port, self.udp_dest_port, self.udp_length, self.udp_checksum = \
+            udp_header.unpack_from(data, offset)
 
-        self.payload = axis_ep.AXIStreamFrame(data.payload.data[8:self.udp_length])
+        with memoryview(data) as mv:
+            self._payload = axis_ep.wrap_frame(bytearray(mv[offset:offset+self.udp_length][udp_header.size:]))
 
     def __eq__(self, other):
         if type(other) is UDPFrame:
@@ -348,9 +372,9 @@ class UDPFrameSource():
     def __init__(self):
         self.active = False
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.payload_source = axis_ep.AXIStreamSource()
-        self.header_queue = []
+        self.header_queue = deque()
         self.clk = Signal(bool(0))
 
     def send(self, frame):
@@ -441,7 +465,7 @@ class UDPFrameSource():
                         udp_hdr_valid.next = False
                         self.active = False
                     if not self.active and self.header_queue:
-                        frame = self.header_queue.pop(0)
+                        frame = self.header_queue.popleft()
                         frame.build()
                         eth_dest_mac.next = frame.eth_dest_mac
                         eth_src_mac.next = frame.eth_src_mac
@@ -471,7 +495,7 @@ class UDPFrameSource():
                         self.active = True
 
                     if self.queue and not self.header_queue:
-                        frame = self.queue.pop(0)
+                        frame = self.queue.popleft()
                         self.header_queue.append(frame)
                         self.payload_source.send(frame.payload)
 
@@ -481,14 +505,14 @@ class UDPFrameSource():
 class UDPFrameSink():
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.payload_sink = axis_ep.AXIStreamSink()
-        self.header_queue = []
+        self.header_queue = deque()
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def count(self):
@@ -603,7 +627,7 @@ class UDPFrameSink():
                         self.header_queue.append(frame)
 
                     if not self.payload_sink.empty() and self.header_queue:
-                        frame = self.header_queue.pop(0)
+                        frame = self.header_queue.popleft()
                         frame.payload = self.payload_sink.recv()
                         self.queue.append(frame)
                         self.sync.next = not self.sync
@@ -38,12 +38,12 @@ from cocotb.regression import TestFactory
 from cocotbext.eth import XgmiiSink, XgmiiFrame
 
 try:
-    from baser import BaseRSerdesSource
+    from tbsupport import BaseRSerdesSource
 except ImportError:
-    # attempt import from current directory
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     try:
-        from baser import BaseRSerdesSource
+        from tbsupport import BaseRSerdesSource
     finally:
         del sys.path[0]
 
@@ -38,12 +38,12 @@ from cocotb.regression import TestFactory
 from cocotbext.eth import XgmiiSource, XgmiiFrame
 
 try:
-    from baser import BaseRSerdesSink
+    from tbsupport import BaseRSerdesSink
 except ImportError:
-    # attempt import from current directory
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+    # attempt import from tb directory
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
     try:
-        from baser import BaseRSerdesSink
+        from tbsupport import BaseRSerdesSink
     finally:
         del sys.path[0]
 
@@ -22,6 +22,8 @@ THE SOFTWARE.
 
 """
 
+from collections import deque
+
 from myhdl import *
 
 ETH_PRE = 0x55
@@ -61,9 +63,6 @@ class XGMIIFrame(object):
         f = list(self.data)
         ctrl = []
         error = []
-        d = []
-        c = []
-        i = 0
 
         assert_error = False
         if (type(self.error) is int or type(self.error) is bool) and self.error:
@@ -88,13 +87,7 @@ class XGMIIFrame(object):
                 f[i] = XGMII_ERROR
                 ctrl[i] = 1
 
-        i = 0
-        while len(f) > 0:
-            d.append(f.pop(0))
-            c.append(ctrl[i])
-            i += 1
-
-        return d, c
+        return f, ctrl
 
     def parse(self, d, c):
         if d is None or c is None:
@@ -123,7 +116,7 @@ class XGMIIFrame(object):
 class XGMIISource(object):
     def __init__(self, ifg=12, enable_dic=True):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.ifg = ifg
         self.enable_dic = enable_dic
         self.force_offset_start = False
@@ -158,9 +151,10 @@ class XGMIISource(object):
         @instance
         def logic():
             frame = None
-            dl = []
-            cl = []
+            beats = []
+            ptr = 0
             ifg_cnt = 0
+            ifg_end = 0
             deficit_idle_cnt = 0
 
             while True:
@@ -170,8 +164,8 @@ class XGMIISource(object):
                     frame = None
                     txd.next = 0x0707070707070707 if bw == 8 else 0x07070707
                     txc.next = 0xff if bw == 8 else 0xf
-                    dl = []
-                    cl = []
+                    beats = []
+                    ptr = 0
                     ifg_cnt = 0
                     deficit_idle_cnt = 0
                 elif enable:
@@ -179,24 +173,13 @@ class XGMIISource(object):
                         ifg_cnt = max(ifg_cnt - bw, 0)
                         txd.next = 0x0707070707070707 if bw == 8 else 0x07070707
                         txc.next = 0xff if bw == 8 else 0xf
-                    elif dl:
-                        d = 0
-                        c = 0
-
-                        for i in range(bw):
-                            if dl:
-                                d |= dl.pop(0) << (8*i)
-                                c |= cl.pop(0) << i
-                                if not dl:
-                                    ifg_cnt = self.ifg - (bw-i) + deficit_idle_cnt
-                            else:
-                                d |= XGMII_IDLE << (8*i)
-                                c |= 1 << i
-
-                        txd.next = d
-                        txc.next = c
+                    elif ptr < len(beats):
+                        txd.next, txc.next = beats[ptr]
+                        ptr += 1
+                        if ptr == len(beats):
+                            ifg_cnt = ifg_end
                     elif self.queue:
-                        frame = self.queue.pop(0)
+                        frame = self.queue.popleft()
                         dl, cl = frame.build()
                         if name is not None:
                             print("[%s] Sending frame %s" % (name, repr(frame)))
@@ -216,21 +199,24 @@ class XGMIISource(object):
                         deficit_idle_cnt = max(ifg_cnt, 0)
                         ifg_cnt = 0
 
-                        d = 0
-                        c = 0
-
-                        for i in range(0,bw):
-                            if dl:
-                                d |= dl.pop(0) << (8*i)
-                                c |= cl.pop(0) << i
-                                if not dl:
-                                    ifg_cnt = self.ifg - (bw-i) + deficit_idle_cnt
-                            else:
-                                d |= XGMII_IDLE << (8*i)
-                                c |= 1 << i
-
-                        txd.next = d
-                        txc.next = c
+                        # gap after the lane holding the terminate character
+                        ifg_end = self.ifg - (bw-(len(dl)-1) % bw) + deficit_idle_cnt
+
+                        # pack into cycles, padding the last cycle with idles
+                        pad = -len(dl) % bw
+                        dl = bytes(dl + [XGMII_IDLE]*pad)
+                        cl = cl + [1]*pad
+                        beats = []
+                        for k in range(0, len(dl), bw):
+                            c = 0
+                            for i in range(bw):
+                                c |= cl[k+i] << i
+                            beats.append((int.from_bytes(dl[k:k+bw], 'little'), c))
+
+                        txd.next, txc.next = beats[0]
+                        ptr = 1
+                        if ptr == len(beats):
+                            ifg_cnt = ifg_end
                     else:
                         ifg_cnt = 0
                         deficit_idle_cnt = 0
@@ -243,12 +229,12 @@ class XGMIISource(object):
 class XGMIISink(object):
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
         self.sync = Signal(intbv(0))
 
     def recv(self):
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
     def count(self):